@@ -23,8 +23,29 @@ def create_app(test_config = None):
   def index():
     return render_template('index.html')
 
-  from . import db
+  from . import (db, counters, forecast, live, log_writer, metrics, migrate, pricing, rebalancing, repository,
+                 retention, seed, telemetry)
+  metrics.init_app(app)
   db.init_app(app)
+  migrate.init_app(app)
+  repository.init_app(app)
+  pricing.init_app(app)
+  log_writer.init_app(app)
+  telemetry.init_app(app)
+  retention.init_app(app)
+  rebalancing.init_app(app)
+  forecast.init_app(app)
+  seed.init_app(app)
+  counters.init_app(app)
+  live.init_app(app)
+
+  from . import chat, chat_history, context, gazetteer, llm, sentence_cache
+  llm.init_app(app)
+  chat_history.init_app(app)
+  context.init_app(app)
+  sentence_cache.init_app(app)
+  gazetteer.init_app(app)
+  chat.init_app(app)
 
   from . import (menu1, menu2, menu3, menu4,)
   app.register_blueprint(menu1.bp)
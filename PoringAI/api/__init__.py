@@ -1,40 +1,17 @@
-from flask import Blueprint, render_template, request, url_for, session
-import os, json, requests
+import importlib
+from flask import Blueprint
 
 bp = Blueprint("api", __name__)
 
 from . import available_bikes
 from . import generate_sentence
 from . import available_nearby_bikes
-
-
-
-def fetch_available_bikes(hub_name: str):
-  """내부 API(/available-bikes) 호출"""
-  api_url = url_for("api.available_bikes", _external=True)
-  try:
-    res = requests.get(api_url, params={"hub_name": hub_name}, timeout=5)
-    return res.json(), res.status_code
-  except Exception as e:
-    return {"hub_name": hub_name, "found": False, "available_bikes": 0, "error": str(e)}, 500
-
-    
-def fetch_available_nearby_bikes(lat: float, lon: float):
-  """
-  내부 API /api/available-nearby-bikes를 호출해 가까운 허브 목록을 그대로 받아온다.
-  서버 내부에서 거리 계산은 하지 않는다(요청만 전달).
-  """
-  api_url = url_for("api.available_nearby_bikes", _external=True)
-  params = {"lat": lat, "lon": lon}
-
-  try:
-    res = requests.get(api_url, params=params, timeout=5)
-    return res.json(), res.status_code
-  except Exception as e:
-    return {
-        "hub_name" : None,
-        "query": {"lat": lat, "lon": lon},
-        "found": False,
-        "available_bikes": 0,
-        "error": str(e)
-    }, 500
\ No newline at end of file
+from . import nearby_hubs
+from . import cache_stats
+from . import hub_occupancy
+from . import hub_history
+from . import hub_forecast
+from . import lock_api
+from . import ride_actions
+from . import telemetry
+importlib.import_module(".return", __name__)  # 'return' 은 예약어라 import 문으로 못 불러온다
@@ -0,0 +1,21 @@
+from flask import jsonify
+from .. import chat_history, context, gazetteer, sentence_cache
+from . import bp
+
+@bp.route("/sentence-cache/stats", methods=["GET"])
+def sentence_cache_stats():
+  stats = sentence_cache.get_cache().stats()
+  stats["refresh_runs"] = sentence_cache.get_refresher().runs
+  return jsonify(stats), 200
+
+
+@bp.route("/router/stats", methods=["GET"])
+def router_stats():
+  return jsonify(gazetteer.get_stats().stats()), 200
+
+
+@bp.route("/chat-history/stats", methods=["GET"])
+def chat_history_stats():
+  stats = chat_history.get_store().stats()
+  stats["context"] = context.get_builder().stats()
+  return jsonify(stats), 200
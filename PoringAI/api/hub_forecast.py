@@ -0,0 +1,16 @@
+from flask import request, jsonify
+from .. import service
+from . import bp
+
+
+@bp.route("/hub-forecast", methods=["GET"])
+def hub_forecast():
+  """
+  허브의 특정 시각 예상 이용가능 대수 (flask fit-forecast 가 만든 hub_forecast 조회)
+
+  예:
+    GET /api/hub-forecast?hub_name=학생회관&time=18:00&day_offset=1
+  """
+  data, status = service.lookup_bike_forecast(request.args.get("hub_name"), request.args.get("time"),
+                                              request.args.get("day_offset", 0))
+  return jsonify(data), status
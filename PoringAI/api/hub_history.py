@@ -0,0 +1,23 @@
+from flask import request, jsonify
+from ..db import get_db
+from .. import retention
+from . import bp
+
+
+@bp.route("/hubs/<int:hub_id>/history", methods=["GET"])
+def hub_history(hub_id):
+  """
+  허브 시간별 롤업 (retention 이 원본 로그에서 만든 것)
+
+  예:
+    GET /api/hubs/3/history?days=30
+  """
+  try:
+    days = max(1, min(int(request.args.get("days", 30)), 3650))
+  except ValueError:
+    return jsonify({"error": "days 는 정수여야 합니다."}), 400
+
+  db = get_db()
+  since = db.execute("SELECT datetime('now', ?)", (f"-{days} days",)).fetchone()[0]
+  rows = retention.hub_history(db, hub_id, since)
+  return jsonify({"hub_id": hub_id, "since": since, "hours": [dict(r) for r in rows]}), 200
@@ -0,0 +1,85 @@
+import json
+
+from flask import Response, current_app, request, jsonify, make_response
+from .. import live, service
+from . import bp
+
+
+@bp.route("/hub-occupancy", methods=["GET"])
+def hub_occupancy():
+  """
+  허브별 주차 현황 (menu2 지도 폴링용)
+
+  예:
+    GET /api/hub-occupancy                    -> 전체, ETag: "<version>"
+    GET /api/hub-occupancy?since=<version>    -> 그 뒤로 바뀐 허브만
+  If-None-Match 가 같거나 since 가 지금 버전이면 304 (DB 는 버전 두 줄만 읽는다)
+  """
+  version = service.occupancy_version()
+  since = request.args.get("since")
+  etag = f"{version}~{since}" if since else version
+
+  if since == version or request.if_none_match.contains(etag):
+    resp = make_response("", 304)
+  else:
+    data, status = service.hub_occupancy(since=since, version=version)
+    resp = jsonify(data)
+    resp.status_code = status
+
+  resp.set_etag(etag)
+  resp.headers["Cache-Control"] = "no-cache"
+  return resp
+
+
+def _sse(event, payload):
+  data = json.dumps(payload, ensure_ascii=False)
+  return f"id: {payload['version']}\nevent: {event}\ndata: {data}\n\n"
+
+
+@bp.route("/hub-occupancy/stream", methods=["GET"])
+def hub_occupancy_stream():
+  """
+  허브 주차 현황 SSE 피드
+  event: hello (현재 버전) / delta (바뀐 허브만) / reset (허브 목록이 바뀜, 전체)
+  재접속 시 EventSource 가 보내는 Last-Event-ID(=버전) 이후만 이어서 보낸다.
+  열린 스트림이 LIVE_MAX_STREAMS 를 넘으면 503 -> 클라이언트는 폴링으로.
+  """
+  version = service.occupancy_version()
+  since = request.headers.get("Last-Event-ID") or request.args.get("since") or version
+
+  bus = live.get_bus()
+  try:
+    sub = bus.subscribe(since)
+  except live.StreamLimitError as e:
+    resp = jsonify({"error": str(e)})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = "30"
+    return resp
+
+  if since != version:
+    data, _ = service.hub_occupancy(since=since, version=version)
+    sub.push(data)
+  heartbeat = float(current_app.config["LIVE_HEARTBEAT_S"])
+
+  def generate():
+    try:
+      yield "retry: 3000\n" + _sse("hello", {"version": version})
+      while True:
+        item = sub.next(heartbeat)
+        if item is None:
+          yield ": ping\n\n"
+        else:
+          yield _sse(*item)
+    finally:
+      bus.unsubscribe(sub)
+
+  return Response(
+    generate(),
+    mimetype="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+  )
+
+
+@bp.route("/hub-occupancy/stream/stats", methods=["GET"])
+def hub_occupancy_stream_stats():
+  return jsonify(live.get_bus().stats()), 200
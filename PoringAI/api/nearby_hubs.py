@@ -0,0 +1,28 @@
+from flask import request, jsonify
+from .. import service
+from . import bp
+
+
+@bp.route("/nearby-hubs", methods=["GET"])
+def nearby_hubs():
+  """
+  가까운 허브 목록 (haversine 거리, 가까운 순)
+
+  예:
+    GET /api/nearby-hubs?lat=36.0123&lon=129.3210&k=5&r_km=1.0&available_only=1
+  """
+  try:
+    k = max(1, min(int(request.args.get("k", 5)), 50))
+    r_km = request.args.get("r_km")
+    r_km = float(r_km) if r_km else None
+  except ValueError:
+    return jsonify({"error": "k 는 정수, r_km 는 실수여야 합니다."}), 400
+
+  data, status = service.nearby_hubs(
+    request.args.get("lat"),
+    request.args.get("lon"),
+    k=k,
+    radius_km=r_km,
+    available_only=request.args.get("available_only") in ("1", "true"),
+  )
+  return jsonify(data), status
@@ -0,0 +1,56 @@
+from flask import current_app, request, jsonify
+from ..db import get_writer
+from .. import telemetry
+from . import bp
+
+BINARY_TYPE = "application/x-poring-telemetry"
+
+
+def _read_body(limit):
+  """본문을 limit 바이트까지만 읽는다. 넘으면 None (chunked 업로드는 Content-Length 가 없어서)"""
+  chunks, size = [], 0
+  while True:
+    chunk = request.stream.read(min(64 * 1024, limit + 1 - size))
+    if not chunk:
+      return b"".join(chunks)
+    chunks.append(chunk)
+    size += len(chunk)
+    if size > limit:
+      return None
+
+
+@bp.route("/telemetry", methods=["POST"])
+def ingest_telemetry():
+  """
+  자전거 위치/배터리/상태 샘플 일괄 수집
+
+  예:
+    POST /api/telemetry   Content-Type: application/x-ndjson
+      {"bike_id": 7, "ts": 1760000000, "lat": 36.01, "lng": 129.32, "battery": 81, "status": "ok"}
+      {"bike_id": 8, "battery": 12, "status": "low_battery"}
+    POST /api/telemetry   Content-Type: application/x-poring-telemetry  (18바이트 레코드, telemetry.py 참고)
+  """
+  limit = current_app.config["TELEMETRY_MAX_BYTES"]
+  body = None if (request.content_length or 0) > limit else _read_body(limit)
+  if body is None:
+    return jsonify({"error": "요청이 너무 큽니다."}), 413
+
+  window = (current_app.config["TELEMETRY_MAX_PAST_S"], current_app.config["TELEMETRY_MAX_FUTURE_S"])
+  try:
+    if request.mimetype == BINARY_TYPE:
+      samples, errors = telemetry.parse_binary(body, window)
+    else:
+      samples, errors = telemetry.parse_ndjson(body.decode("utf-8"), window)
+  except (ValueError, UnicodeDecodeError) as e:
+    return jsonify({"error": str(e)}), 400
+
+  if len(samples) > current_app.config["TELEMETRY_MAX_SAMPLES"]:
+    return jsonify({"error": f"한 번에 {current_app.config['TELEMETRY_MAX_SAMPLES']} 개까지 받습니다."}), 413
+
+  accepted, unknown = telemetry.ingest(get_writer(), samples) if samples else (0, 0)
+  return jsonify({
+    "accepted": accepted,
+    "rejected": len(errors) + unknown,
+    "unknown_bikes": unknown,
+    "errors": [{"line": no, "error": msg} for no, msg in errors[:telemetry.MAX_ERRORS]],
+  }), 200
@@ -0,0 +1,187 @@
+"""
+채팅 오케스트레이션.
+
+질문 하나를 처리하면서 이벤트를 순서대로 낸다.
+  ("token",  {"text": ...})                      모델/문장 토큰 (오는 대로)
+  ("status", {"message": ...})                   도구 실행 상태 ("허브 확인 중…")
+  ("done",   {"answer": ..., "structured": ...})  최종 답변
+  ("error",  {"message": ...})                   처리 실패
+menu1 의 폼 경로는 done 만 쓰고, /menu1/stream 은 이벤트를 그대로 SSE 로 보낸다.
+
+질문이 허브 하나나 "내 근처"만 분명히 가리키면 gazetteer 가 바로 도구를 고르고
+tool 선택용 LLM 호출을 건너뛴다. ("학생회관 18시쯤" 처럼 시각이 있으면 예측 도구)
+모델이 도구를 여러 개 부르면(예: 허브 두 곳 + 내 근처) DB 조회를 스레드 풀에서
+동시에 돌리고, 결과를 role=tool 메시지로 묶어 후속 호출 한 번으로 답한다.
+대화 기록은 context 가 토큰 예산에 맞춰 자르고(오래된 턴은 요약) 넘긴다.
+"""
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from . import context, gazetteer, llm, metrics, service, tool_schema
+
+def _not_found(structured):
+  msg = structured.get("error")
+  return f"'{structured.get('hub_name')}' 허브를 찾을 수 없어요." + (f"\n[API ERROR] {msg}" if msg else "")
+
+
+def _parse(tool_call):
+  try:
+    return tool_call.function.name, json.loads(tool_call.function.arguments or "{}")
+  except Exception:
+    return None, {}
+
+
+def _status(name, args):
+  if name == "get_available_bikes" and args.get("hub_name"):
+    return f"'{args['hub_name']}' 허브 확인 중…"
+  if name == "get_available_nearby_bikes":
+    return "근처 허브 확인 중…"
+  if name == "get_bike_forecast" and args.get("hub_name"):
+    return f"'{args['hub_name']}' 허브 예상 대수 확인 중…"
+  return None
+
+
+def _execute(name, args, latitude, longitude):
+  """도구 하나를 실행해 결과 dict 를 돌려준다. (app context 안에서 실행)"""
+  with metrics.span("tool"):
+    return _lookup(name, args, latitude, longitude)
+
+
+def _lookup(name, args, latitude, longitude):
+  if name == "get_available_bikes" and args.get("hub_name"):
+    return service.lookup_available_bikes(args["hub_name"])[0]
+  if name == "get_available_nearby_bikes":
+    return service.lookup_available_nearby_bikes(latitude, longitude)[0]
+  if name == "get_bike_forecast" and args.get("hub_name"):
+    return service.lookup_bike_forecast(args["hub_name"], args.get("time"), args.get("day_offset", 0))[0]
+  return {"found": False, "error": "(허브 이름을 추출하지 못했습니다)"}
+
+
+def _execute_all(calls, latitude, longitude):
+  """모든 tool call 을 스레드 풀에서 동시에 실행한다. 결과 순서는 calls 순서."""
+  app = current_app._get_current_object()
+  trace = metrics.current()
+
+  def job(name, args):
+    with app.app_context(), metrics.attached(trace):
+      return _execute(name, args, latitude, longitude)
+
+  if len(calls) == 1:
+    return [_execute(*calls[0][1:], latitude, longitude)]
+  pool = app.extensions["chat_tools"]
+  futures = [pool.submit(job, name, args) for _, name, args in calls]
+  return [f.result() for f in futures]
+
+
+def _follow_up_messages(messages_for_model, tool_calls, results):
+  """tool 프로토콜: assistant(tool_calls) 다음에 호출마다 role=tool 메시지 하나"""
+  return (
+    [{"role": "system", "content": service.SYSTEM_PROMPT}]
+    + messages_for_model
+    + [{
+      "role": "assistant",
+      "content": None,
+      "tool_calls": [
+        {"id": c.id, "type": "function", "function": {"name": c.function.name, "arguments": c.function.arguments}}
+        for c in tool_calls
+      ],
+    }]
+    + [
+      {"role": "tool", "tool_call_id": c.id, "content": json.dumps(r, ensure_ascii=False)}
+      for c, r in zip(tool_calls, results)
+    ]
+  )
+
+
+def run(question, latitude=None, longitude=None, history=(), conversation=None):
+  """질문 하나를 처리하며 (event, payload) 를 낸다. conversation 은 요약 캐시 키 (대화 id)"""
+  try:
+    tools = tool_schema.get_tools()
+    messages_for_model = context.build(question, history, tools, conversation)
+
+    parts, tool_calls = [], None
+    local = gazetteer.route(question)
+    if local is not None:
+      # 허브 이름/“근처”가 확실하면 tool 선택 호출 없이 바로 조회
+      tool_calls = [gazetteer.as_tool_call(local)]
+    else:
+      # GPT에게 질문 보내고 tool 호출 유도 (일반 답변이면 토큰이 바로 흘러간다)
+      t0 = time.perf_counter()
+      for kind, value in llm.stream(messages=messages_for_model, tools=tools, tool_choice="auto"):
+        if kind == "token":
+          parts.append(value)
+          yield "token", {"text": value}
+        else:
+          tool_calls = value
+      if tool_calls:
+        gazetteer.get_stats().record_llm((time.perf_counter() - t0) * 1000)
+
+    if not tool_calls:
+      # 함수 호출이 없으면 일반 텍스트 응답 출력
+      yield "done", {"answer": "".join(parts) or "(응답이 없습니다)", "structured": None}
+      return
+
+    calls = [(c, *_parse(c)) for c in tool_calls]
+    for _, name, args in calls:
+      message = _status(name, args)
+      if message:
+        yield "status", {"message": message}
+
+    # DB 조회는 한 번에 fan-out
+    results = _execute_all(calls, latitude, longitude)
+    metrics.log("tool_results", logging.DEBUG, results=results)
+
+    if len(results) == 1:
+      # 도구가 하나면 캐시된 안내 문장을 그대로 쓸 수 있다 (두 번째 LLM 호출 생략 가능)
+      structured = results[0]
+      if structured.get("error") or not structured.get("found"):
+        if structured.get("found"):
+          answer = structured["error"]   # 허브는 있는데 조회할 값이 없을 때 (예: 예측 전)
+        else:
+          answer = _not_found(structured) if structured.get("hub_name") else structured["error"]
+        yield "token", {"text": answer}
+        yield "done", {"answer": answer, "structured": structured}
+        return
+      if "expected_bikes" in structured:
+        # 예측은 템플릿 문장으로 (LLM 호출 없음)
+        stream = iter([service.forecast_sentence(structured)])
+      else:
+        stream = service.stream_sentence(structured)
+    else:
+      # 여러 허브를 물으면 결과를 한 번에 돌려주고 답변은 한 번만 생성
+      structured = results
+      stream = (
+        value for kind, value in llm.stream(
+          messages=_follow_up_messages(messages_for_model, tool_calls, results), temperature=0.1)
+        if kind == "token"
+      )
+
+    parts = []
+    for text in stream:
+      parts.append(text)
+      yield "token", {"text": text}
+    yield "done", {"answer": "".join(parts) or "(응답이 없습니다)", "structured": structured}
+
+  except Exception as e:
+    yield "error", {"message": f"[ERROR] {type(e).__name__}: {e}"}
+
+
+def answer(question, latitude=None, longitude=None, history=(), conversation=None):
+  """run() 을 끝까지 돌려 최종 답변만 돌려준다. 실패하면 예외."""
+  for event, payload in run(question, latitude, longitude, history, conversation):
+    if event == "done":
+      return payload
+    if event == "error":
+      raise RuntimeError(payload["message"])
+
+
+def init_app(app):
+  app.config.setdefault("CHAT_TOOL_WORKERS", 4)
+  app.extensions["chat_tools"] = ThreadPoolExecutor(
+    max_workers=int(app.config["CHAT_TOOL_WORKERS"]),
+    thread_name_prefix="chat-tool",
+  )
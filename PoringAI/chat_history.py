@@ -0,0 +1,237 @@
+"""
+menu1 대화 기록 (서버 쪽 저장)
+
+세션 쿠키에는 짧은 대화 id(menu1_sid)와 턴 번호(menu1_seq)만 둔다.
+- 원본은 chat_log 의 session_id 줄들. 한 줄 = 한 턴(질문 + 답)
+- 최근 대화는 프로세스 안 LRU(CHAT_HISTORY_CACHE_SIZE)에 메시지 deque 로 들고 있는다.
+- 캐시에 없거나 쿠키의 턴 번호와 다르면(다른 워커가 그 사이 턴을 추가) chat_log 에서 다시 읽는다.
+  읽은 턴 수가 쿠키의 턴 번호보다 적으면(마지막 턴이 아직 log_writer 큐에 있음) 캐시에 넣지 않는다.
+  TTL(CHAT_HISTORY_TTL_SEC)과 개수 제한(CHAT_HISTORY_MAX_MSGS)은 그 SQL 에서 적용한다.
+- chat_log 쓰기는 log_writer 큐로 넘긴다. (응답을 기다리게 하지 않는다)
+- 답은 서버가 만든 것만 기록한다. 스트리밍은 reserve_turn 으로 턴 번호를 먼저 쿠키에 적고,
+  답이 끝나면(중간에 끊겨도) 생성기 안에서 record_turn 한다.
+"""
+import calendar
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+
+from flask import current_app, session
+
+from . import log_writer, metrics
+from .db import get_db
+
+SID_KEY = "menu1_sid"
+SEQ_KEY = "menu1_seq"
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"   # chat_log.logged_at (UTC)
+
+# 최근 limit 턴, 오래된 것부터. logged_at 이 cutoff 보다 이전이면 버린다.
+HISTORY_SQL = '''
+    SELECT user_question, gpt_answer, function_called, logged_at FROM (
+      SELECT chat_id, user_question, gpt_answer, function_called, logged_at FROM chat_log
+       WHERE session_id = ? AND logged_at >= ?
+       ORDER BY chat_id DESC
+       LIMIT ?)
+     ORDER BY chat_id
+    '''
+
+TURNS_SQL = "SELECT COUNT(*) FROM chat_log WHERE session_id = ?"
+
+
+def _utc(ts):
+  return time.strftime(TS_FORMAT, time.gmtime(ts))
+
+
+def _epoch(logged_at):
+  return calendar.timegm(time.strptime(logged_at, TS_FORMAT))
+
+
+def _turn(messages, question, answer, tool, ts):
+  # tool: 답이 도구 결과(자전거 대수 등)로 만들어졌는지. context 가 오래된 것을 뺄 때 쓴다.
+  messages.append({"role": "user", "content": question, "ts": ts})
+  messages.append({"role": "system", "content": answer, "ts": ts, "tool": tool})
+
+
+class _Entry:
+  __slots__ = ("seq", "messages")
+
+  def __init__(self, seq, messages):
+    self.seq = seq
+    self.messages = messages
+
+
+class HistoryStore:
+  def __init__(self, max_msgs=16, ttl=60 * 30, cache_size=1024):
+    self.max_msgs = max_msgs
+    self.ttl = ttl                   # 0 이면 만료 없음
+    self.cache_size = cache_size
+    self._data = OrderedDict()       # sid -> _Entry
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.loads = 0
+    self.partial = 0                 # 아직 기록되지 않은 턴이 있어 캐시하지 않은 로드
+    self.evictions = 0
+
+  def _cutoff(self, now):
+    return now - self.ttl if self.ttl > 0 else 0
+
+  def _load(self, sid, now):
+    """chat_log 에서 최근 메시지와, 지금까지 기록된 턴 수 (TTL 과 상관없이)"""
+    db = get_db()
+    rows = db.execute(HISTORY_SQL, (sid, _utc(self._cutoff(now)), (self.max_msgs + 1) // 2)).fetchall()
+    turns = db.execute(TURNS_SQL, (sid,)).fetchone()[0]
+    messages = deque(maxlen=self.max_msgs)
+    for question, answer, function_called, logged_at in rows:
+      _turn(messages, question, answer, bool(function_called), _epoch(logged_at))
+    return messages, turns
+
+  def _put(self, sid, entry):
+    self._data[sid] = entry
+    self._data.move_to_end(sid)
+    while len(self._data) > self.cache_size:
+      self._data.popitem(last=False)
+      self.evictions += 1
+
+  def get(self, sid, seq):
+    """최근 메시지 목록 (오래된 것부터). seq 는 쿠키에 적힌 턴 번호."""
+    now = int(time.time())
+    with self._lock:
+      entry = self._data.get(sid)
+      if entry is not None and entry.seq == seq:
+        self._data.move_to_end(sid)
+        self.hits += 1
+      else:
+        entry = None
+    if entry is None:
+      messages, turns = self._load(sid, now)
+      entry = _Entry(seq, messages)
+      with self._lock:
+        self.loads += 1
+        if turns >= seq:
+          self._put(sid, entry)
+        else:
+          # 마지막 턴이 아직 큐에 있다 (다른 워커 등). 모자란 기록을 적중으로 돌려주지 않게 캐시하지 않는다.
+          self.partial += 1
+    with self._lock:
+      cutoff = self._cutoff(now)
+      while entry.messages and entry.messages[0]["ts"] < cutoff:
+        entry.messages.popleft()
+      return list(entry.messages)
+
+  def append_turn(self, sid, seq, question, answer, tool, ts):
+    """
+    캐시에 한 턴을 더한다. seq 는 더한 뒤의 턴 번호. (chat_log 쓰기는 호출한 쪽)
+    캐시에 없거나 바로 앞 턴이 아니면 이전 턴을 읽어 와서 넣는다. 방금 쓴 줄이 아직 큐에 있어도 다음 get 이 보게.
+    """
+    with self._lock:
+      entry = self._data.get(sid)
+    if entry is None or entry.seq != seq - 1:
+      if seq == 1:
+        messages, turns = deque(maxlen=self.max_msgs), 0
+      else:
+        messages, turns = self._load(sid, ts)
+      with self._lock:
+        if seq > 1:
+          self.loads += 1
+        if turns < seq - 1:
+          # 이전 턴이 아직 기록되지 않았다. 모자란 기록은 캐시에 두지 않고 다음 get 이 다시 읽게 한다.
+          self.partial += 1
+          self._data.pop(sid, None)
+          return
+        entry = _Entry(seq - 1, messages)
+    with self._lock:
+      entry.seq = seq
+      _turn(entry.messages, question, answer, tool, ts)
+      self._put(sid, entry)
+
+  def stats(self):
+    with self._lock:
+      return {
+        "size": len(self._data),
+        "cache_size": self.cache_size,
+        "hits": self.hits,
+        "loads": self.loads,
+        "partial": self.partial,
+        "evictions": self.evictions,
+      }
+
+
+def get_store(app=None):
+  app = app or current_app
+  return app.extensions["chat_history"]
+
+
+def _sid():
+  sid = session.get(SID_KEY)
+  if sid is None:
+    sid = session[SID_KEY] = secrets.token_urlsafe(9)
+    session[SEQ_KEY] = 0
+  return sid
+
+
+def current_id():
+  """지금 세션의 대화 id (아직 턴이 없으면 None)"""
+  return session.get(SID_KEY)
+
+
+def get_history():
+  """지금 세션의 최근 대화 [{role, content, ts[, tool]}]"""
+  sid = session.get(SID_KEY)
+  if sid is None:
+    return []
+  return get_store().get(sid, session.get(SEQ_KEY, 0))
+
+
+def append_turn(question, answer, function_called=False):
+  """한 턴을 기록한다. 쿠키는 턴 번호만 바뀐다."""
+  sid, seq = reserve_turn()
+  record_turn(sid, seq, question, answer, function_called)
+
+
+def reserve_turn():
+  """
+  다음 턴 번호를 지금 쿠키에 적는다. 반환: (sid, seq)
+  스트리밍처럼 답이 끝나기 전에 응답 헤더(쿠키)가 나가는 경로는 먼저 이것을 부르고 나중에 record_turn 한다.
+  """
+  sid = _sid()
+  seq = session[SEQ_KEY] = session.get(SEQ_KEY, 0) + 1
+  return sid, seq
+
+
+def record_turn(sid, seq, question, answer, function_called=False):
+  """reserve_turn 으로 받은 턴 번호에 한 턴을 기록한다. (세션은 바꾸지 않는다)"""
+  now = int(time.time())
+  question, answer = (question or "").strip(), (answer or "").strip()
+  get_store().append_turn(sid, seq, question, answer, bool(function_called), now)
+  try:
+    log_writer.append(
+      "chat_log",
+      session_id=sid,
+      user_id=session.get("user_id"),
+      user_question=question,
+      gpt_answer=answer,
+      function_called=int(function_called),
+      logged_at=_utc(now),
+    )
+  except log_writer.LogQueueFull as e:
+    metrics.log("log_dropped", logging.WARNING, table="chat_log", error=str(e))
+
+
+def clear():
+  """새 대화로 시작한다. (이전 대화는 chat_log 에 로그로 남는다)"""
+  session.pop(SID_KEY, None)
+  session.pop(SEQ_KEY, None)
+
+
+def init_app(app):
+  app.config.setdefault("CHAT_HISTORY_MAX_MSGS", 16)
+  app.config.setdefault("CHAT_HISTORY_TTL_SEC", 60 * 30)
+  app.config.setdefault("CHAT_HISTORY_CACHE_SIZE", 1024)
+
+  app.extensions["chat_history"] = HistoryStore(
+    max_msgs=int(app.config["CHAT_HISTORY_MAX_MSGS"]),
+    ttl=int(app.config["CHAT_HISTORY_TTL_SEC"]),
+    cache_size=int(app.config["CHAT_HISTORY_CACHE_SIZE"]),
+  )
@@ -0,0 +1,258 @@
+"""
+LLM 에 보낼 대화 문맥을 토큰 예산(CHAT_CONTEXT_TOKENS) 안에 맞춘다.
+
+- 토큰 수는 로컬에서 센다. tiktoken 이 있으면 o200k_base(gpt-4o-mini), 없으면 글자 종류로 어림한다.
+- 예산에서 도구 정의/질문/요약을 빼고, 남은 만큼 최근 턴부터 그대로 넣는다.
+- 들어가지 못한 오래된 턴은 대화마다 롤링 요약 하나로 줄인다. 요약은 프로세스 안 LRU 에 두고,
+  창 밖으로 밀려난 새 턴이 CHAT_SUMMARY_MIN_TURNS 개 이상 쌓였을 때만 백그라운드에서 다시 만든다.
+  (요청은 요약을 기다리지 않고, 그 사이에는 이전 요약을 쓴다)
+- 대화 기록(chat_history)은 최근 CHAT_HISTORY_MAX_MSGS 개만 들고 있어서, 예산 안에 다 들어가도
+  오래된 턴은 곧 기록에서 빠진다. 다음 CHAT_SUMMARY_MIN_TURNS 턴 안에 빠질 턴도 미리 요약에 넣는다.
+- 도구 결과로 만든 답(자전거 대수 등)은 CHAT_TOOL_RESULT_TTL_SEC 가 지나면 그 턴째 뺀다.
+  지난 대수는 모델을 헷갈리게 할 뿐이라 요약에도 넣지 않는다.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from . import llm
+
+# 메시지마다 붙는 역할/구분 토큰, 답변 시작 토큰 (OpenAI 쿡북 기준 어림값)
+MESSAGE_OVERHEAD = 4
+REPLY_OVERHEAD = 3
+
+SUMMARY_PROMPT = (
+  "다음은 자전거 대여 챗봇과 사용자의 이전 대화다. 사용자의 목적, 언급한 장소/허브, 선호를 "
+  "한국어 2~3문장으로 요약하라. 자전거 대수 같은 조회 결과는 넣지 마라."
+)
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+def _encoder():
+  global _encoding
+  if _encoding is None:
+    with _encoding_lock:
+      if _encoding is None:
+        try:
+          import tiktoken
+          _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:   # 설치 안 됐거나 인코딩 파일을 받지 못함
+          _encoding = False
+  return _encoding
+
+
+def count_tokens(text):
+  if not text:
+    return 0
+  enc = _encoder()
+  if enc:
+    return len(enc.encode(text))
+  # o200k 에서 한글 음절은 대개 1 토큰, 나머지는 4글자에 1 토큰 정도
+  hangul = sum(1 for ch in text if "가" <= ch <= "힣")
+  return hangul + (len(text) - hangul + 3) // 4
+
+
+def message_tokens(m):
+  """메시지 하나의 토큰 수. 대화 기록 dict 에는 한 번 센 값을 남겨 둔다."""
+  n = m.get("tokens")
+  if n is None:
+    n = MESSAGE_OVERHEAD + count_tokens(m.get("content"))
+    if "ts" in m:
+      m["tokens"] = n
+  return n
+
+
+_tools_tokens = (None, 0)
+
+def tools_tokens(tools):
+  """도구 정의 토큰 수. get_tools() 는 hub 가 바뀔 때만 새 객체라 그 사이에는 다시 세지 않는다."""
+  global _tools_tokens
+  if not tools:
+    return 0
+  cached, n = _tools_tokens
+  if cached is not tools:
+    n = count_tokens(json.dumps(tools, ensure_ascii=False))
+    _tools_tokens = (tools, n)
+  return n
+
+
+def _truncate(text, max_tokens):
+  n = count_tokens(text)
+  while n > max_tokens:
+    text = text[:max(1, len(text) * max_tokens // n - 1)]
+    n = count_tokens(text)
+  return text
+
+
+class _Summary:
+  __slots__ = ("text", "upto", "tokens")
+
+  def __init__(self, text, upto):
+    self.text = text
+    self.upto = upto   # 이 ts 까지의 턴을 요약했다
+    self.tokens = MESSAGE_OVERHEAD + count_tokens(text)
+
+
+class ContextBuilder:
+  def __init__(self, app, budget=1500, min_new_turns=3, summary_tokens=120,
+               tool_ttl=120, cache_size=1024, history_turns=None):
+    self.app = app
+    self.budget = budget
+    self.min_new_turns = min_new_turns
+    # 이 턴 수보다 오래된 턴은 대화 기록에서 곧 빠진다 (None 이면 기록 길이 제한 없음)
+    self.keep_turns = max(history_turns - min_new_turns, 1) if history_turns else None
+    self.summary_tokens = summary_tokens
+    self.tool_ttl = tool_ttl
+    self.cache_size = cache_size
+    self._summaries = OrderedDict()   # 대화 id -> _Summary
+    self._pending = set()
+    self._lock = threading.Lock()
+    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-summary")
+
+    self.builds = 0
+    self.stale_dropped = 0
+    self.turns_dropped = 0
+    self.refreshes = 0
+    self.refresh_failures = 0
+
+  def build(self, question, history=(), tools=None, conversation=None, now=None):
+    """
+    [요약(system)] + 최근 턴 + 질문. 기록의 ts/tool 같은 부가 필드는 빼고 role/content 만.
+    conversation 이 없으면 요약 없이 예산에 맞는 최근 턴만.
+    """
+    now = time.time() if now is None else now
+    turns, stale = [], 0
+    last = len(history) // 2 - 1
+    for i in range(0, len(history) - 1, 2):
+      q, a = history[i], history[i + 1]
+      if a.get("tool") and now - a.get("ts", 0) > self.tool_ttl:
+        stale += 1
+        continue
+      turns.append((last - i // 2, q, a))   # (몇 턴 전, 질문, 답)
+
+    summary = self._summary(conversation)
+    upto = summary.upto if summary else float("-inf")
+    left = self.budget - REPLY_OVERHEAD - tools_tokens(tools) - MESSAGE_OVERHEAD - count_tokens(question)
+    if summary:
+      left -= summary.tokens
+
+    window, overflow, leaving = [], [], []
+    for age, q, a in reversed(turns):
+      if q.get("ts", 0) <= upto:
+        break   # 이미 요약에 들어간 턴
+      cost = message_tokens(q) + message_tokens(a)
+      if not overflow and cost <= left:
+        window.append((q, a))
+        left -= cost
+        if self.keep_turns is not None and age >= self.keep_turns:
+          leaving.append((q, a))   # 창에는 들어가지만 곧 기록에서 빠진다
+      else:
+        overflow.append((q, a))
+    window.reverse()
+    overflow.reverse()
+    leaving.reverse()
+
+    messages = []
+    if summary:
+      messages.append({"role": "system", "content": f"이전 대화 요약: {summary.text}"})
+    for q, a in window:
+      messages.append({"role": q["role"], "content": q["content"]})
+      messages.append({"role": a["role"], "content": a["content"]})
+    messages.append({"role": "user", "content": question})
+
+    with self._lock:
+      self.builds += 1
+      self.stale_dropped += stale
+      self.turns_dropped += len(overflow)
+    pending = overflow + leaving   # 둘 다 오래된 것부터 (overflow 가 더 오래됐다)
+    if conversation and len(pending) >= self.min_new_turns:
+      self._schedule(conversation, summary, pending)
+    return messages
+
+  def _summary(self, conversation):
+    if not conversation:
+      return None
+    with self._lock:
+      summary = self._summaries.get(conversation)
+      if summary is not None:
+        self._summaries.move_to_end(conversation)
+      return summary
+
+  def _schedule(self, conversation, previous, turns):
+    with self._lock:
+      if conversation in self._pending:
+        return
+      self._pending.add(conversation)
+    self._executor.submit(self._refresh, conversation, previous, turns)
+
+  def _refresh(self, conversation, previous, turns):
+    lines = [f"이전 요약: {previous.text}"] if previous else []
+    for q, a in turns:
+      lines.append(f"사용자: {q['content']}")
+      lines.append(f"챗봇: {a['content']}")
+    try:
+      with self.app.app_context():
+        resp = llm.chat(
+          messages=[{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": "\n".join(lines)}],
+          temperature=0,
+          max_tokens=self.summary_tokens,
+        )
+      text = _truncate((resp.choices[0].message.content or "").strip(), self.summary_tokens)
+      with self._lock:
+        self._summaries[conversation] = _Summary(text, turns[-1][0].get("ts", 0))
+        self._summaries.move_to_end(conversation)
+        while len(self._summaries) > self.cache_size:
+          self._summaries.popitem(last=False)
+        self.refreshes += 1
+    except Exception as e:
+      with self._lock:
+        self.refresh_failures += 1
+      self.app.logger.warning("chat summary refresh failed: %s", e)
+    finally:
+      with self._lock:
+        self._pending.discard(conversation)
+
+  def stats(self):
+    with self._lock:
+      return {
+        "budget": self.budget,
+        "tokenizer": "tiktoken" if _encoder() else "estimate",
+        "summaries": len(self._summaries),
+        "builds": self.builds,
+        "stale_dropped": self.stale_dropped,
+        "turns_dropped": self.turns_dropped,
+        "refreshes": self.refreshes,
+        "refresh_failures": self.refresh_failures,
+      }
+
+
+def get_builder(app=None):
+  app = app or current_app
+  return app.extensions["chat_context"]
+
+
+def build(question, history=(), tools=None, conversation=None):
+  return get_builder().build(question, history, tools, conversation)
+
+
+def init_app(app):
+  app.config.setdefault("CHAT_CONTEXT_TOKENS", 1500)
+  app.config.setdefault("CHAT_SUMMARY_MIN_TURNS", 3)
+  app.config.setdefault("CHAT_SUMMARY_TOKENS", 120)
+  app.config.setdefault("CHAT_TOOL_RESULT_TTL_SEC", 120)
+  app.config.setdefault("CHAT_SUMMARY_CACHE_SIZE", 1024)
+
+  app.extensions["chat_context"] = ContextBuilder(
+    app,
+    budget=int(app.config["CHAT_CONTEXT_TOKENS"]),
+    min_new_turns=int(app.config["CHAT_SUMMARY_MIN_TURNS"]),
+    summary_tokens=int(app.config["CHAT_SUMMARY_TOKENS"]),
+    tool_ttl=float(app.config["CHAT_TOOL_RESULT_TTL_SEC"]),
+    cache_size=int(app.config["CHAT_SUMMARY_CACHE_SIZE"]),
+    history_turns=int(app.config.get("CHAT_HISTORY_MAX_MSGS", 16)) // 2,
+  )
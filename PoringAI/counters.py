@@ -0,0 +1,88 @@
+"""
+허브별 집계 카운터 (hub_counters)
+
+- available_bikes : 허브에 있고 바로 빌릴 수 있는(is_available=1) 자전거 수
+- parked_sum      : 허브에 있는 자전거 수
+- total_sum       : 허브 capacity
+
+bike / hub 트리거가 행이 바뀔 때마다 이전 값을 빼고 새 값을 더한다.
+어떤 경로(대여/반납/잠금/관리자 수정)로 써도 같이 갱신되고, 읽기는 PK 조회 한 번이다.
+check() 는 전체 재집계와 비교하고, rebuild() 는 재집계 값으로 덮어쓴다.
+
+hub_counters 의 값이 바뀌면 data_version('hub_counters') 를 +1 하고
+그 값을 행의 version 에 찍는다. 지도는 "since 이후 version" 인 허브만 받아 간다.
+테이블/트리거는 schema.sql 에 있다. (init-db / migrate-db 가 만들고, 요청 경로에서는 만들지 않는다)
+"""
+import click
+
+from .db import get_db, transaction
+
+# 전체 재집계 (check / rebuild 용, 요청 경로에서는 쓰지 않는다)
+RECOUNT_SQL = '''
+    SELECT h.hub_id,
+           (SELECT COUNT(*) FROM bike b
+             WHERE b.current_hub_id = h.hub_id AND b.is_available = 1) AS available_bikes,
+           (SELECT COUNT(*) FROM bike b WHERE b.current_hub_id = h.hub_id) AS parked_sum,
+           h.capacity AS total_sum
+    FROM hub h
+    '''
+
+
+def rebuild(db):
+  """카운터를 전체 재집계 값으로 덮어쓴다. (한 트랜잭션)"""
+  with db:
+    recount(db)
+
+
+def recount(db):
+  """rebuild 의 본문. 커밋하지 않으므로 열린 트랜잭션 안에서 쓸 수 있다."""
+  db.execute("DELETE FROM hub_counters")
+  db.execute(f"INSERT INTO hub_counters (hub_id, available_bikes, parked_sum, total_sum) {RECOUNT_SQL}")
+
+
+def check(db):
+  """카운터와 전체 재집계가 다른 허브 목록. 비어 있으면 일관됨."""
+  stored = {r["hub_id"]: tuple(r)[1:] for r in db.execute(
+    "SELECT hub_id, available_bikes, parked_sum, total_sum FROM hub_counters").fetchall()}
+  mismatches = []
+  for r in db.execute(RECOUNT_SQL).fetchall():
+    expected = tuple(r)[1:]
+    got = stored.get(r["hub_id"], (0, 0, 0))
+    if got != expected:
+      mismatches.append({"hub_id": r["hub_id"], "counter": got, "recount": expected})
+  return mismatches
+
+
+def get_available(db, hub_id) -> int:
+  row = db.execute("SELECT available_bikes FROM hub_counters WHERE hub_id = ?", (hub_id,)).fetchone()
+  return row["available_bikes"] if row else 0
+
+
+def all_available(db):
+  """{hub_id: available_bikes}"""
+  return {r["hub_id"]: r["available_bikes"] for r in db.execute(
+    "SELECT hub_id, available_bikes FROM hub_counters").fetchall()}
+
+
+def version(db) -> int:
+  """hub_counters 가 마지막으로 바뀐 버전"""
+  row = db.execute("SELECT version FROM data_version WHERE name = 'hub_counters'").fetchone()
+  return row[0] if row else 0
+
+
+@click.command('check-counters')
+@click.option('--repair', is_flag=True, help='다르면 전체 재집계로 덮어쓴다.')
+def check_counters_command(repair):
+  mismatches = check(get_db())
+  for m in mismatches:
+    click.echo(f"hub {m['hub_id']}: counter={m['counter']} recount={m['recount']}")
+  if not mismatches:
+    click.echo('Counters are consistent.')
+  elif repair:
+    with transaction() as db:
+      recount(db)
+    click.echo(f'Rebuilt counters ({len(mismatches)} hubs were off).')
+
+
+def init_app(app):
+  app.cli.add_command(check_counters_command)
@@ -1,24 +1,200 @@
+"""
+SQLite 연결 관리
+
+- WAL + busy_timeout: 읽기가 쓰기(대여/반납)를 기다리지 않는다.
+- 읽기 연결은 풀에 모아 두고 요청마다 빌려 쓴다. (요청 스레드가 바뀌어도 재사용)
+  요청이 끝나면 커밋 안 된 것은 롤백하고 풀에 돌려준다.
+- 쓰기 전용 연결은 하나. get_writer() 가 락을 잡고 요청 끝(teardown)에 놓는다.
+  프로세스 안의 쓰기는 락에서 줄을 서고, 다른 프로세스와는 busy_timeout 으로 기다린다.
+- transaction() 은 writer 를 블록 동안만 잡고 BEGIN IMMEDIATE 로 연다. (상태 전이처럼 짧은 쓰기)
+- cache_size / mmap_size / 문장 캐시(cached_statements) 는 config 로 조정한다.
+- METRICS_ENABLED 면 execute/fetch 시간을 metrics 의 db 구간으로 남기는 연결을 쓴다.
+"""
 import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 
 import click
 from flask import current_app, g
 
+from . import metrics
+
+
+class TracedCursor(sqlite3.Cursor):
+  def execute(self, sql, parameters=()):
+    with metrics.span("db"):
+      return super().execute(sql, parameters)
+
+  def executemany(self, sql, seq_of_parameters):
+    with metrics.span("db"):
+      return super().executemany(sql, seq_of_parameters)
+
+  def fetchone(self):
+    with metrics.span("db"):
+      return super().fetchone()
+
+  def fetchmany(self, size=None):
+    with metrics.span("db"):
+      return super().fetchmany(self.arraysize if size is None else size)
+
+  def fetchall(self):
+    with metrics.span("db"):
+      return super().fetchall()
+
+
+class TracedConnection(sqlite3.Connection):
+  # Connection.execute 는 cursor() 를 거치지 않으므로 따로 덮는다
+  def cursor(self, factory=TracedCursor):
+    return super().cursor(factory)
+
+  def execute(self, sql, parameters=()):
+    return self.cursor().execute(sql, parameters)
+
+  def executemany(self, sql, seq_of_parameters):
+    return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionManager:
+  def __init__(self, path, wal=True, busy_timeout_ms=5000, cache_size_kb=16384,
+               mmap_size=128 * 1024 * 1024, statement_cache=256, pool_size=8,
+               synchronous="NORMAL", traced=False):
+    self.path = path
+    self.wal = wal
+    self.busy_timeout_ms = busy_timeout_ms
+    self.cache_size_kb = cache_size_kb
+    self.mmap_size = mmap_size
+    self.statement_cache = statement_cache
+    self.pool_size = pool_size
+    self.synchronous = synchronous
+    self.traced = traced
+
+    self._idle = deque()
+    self._lock = threading.Lock()
+    self._writer = None
+    self._writer_lock = threading.Lock()
+    self.writer_owner = None   # writer 를 잡고 있는 스레드 id
+    self._wal_set = False
+    self.opened = 0
+
+  def connect(self):
+    db = sqlite3.connect(
+      self.path,
+      detect_types=sqlite3.PARSE_DECLTYPES,
+      timeout=self.busy_timeout_ms / 1000.0,
+      cached_statements=self.statement_cache,
+      check_same_thread=False,   # 풀에서 다른 스레드로 넘겨 쓴다 (동시에 두 스레드가 쓰지는 않는다)
+      factory=TracedConnection if self.traced else sqlite3.Connection,
+    )
+    db.row_factory = sqlite3.Row
+    db.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+    db.execute(f"PRAGMA cache_size = {-int(self.cache_size_kb)}")
+    db.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+    if self.wal and not self._wal_set:
+      # journal_mode 는 DB 파일에 남으므로 한 번만
+      db.execute("PRAGMA journal_mode = WAL")
+      self._wal_set = True
+    if self.wal:
+      db.execute(f"PRAGMA synchronous = {self.synchronous}")
+    self.opened += 1
+    return db
+
+  def acquire(self):
+    with self._lock:
+      if self._idle:
+        return self._idle.pop()
+    return self.connect()
+
+  def release(self, db):
+    if db.in_transaction:
+      db.rollback()
+    with self._lock:
+      if len(self._idle) < self.pool_size:
+        self._idle.append(db)
+        return
+    db.close()
+
+  def acquire_writer(self):
+    self._writer_lock.acquire()
+    self.writer_owner = threading.get_ident()
+    if self._writer is None:
+      self._writer = self.connect()
+    return self._writer
+
+  def release_writer(self):
+    try:
+      if self._writer is not None and self._writer.in_transaction:
+        self._writer.rollback()
+    finally:
+      self.writer_owner = None
+      self._writer_lock.release()
+
+  def close(self):
+    with self._lock:
+      while self._idle:
+        self._idle.pop().close()
+    with self._writer_lock:
+      if self._writer is not None:
+        self._writer.close()
+        self._writer = None
+
+  def stats(self):
+    with self._lock:
+      return {"idle": len(self._idle), "pool_size": self.pool_size, "opened": self.opened}
+
+
+def get_manager(app=None):
+  app = app or current_app
+  return app.extensions["db"]
+
+
 def get_db():
   if 'db' not in g:
-    g.db = sqlite3.connect(
-      current_app.config['DATABASE'],
-      detect_types = sqlite3.PARSE_DECLTYPES
-    )
-    g.db.row_factory = sqlite3.Row
+    g.db = get_manager().acquire()
 
   return g.db
 
+def get_writer():
+  """
+  쓰기 전용 연결. 요청이 끝날 때까지 프로세스 안의 다른 쓰기는 기다린다.
+  커밋은 호출한 쪽에서 한다. (안 하면 teardown 에서 롤백)
+  """
+  if 'db_writer' not in g:
+    g.db_writer = get_manager().acquire_writer()
+
+  return g.db_writer
+
+@contextmanager
+def transaction(app=None):
+  """
+  BEGIN IMMEDIATE ... COMMIT. 예외가 나면 롤백하고 그대로 올린다.
+  시작할 때 쓰기 잠금을 잡으므로 블록 안에서 읽은 값은 커밋할 때까지 다른 writer 가 못 바꾼다.
+  writer 는 블록이 끝나면 바로 놓는다. get_writer() 로 이미 잡은 요청 안에서는 쓸 수 없다. (교착)
+  """
+  manager = get_manager(app)
+  if manager.writer_owner == threading.get_ident():
+    raise RuntimeError("writer 를 잡은 채로 transaction() 을 열면 교착된다.")
+  db = manager.acquire_writer()
+  try:
+    db.execute("BEGIN IMMEDIATE")
+    try:
+      yield db
+    except BaseException:
+      db.rollback()
+      raise
+    db.commit()
+  finally:
+    manager.release_writer()
+
 def close_db(e=None):
   db = g.pop('db', None)
 
   if db is not None:
-    db.close()
+    get_manager().release(db)
+
+  if g.pop('db_writer', None) is not None:
+    get_manager().release_writer()
 
 
 def init_db():
@@ -37,5 +213,24 @@ sqlite3.register_converter(
 )
 
 def init_app(app):
+    app.config.setdefault('DB_WAL', True)
+    app.config.setdefault('DB_BUSY_TIMEOUT_MS', 5000)
+    app.config.setdefault('DB_CACHE_SIZE_KB', 16384)
+    app.config.setdefault('DB_MMAP_SIZE', 128 * 1024 * 1024)
+    app.config.setdefault('DB_STATEMENT_CACHE', 256)
+    app.config.setdefault('DB_POOL_SIZE', 8)
+    app.config.setdefault('DB_SYNCHRONOUS', 'NORMAL')
+
+    app.extensions['db'] = ConnectionManager(
+      app.config['DATABASE'],
+      wal=app.config['DB_WAL'],
+      busy_timeout_ms=app.config['DB_BUSY_TIMEOUT_MS'],
+      cache_size_kb=app.config['DB_CACHE_SIZE_KB'],
+      mmap_size=app.config['DB_MMAP_SIZE'],
+      statement_cache=app.config['DB_STATEMENT_CACHE'],
+      pool_size=app.config['DB_POOL_SIZE'],
+      synchronous=app.config['DB_SYNCHRONOUS'],
+      traced=bool(app.config.get('METRICS_ENABLED')),
+    )
     app.teardown_appcontext(close_db)
-    app.cli.add_command(init_db_command)
\ No newline at end of file
+    app.cli.add_command(init_db_command)
@@ -0,0 +1,150 @@
+"""
+허브별 수요 예측 (hub_forecast)
+
+flask fit-forecast 가 (cron 등으로 매시 한 번) 라이딩 이력에서
+1) 최근 FORECAST_WEEKS 주의 허브 x 시간(현지 시각) 대여/반납 행렬을 만든다. (np.bincount)
+2) 허브 x 요일·시각(hour-of-week, 월 00시 = 0 ... 일 23시 = 167) 평균을 낸다.
+   최근 주일수록 무겁게(FORECAST_DECAY 배씩), 관측된 시간만 평균에 넣는다.
+3) 지금 이용가능 대수에서 시작해 앞으로 168시간 동안 (반납 - 대여) 평균을 더해 가며
+   각 시각의 예상 대수를 만든다. (0 ~ capacity 로 자른다)
+4) hub_forecast(hub_id, how) 에 통째로 바꿔 쓴다. (테이블은 schema.sql)
+챗봇의 get_bike_forecast 는 (허브, 요일·시각) PK 조회 한 번으로 답한다.
+"""
+import time
+
+import click
+import numpy as np
+from flask import current_app
+
+from . import pricing, rebalancing
+from .db import get_db, transaction
+
+HOURS = 168
+
+RIDES_SQL = "SELECT start_hub_id, start_at, end_hub_id, end_at FROM ride WHERE ride_id >= ? AND start_at < ?"
+
+COUNTERS_SQL = "SELECT hub_id, available_bikes, total_sum FROM hub_counters ORDER BY hub_id"
+
+LOOKUP_SQL = "SELECT at, bikes, pickups, dropoffs, fitted_at FROM hub_forecast WHERE hub_id = ? AND how = ?"
+
+
+def _ts(seconds):
+  return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds))
+
+
+def hour_of_week(seconds, offset_s):
+  """유닉스 초 -> 현지 요일·시각 (1970-01-01 은 목요일)"""
+  return ((np.asarray(seconds) + offset_s) // 3600 + 72) % HOURS
+
+
+def hourly(ids, hub_ids, seconds, first_hour, n_hours):
+  """허브 x 시간 건수 행렬. first_hour 는 시작 시간 번호(유닉스 초 // 3600)"""
+  pos = np.searchsorted(ids, hub_ids)
+  hour = seconds // 3600 - first_hour
+  ok = (pos < len(ids)) & (hour >= 0) & (hour < n_hours)
+  ok[ok] &= ids[pos[ok]] == hub_ids[ok]
+  flat = np.bincount(pos[ok] * n_hours + hour[ok], minlength=len(ids) * n_hours)
+  return flat.reshape(len(ids), n_hours)
+
+
+def seasonal(counts, first_hour, offset_s, decay, observed=0):
+  """
+  허브 x 시간 행렬 -> 허브 x 요일·시각 가중 평균 (최근 주일수록 무겁게).
+  앞쪽 observed 시간 전(이력이 시작되기 전)은 평균에 넣지 않는다.
+  """
+  n_hours = counts.shape[1]
+  how = hour_of_week(np.arange(first_hour, first_hour + n_hours) * 3600, offset_s)
+  age = (n_hours - 1 - np.arange(n_hours)) // HOURS    # 0 = 가장 최근 주
+  weight = np.where(np.arange(n_hours) >= observed, decay ** age.astype(float), 0.0)
+  num = np.zeros((counts.shape[0], HOURS))
+  np.add.at(num.T, how, (counts * weight).T)
+  den = np.bincount(how, weights=weight, minlength=HOURS)
+  return num / np.where(den > 0, den, 1)
+
+
+def project(start, capacity, net):
+  """
+  지금 대수에서 시작해 한 시간씩 순유입 평균을 더한 예상 대수 (허브 x 시간).
+  capacity 가 있는 허브는 0 ~ capacity 로 자른다.
+  """
+  out = np.empty_like(net)
+  level = start.astype(float)
+  cap = np.where(capacity > 0, capacity, np.inf)
+  for k in range(net.shape[1]):
+    out[:, k] = level
+    level = np.clip(level + net[:, k], 0, cap)
+  return out
+
+
+def fit(now=None, weeks=None, decay=None):
+  """예측을 다시 만들어 hub_forecast 에 쓴다. 반환: 통계 dict"""
+  cfg = current_app.config
+  offset_s = cfg["PRICING_UTC_OFFSET_S"]
+  weeks = int(weeks or cfg["FORECAST_WEEKS"])
+  decay = float(decay if decay is not None else cfg["FORECAST_DECAY"])
+  now = int(time.time() if now is None else now)
+  t0 = time.perf_counter()
+  db = get_db()
+
+  this_hour = now // 3600
+  first_hour = this_hour - weeks * HOURS
+  rows = db.execute(RIDES_SQL, (rebalancing.first_ride_since(db, _ts(first_hour * 3600)),
+                                _ts(this_hour * 3600))).fetchall()
+  occ = db.execute(COUNTERS_SQL).fetchall()
+  t1 = time.perf_counter()
+
+  ids = np.array([r[0] for r in occ], dtype=np.int64)
+  n_hours = this_hour - first_hour
+  starts = pricing.epochs([r[1] for r in rows])
+  ended = [(r[2] or 0, r[3]) for r in rows if r[3] is not None]
+  pickups = hourly(ids, np.array([r[0] or 0 for r in rows], dtype=np.int64), starts, first_hour, n_hours)
+  dropoffs = hourly(ids, np.array([h for h, _ in ended], dtype=np.int64),
+                    pricing.epochs([e for _, e in ended]), first_hour, n_hours)
+  observed = max(0, int(starts.min() // 3600 - first_hour)) if len(starts) else n_hours
+  mean_pick = seasonal(pickups, first_hour, offset_s, decay, observed)
+  mean_drop = seasonal(dropoffs, first_hour, offset_s, decay, observed)
+
+  # 앞으로 168 시간을 지금 시각부터 요일·시각 순서로
+  ahead = np.arange(this_hour, this_hour + HOURS)
+  how = hour_of_week(ahead * 3600, offset_s)
+  bikes = project(np.array([r[1] for r in occ]), np.array([r[2] for r in occ]),
+                  (mean_drop - mean_pick)[:, how])
+  t2 = time.perf_counter()
+
+  out = [(hub, int(h), int(a) * 3600, round(float(b), 2), round(float(p), 3), round(float(d), 3), now)
+         for i, hub in enumerate(ids.tolist())
+         for h, a, b, p, d in zip(how, ahead, bikes[i], mean_pick[i, how], mean_drop[i, how])]
+  with transaction() as db:
+    db.execute("DELETE FROM hub_forecast")
+    db.executemany("INSERT INTO hub_forecast (hub_id, how, at, bikes, pickups, dropoffs, fitted_at) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?)", out)
+  return {
+    "rides": len(rows), "hubs": len(ids), "weeks": weeks, "rows": len(out),
+    "read_s": round(t1 - t0, 3), "fit_s": round(t2 - t1, 3), "seconds": round(time.perf_counter() - t0, 3),
+  }
+
+
+def lookup(db, hub_id, at):
+  """
+  (허브, 시각) 의 예측 한 행 또는 None. (아직 fit 전이면 None)
+  같은 요일·시각이라도 그 시각을 예측한 행이 아니면(fit 이 오래됐거나 168시간 밖) None.
+  """
+  how = int(hour_of_week(at, current_app.config["PRICING_UTC_OFFSET_S"]))
+  row = db.execute(LOOKUP_SQL, (hub_id, how)).fetchone()
+  if row is None or row["at"] != int(at) // 3600 * 3600:
+    return None
+  return row
+
+
+@click.command('fit-forecast')
+@click.option('--weeks', type=int, default=None, help='학습에 쓸 최근 주 수 (기본 FORECAST_WEEKS)')
+@click.option('--decay', type=float, default=None, help='한 주 전마다 곱하는 가중치 (기본 FORECAST_DECAY)')
+def fit_forecast_command(weeks, decay):
+  for k, v in fit(weeks=weeks, decay=decay).items():
+    click.echo(f'{k}: {v}')
+
+
+def init_app(app):
+  app.config.setdefault("FORECAST_WEEKS", 8)
+  app.config.setdefault("FORECAST_DECAY", 0.7)
+  app.cli.add_command(fit_forecast_command)
@@ -0,0 +1,245 @@
+"""
+허브 이름 사전(gazetteer) + 로컬 의도 라우터.
+
+대부분의 질문은 허브 이름 하나("학생회관 자전거 몇 대?")나 "내 근처"만 묻는다.
+이런 질문은 gpt 로 hub_name 을 뽑을 필요 없이 바로 조회로 보낸다.
+- 정확한 이름, 별칭(ALIASES), 띄어쓰기 변형("학생 회관"), 초성("ㅎㅅㅎㄱ")
+- 허브가 딱 하나이거나 "근처"만 있을 때만 확정, 애매하면 None -> 모델로 넘긴다
+- "학생회관 18시쯤" 처럼 시각이 있으면 허브 하나일 때만 예측 도구(get_bike_forecast)로
+"""
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from flask import current_app
+
+from . import repository, versioning
+
+CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+
+# 캠퍼스에서 흔히 쓰는 줄임말 -> 허브 이름 (허브가 DB 에 있을 때만 쓰인다)
+ALIASES = {
+  "무은재": "무은재기념관",
+  "학관": "학생회관",
+  "환공": "환경공학동",
+  "환경공학관": "환경공학동",
+  "도서관": "박태준학술정보관",
+  "박태준도서관": "박태준학술정보관",
+  "학술정보관": "박태준학술정보관",
+  "친환경": "친환경소재대학원",
+  "1실험동": "제1실험동",
+  "기계동": "기계실험동",
+  "가속기": "가속기IBS",
+  "ibs": "가속기IBS",
+}
+
+NEARBY_WORDS = ("근처", "주변", "가까운", "가까이", "내위치", "여기")
+# 지금 대수를 묻는 질문인지 (다른 걸 물으면 모델로)
+AVAILABILITY_WORDS = ("자전거", "몇대", "몇개", "대수", "남아", "남았", "빌릴", "대여", "있어", "있나", "있니", "있음", "재고")
+# 나중/다른 시각을 묻는 질문은 현재 대수로 답하면 안 된다
+# (공백을 지운 뒤 비교하므로 "30분 뒤" 도 "분뒤" 에 걸린다)
+UNSURE_WORDS = ("나중", "이따", "어제", "시간후", "분후", "시간뒤", "분뒤", "잠시후", "조금뒤", "있다가", "지나서",
+                "어디", "가는길", "반납")
+# 시각을 묻는 말. 시각을 읽어 내면 예측 도구로, 못 읽으면 모델로
+TIME_WORDS = ("내일", "모레", "시에", "시쯤", "시경")
+DAY_WORDS = {"오늘": 0, "내일": 1, "모레": 2}
+PM_WORDS = ("오후", "저녁", "밤")
+AM_WORDS = ("오전", "아침", "새벽")
+TIME_RE = re.compile(r"(오전|오후|아침|저녁|새벽|밤)?\s*(?<!\d)(\d{1,2})\s*(?::\s*(\d{2})|시(?!간)(?:\s*(\d{1,2})\s*분|\s*(반))?)")
+
+_NOISE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize(text):
+  """공백/문장부호 제거 + 소문자"""
+  return _NOISE.sub("", text or "").lower()
+
+
+def parse_when(question, local_minutes=None):
+  """
+  "18시쯤", "오후 6시 반", "내일 8:30" -> ('HH:MM', 며칠 뒤). 시각이 없으면 None.
+  "밤/저녁 12시", "24시" 는 그날 밤 자정(다음 날 00:00)으로 본다.
+  오전/오후 없이 0~12시면 local_minutes(지금 현지 시각, 분) 기준으로 오늘 h시, 오늘 h+12시, 내일 h시 중
+  아직 안 지난(30분 여유) 가장 가까운 때를 고른다. ("12시" 는 정오, 자정, 내일 정오 / "0시" 는 오늘, 내일 자정)
+  """
+  m = TIME_RE.search(question or "")
+  if not m:
+    return None
+  part, hour = m.group(1), int(m.group(2))
+  minute = int(m.group(3) or m.group(4) or 0) + (30 if m.group(5) else 0)
+  if hour > 24 or minute >= 60:
+    return None
+  day = max((d for w, d in DAY_WORDS.items() if w in question), default=0)
+  if part in PM_WORDS and hour < 12:
+    hour += 12
+  elif part in ("저녁", "밤") and hour == 12:
+    hour = 24
+  elif part in AM_WORDS and hour == 12:
+    hour = 0
+  elif part is None and hour <= 12 and day == 0 and local_minutes is not None:
+    at = hour * 60 + minute
+    later = (1440,) if hour == 0 else (720, 1440)
+    at = next(t for t in (at, *(at + d for d in later)) if t >= local_minutes - 30)
+    hour, day = at % 1440 // 60, at // 1440
+  return f"{hour % 24:02d}:{minute:02d}", day + hour // 24
+
+
+def chosung(text):
+  out = []
+  for ch in text:
+    code = ord(ch) - 0xAC00
+    if 0 <= code < 11172:
+      out.append(CHOSUNG[code // 588])
+    else:
+      out.append(ch.lower())
+  return "".join(out)
+
+
+class Gazetteer:
+  def __init__(self, hub_names):
+    self.hub_names = list(hub_names)
+    self.keys = {}       # 정규화된 이름/별칭 -> hub_name
+    self.chosung = {}    # 초성 문자열 -> hub_name (겹치면 None)
+
+    for name in self.hub_names:
+      self.keys[normalize(name)] = name
+      m = re.fullmatch(r"생활관(\d+)동", name)
+      if m:
+        self.keys.setdefault(f"{m.group(1)}동", name)
+        self.keys.setdefault(f"rc{m.group(1)}", name)
+      key = chosung(normalize(name))
+      self.chosung[key] = None if key in self.chosung else name
+
+    for alias, name in ALIASES.items():
+      if name in self.hub_names:
+        self.keys.setdefault(normalize(alias), name)
+
+    # 긴 키부터 매칭해서 "생활관21동" 안의 "21동" 이 따로 잡히지 않게 한다
+    self._ordered = sorted(self.keys, key=len, reverse=True)
+
+  def find_hubs(self, question):
+    """질문에 나온 허브 이름들 (중복 제거, 등장 순서)"""
+    text = normalize(question)
+    found, taken = [], [False] * len(text)
+    for key in self._ordered:
+      start = text.find(key)
+      while start >= 0:
+        end = start + len(key)
+        if not any(taken[start:end]):
+          taken[start:end] = [True] * len(key)
+          found.append((start, self.keys[key]))
+        start = text.find(key, end)
+
+    # 초성만 쓴 토큰 ("ㅎㅅㅎㄱ", "ㅅㅎㄱ21ㄷ")
+    for token in re.findall(r"[ㄱ-ㅎ0-9a-zA-Z]*[ㄱ-ㅎ][ㄱ-ㅎ0-9a-zA-Z]*", question or ""):
+      name = self.chosung.get(token.lower())
+      if name:
+        found.append((len(text), name))
+
+    names = []
+    for _, name in sorted(found):
+      if name not in names:
+        names.append(name)
+    return names
+
+  def route(self, question, local_minutes=None):
+    """
+    확실하면 SimpleNamespace(name=도구 이름, args=...) 를, 애매하면 None.
+    local_minutes 는 지금 현지 시각(분), "6시" 가 오전인지 오후인지 고를 때 쓴다.
+    """
+    text = normalize(question)
+    if not text or any(w in text for w in UNSURE_WORDS):
+      return None
+    when = parse_when(question, local_minutes)
+    if when is None and any(w in text for w in TIME_WORDS):
+      return None
+    if not any(w in text for w in AVAILABILITY_WORDS):
+      return None
+
+    hubs = self.find_hubs(question)
+    nearby = any(w in text for w in NEARBY_WORDS)
+    if when is not None:
+      if len(hubs) == 1 and not nearby:
+        return SimpleNamespace(name="get_bike_forecast",
+                               args={"hub_name": hubs[0], "time": when[0], "day_offset": when[1]})
+      return None
+    if len(hubs) == 1 and not nearby:
+      return SimpleNamespace(name="get_available_bikes", args={"hub_name": hubs[0]})
+    if nearby and not hubs:
+      return SimpleNamespace(name="get_available_nearby_bikes", args={})
+    return None
+
+
+class RouterStats:
+  """로컬 라우터 적중률과, 건너뛴 tool 선택 호출로 아낀 시간(추정)"""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.questions = 0
+    self.resolved = 0
+    self.llm_calls = 0
+    self.llm_ms_avg = 0.0   # tool 선택 호출의 지수 이동 평균
+    self.saved_ms = 0.0
+
+  def record(self, resolved):
+    with self._lock:
+      self.questions += 1
+      if resolved:
+        self.resolved += 1
+        self.saved_ms += self.llm_ms_avg
+
+  def record_llm(self, elapsed_ms):
+    with self._lock:
+      self.llm_calls += 1
+      alpha = 1.0 if self.llm_calls == 1 else 0.1
+      self.llm_ms_avg += alpha * (elapsed_ms - self.llm_ms_avg)
+
+  def stats(self):
+    with self._lock:
+      return {
+        "questions": self.questions,
+        "resolved": self.resolved,
+        "resolved_ratio": round(self.resolved / self.questions, 4) if self.questions else 0.0,
+        "tool_selection_llm_ms_avg": round(self.llm_ms_avg, 2),
+        "saved_ms_total": round(self.saved_ms, 1),
+      }
+
+
+def get_gazetteer():
+  """허브 목록으로 만든 사전 (hub 버전이 바뀔 때만 다시 만든다)"""
+  return versioning.cached("hub", "gazetteer", _build)
+
+
+def _build(db):
+  return Gazetteer(h.hub_name for h in repository.hubs(db))
+
+
+def get_stats(app=None):
+  app = app or current_app
+  return app.extensions["gazetteer"]["stats"]
+
+
+def route(question):
+  """chat 에서 쓰는 진입점. 라우터가 꺼져 있으면 항상 None."""
+  if not current_app.config["CHAT_LOCAL_ROUTER"]:
+    return None
+  local = time.time() + current_app.config["PRICING_UTC_OFFSET_S"]
+  r = get_gazetteer().route(question, local_minutes=int(local % 86400 // 60))
+  get_stats().record(r is not None)
+  return r
+
+
+def as_tool_call(r, seq=1):
+  """route() 결과를 모델의 tool_call 과 같은 모양으로"""
+  return SimpleNamespace(
+    id=f"call_local_{seq}",
+    type="function",
+    function=SimpleNamespace(name=r.name, arguments=json.dumps(r.args, ensure_ascii=False)),
+  )
+
+
+def init_app(app):
+  app.config.setdefault("CHAT_LOCAL_ROUTER", True)
+  app.extensions["gazetteer"] = {"stats": RouterStats()}
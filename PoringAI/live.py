@@ -0,0 +1,160 @@
+"""
+허브 주차 현황 실시간 피드 (프로세스 안 pub/sub)
+
+- 대여/반납/잠금 경로가 커밋 후 publish() 를 부른다. (service.notify_availability_changed)
+- 워커 스레드 하나가 LIVE_DEBOUNCE_MS 동안 모은 뒤 hub_counters 버전으로
+  "지난번 이후 바뀐 허브"만 한 번 읽어 구독자들에게 나눠 준다.
+  같은 허브가 여러 번 바뀌어도 최신 값 한 줄만 나간다.
+- 구독자 큐도 hub_id 로 덮어쓰므로 느린 클라이언트에게 쌓이지 않는다.
+- 다른 워커 프로세스의 쓰기는 LIVE_POLL_S 마다 버전을 확인해서 잡는다.
+- 워커당 열린 스트림 수는 LIVE_MAX_STREAMS 로 제한한다.
+"""
+import threading
+import time
+
+from flask import current_app
+
+
+class StreamLimitError(Exception):
+  """열린 스트림이 LIVE_MAX_STREAMS 개를 넘었을 때"""
+
+
+class Subscriber:
+  def __init__(self, version):
+    self.version = version
+    self.pending = {}       # hub_id -> 최신 허브 행
+    self.reset = None       # 허브 목록이 바뀌면 전체 목록
+    self._cond = threading.Condition()
+    self.closed = False
+
+  def push(self, data):
+    with self._cond:
+      if data["full"]:
+        self.reset, self.pending = data["hubs"], {}
+      else:
+        for h in data["hubs"]:
+          self.pending[h["hub_id"]] = h
+      self.version = data["version"]
+      self._cond.notify()
+
+  def next(self, timeout):
+    """(event, payload) 하나. timeout 동안 없으면 None (heartbeat 용)"""
+    with self._cond:
+      if self.reset is None and not self.pending and not self.closed:
+        self._cond.wait(timeout)
+      if self.reset is not None:
+        hubs, self.reset = self.reset, None
+        return "reset", {"version": self.version, "hubs": hubs}
+      if self.pending:
+        hubs, self.pending = list(self.pending.values()), {}
+        return "delta", {"version": self.version, "hubs": hubs}
+      return None
+
+  def close(self):
+    with self._cond:
+      self.closed = True
+      self._cond.notify()
+
+
+class ChangeBus:
+  def __init__(self, app, debounce_s, poll_s, max_streams):
+    self.app = app
+    self.debounce_s = debounce_s
+    self.poll_s = poll_s
+    self.max_streams = max_streams
+    self._subs = set()
+    self._lock = threading.Lock()
+    self._wake = threading.Event()
+    self._thread = None
+    self.version = None
+    self.published = 0
+    self.broadcasts = 0
+
+  def publish(self):
+    """쓰기 커밋 후 호출. 실제 조회는 워커가 디바운스 후에 한 번만 한다."""
+    self.published += 1
+    self._wake.set()
+
+  def subscribe(self, version):
+    with self._lock:
+      if len(self._subs) >= self.max_streams:
+        raise StreamLimitError(f"live streams limit {self.max_streams}")
+      sub = Subscriber(version)
+      self._subs.add(sub)
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._loop, name="live-bus", daemon=True)
+        self._thread.start()
+    return sub
+
+  def unsubscribe(self, sub):
+    sub.close()
+    with self._lock:
+      self._subs.discard(sub)
+
+  def stats(self):
+    with self._lock:
+      return {
+        "streams": len(self._subs),
+        "max_streams": self.max_streams,
+        "published": self.published,
+        "broadcasts": self.broadcasts,
+        "version": self.version,
+      }
+
+  def _loop(self):
+    while True:
+      self._wake.wait(self.poll_s)
+      if self._wake.is_set():
+        time.sleep(self.debounce_s)   # 몰려오는 커밋을 한 번으로 합친다
+      self._wake.clear()
+      with self._lock:
+        subs = list(self._subs)
+      if not subs:
+        self.version = None
+        continue
+      try:
+        self._broadcast(subs)
+      except Exception as e:
+        self.app.logger.warning("live bus broadcast failed: %s", e)
+
+  def _broadcast(self, subs):
+    from . import service
+
+    with self.app.app_context():
+      version = service.occupancy_version()
+      if version == self.version:
+        return
+      # 구독자마다 since 가 다를 수 있으니 버전별로 한 번씩만 읽는다
+      by_since = {}
+      for sub in subs:
+        if sub.version != version:
+          by_since.setdefault(sub.version, []).append(sub)
+      for since, group in by_since.items():
+        data, _ = service.hub_occupancy(since=since, version=version)
+        for sub in group:
+          sub.push(data)
+    self.version = version
+    self.broadcasts += 1
+
+
+def get_bus(app=None):
+  app = app or current_app
+  return app.extensions["live"]
+
+
+def publish(app=None):
+  get_bus(app).publish()
+
+
+def init_app(app):
+  app.config.setdefault("LIVE_DEBOUNCE_MS", 250)
+  app.config.setdefault("LIVE_POLL_S", 2.0)
+  app.config.setdefault("LIVE_HEARTBEAT_S", 15.0)
+  app.config.setdefault("LIVE_MAX_STREAMS", 64)
+
+  app.extensions["live"] = ChangeBus(
+    app,
+    debounce_s=float(app.config["LIVE_DEBOUNCE_MS"]) / 1000.0,
+    poll_s=float(app.config["LIVE_POLL_S"]),
+    max_streams=int(app.config["LIVE_MAX_STREAMS"]),
+  )
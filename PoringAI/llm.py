@@ -0,0 +1,299 @@
+"""
+LLM 게이트웨이.
+
+앱 전체가 하나의 오래 사는 클라이언트(커넥션 풀 + keep-alive)를 공유한다.
+- 호출마다 timeout
+- 재시도(지수 백오프 + jitter), 최대 LLM_MAX_RETRIES 번
+- 전역 동시 호출 수 제한 (LLM_MAX_CONCURRENCY)
+- 백엔드 교체 가능: "openai" | "mock" (OPENAI_MOCK=1 이면 mock 이 기본)
+
+사용:
+  from . import llm
+  resp = llm.chat(messages=[...], tools=tools, tool_choice="auto")
+  for kind, value in llm.stream(messages=[...]): ...
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from flask import current_app
+
+from . import metrics
+
+MODEL = "gpt-4o-mini"
+
+
+class LLMBusyError(RuntimeError):
+  """동시 호출 제한에 걸려 timeout 안에 슬롯을 얻지 못함"""
+
+
+class OpenAIBackend:
+  """실제 OpenAI API. 클라이언트 하나를 앱 수명 동안 재사용한다."""
+
+  def __init__(self, api_key=None, base_url=None, timeout=20.0, max_connections=8, traced=False):
+    import httpx
+    import openai
+    from openai import OpenAI, DefaultHttpxClient
+
+    self.client = OpenAI(
+      api_key=api_key,
+      base_url=base_url,
+      timeout=timeout,
+      max_retries=0,  # 재시도는 게이트웨이가 직접 한다
+      http_client=DefaultHttpxClient(
+        limits=httpx.Limits(
+          max_connections=max_connections,
+          max_keepalive_connections=max_connections,
+          keepalive_expiry=60,
+        ),
+        event_hooks=metrics.httpx_hooks() if traced else None,
+      ),
+    )
+    self.retriable = (
+      openai.APIConnectionError,  # APITimeoutError 포함
+      openai.RateLimitError,
+      openai.InternalServerError,
+    )
+
+  def create(self, timeout, **kwargs):
+    return self.client.chat.completions.create(timeout=timeout, **kwargs)
+
+
+class MockBackend:
+  """
+  네트워크 없이 OpenAI 응답 모양을 흉내 내는 로컬 대역.
+  - tools 가 있으면 질문에서 허브 이름/“근처”를 모두 찾아 tool_call 들을 만든다.
+  - 마지막 메시지가 role=tool 이면 도구 결과들을 한 문단으로 요약한다.
+  - tools 가 없으면 "허브이름 : X, 자전거 개수 : N" 프롬프트를 한 문장으로 바꾼다.
+  latency_s 로 호출 지연을 흉내 내서 처리량을 오프라인으로 잴 수 있다.
+  """
+  retriable = ()
+  NEARBY_WORDS = ("근처", "주변", "가까운")
+
+  def __init__(self, latency_s=0.0):
+    self.latency_s = latency_s
+    self._seq = 0
+
+  def create(self, timeout, messages, tools=None, stream=False, **kwargs):
+    resp = self._complete(timeout, messages, tools)
+    return self._chunks(resp) if stream else resp
+
+  def _complete(self, timeout, messages, tools):
+    if self.latency_s:
+      time.sleep(min(self.latency_s, timeout or self.latency_s))
+    question = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+
+    if messages and messages[-1].get("role") == "tool":
+      return self._response(self._summarize_tools(messages))
+
+    if tools:
+      calls = self._pick_tools(question, tools)
+      if calls:
+        return self._response(None, calls)
+      return self._response(f"[MOCK] {question}")
+
+    m = re.search(r"허브이름\s*:\s*(.+?),\s*자전거 개수\s*:\s*(\d+)", question)
+    if m:
+      text = f"{m.group(1)}에 이용 가능한 자전거가 {m.group(2)}대 있어요."
+      alt = re.search(r"대안 허브\s*:\s*(.+?) \(자전거 (\d+)대", question)
+      if alt:
+        text += f" 가까운 {alt.group(1)}에는 {alt.group(2)}대 있어요."
+      return self._response(text)
+    return self._response(f"[MOCK] {question}")
+
+  def _pick_tools(self, question, tools):
+    by_name = {t["function"]["name"]: t["function"] for t in tools}
+    calls = []
+
+    fn = by_name.get("get_available_bikes")
+    if fn:
+      prop = fn.get("parameters", {}).get("properties", {}).get("hub_name", {})
+      names = prop.get("enum") or re.findall(r"[0-9A-Za-z가-힣&]{3,}", prop.get("description", ""))
+      hits = [n for n in set(names) if n in question]
+      # "생활관21동" 이 잡히면 그 안의 짧은 이름은 버린다
+      hits = [n for n in hits if not any(n != o and n in o for o in hits)]
+      for n in sorted(hits, key=question.index):
+        calls.append(self._tool_call("get_available_bikes", {"hub_name": n}))
+
+    if "get_available_nearby_bikes" in by_name and any(w in question for w in self.NEARBY_WORDS):
+      calls.append(self._tool_call("get_available_nearby_bikes", {}))
+    return calls
+
+  @staticmethod
+  def _summarize_tools(messages):
+    """role=tool 결과들을 한 문단으로"""
+    lines = []
+    for m in messages:
+      if m.get("role") != "tool":
+        continue
+      try:
+        r = json.loads(m.get("content") or "{}")
+      except ValueError:
+        continue
+      if r.get("found") and "expected_bikes" in r:
+        lines.append(f"{r['hub_name']}에는 {r['day']} {r['time']}쯤 자전거가 약 {r['expected_bikes']}대 있을 거예요.")
+      elif r.get("found") and not r.get("error"):
+        lines.append(f"{r['hub_name']}에 이용 가능한 자전거가 {r['available_bikes']}대 있어요.")
+      else:
+        lines.append(r.get("error") or "조회하지 못했어요.")
+    return " ".join(lines)
+
+  @staticmethod
+  def _chunks(resp, size=4):
+    """완성된 응답을 스트리밍 청크 모양으로 잘라서 돌려준다."""
+    msg = resp.choices[0].message
+    if msg.tool_calls:
+      calls = [
+        SimpleNamespace(index=i, id=c.id, type="function", function=c.function)
+        for i, c in enumerate(msg.tool_calls)
+      ]
+      yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None, tool_calls=calls))])
+      return
+    text = msg.content or ""
+    for i in range(0, len(text), size):
+      yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + size], tool_calls=None))])
+
+  def _tool_call(self, name, args):
+    self._seq += 1
+    return SimpleNamespace(
+      id=f"call_mock_{self._seq}",
+      type="function",
+      function=SimpleNamespace(name=name, arguments=json.dumps(args, ensure_ascii=False)),
+    )
+
+  @staticmethod
+  def _response(content, tool_calls=None):
+    msg = SimpleNamespace(role="assistant", content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(message=msg, finish_reason="tool_calls" if tool_calls else "stop")])
+
+
+class Gateway:
+  def __init__(self, backend, timeout=20.0, max_retries=2, max_concurrency=8, backoff_base=0.25):
+    self.backend = backend
+    self.timeout = timeout
+    self.max_retries = max_retries
+    self.backoff_base = backoff_base
+    self._slots = threading.BoundedSemaphore(max_concurrency)
+
+  def chat(self, messages, model=MODEL, timeout=None, **kwargs):
+    timeout = self.timeout if timeout is None else timeout
+    self._acquire(timeout)
+    try:
+      with metrics.span("llm"):
+        return self._create(timeout=timeout, model=model, messages=messages, **kwargs)
+    finally:
+      self._slots.release()
+
+  def stream(self, messages, model=MODEL, timeout=None, **kwargs):
+    """
+    스트리밍 호출. 토큰이 오는 대로 ("token", text) 를 내고,
+    모델이 도구를 고르면 마지막에 ("tool_calls", [...]) 를 한 번 낸다.
+    재시도는 첫 청크를 받기 전(연결 단계)까지만 한다.
+    """
+    timeout = self.timeout if timeout is None else timeout
+    self._acquire(timeout)
+    waited = 0.0   # 청크를 기다린 시간만 llm 구간으로 (yield 로 멈춰 있는 동안은 빼고)
+    try:
+      t0 = time.perf_counter()
+      chunks = iter(self._create(timeout=timeout, model=model, messages=messages, stream=True, **kwargs))
+      calls = {}
+      while True:
+        chunk = next(chunks, None)
+        waited += time.perf_counter() - t0
+        if chunk is None:
+          break
+        delta = chunk.choices[0].delta if chunk.choices else None
+        if delta is not None and delta.content:
+          yield ("token", delta.content)
+        t0 = time.perf_counter()
+        if delta is None:
+          continue
+        for tc in (delta.tool_calls or []):
+          c = calls.setdefault(tc.index, {"id": None, "name": "", "arguments": ""})
+          if tc.id:
+            c["id"] = tc.id
+          if tc.function is not None:
+            c["name"] += tc.function.name or ""
+            c["arguments"] += tc.function.arguments or ""
+      if calls:
+        yield ("tool_calls", [
+          SimpleNamespace(id=c["id"], type="function",
+                          function=SimpleNamespace(name=c["name"], arguments=c["arguments"]))
+          for _, c in sorted(calls.items())
+        ])
+    finally:
+      metrics.add("llm", waited)
+      self._slots.release()
+
+  def _acquire(self, timeout):
+    if not self._slots.acquire(timeout=timeout):
+      raise LLMBusyError("LLM 동시 호출 한도를 초과했습니다.")
+
+  def _create(self, **kwargs):
+    attempt = 0
+    while True:
+      try:
+        return self.backend.create(**kwargs)
+      except self.backend.retriable:
+        if attempt >= self.max_retries:
+          raise
+        # full jitter: 0 ~ base * 2^attempt
+        time.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+        attempt += 1
+
+
+def _build(config):
+  timeout = float(config["LLM_TIMEOUT"])
+  concurrency = int(config["LLM_MAX_CONCURRENCY"])
+
+  if config["LLM_BACKEND"] == "mock":
+    backend = MockBackend(latency_s=float(config["LLM_MOCK_LATENCY_MS"]) / 1000)
+  else:
+    backend = OpenAIBackend(
+      api_key=os.environ.get("OPENAI_API_KEY"),
+      base_url=config.get("OPENAI_BASE_URL"),
+      timeout=timeout,
+      max_connections=concurrency,
+      traced=bool(config.get("METRICS_ENABLED")),
+    )
+  return Gateway(
+    backend,
+    timeout=timeout,
+    max_retries=int(config["LLM_MAX_RETRIES"]),
+    max_concurrency=concurrency,
+  )
+
+
+_build_lock = threading.Lock()
+
+def get_gateway(app=None):
+  """앱마다 게이트웨이 하나 (첫 사용 시 생성)"""
+  app = app or current_app._get_current_object()
+  gw = app.extensions.get("llm")
+  if gw is None:
+    with _build_lock:
+      gw = app.extensions.get("llm")
+      if gw is None:
+        gw = app.extensions["llm"] = _build(app.config)
+  return gw
+
+
+def chat(messages, **kwargs):
+  return get_gateway().chat(messages, **kwargs)
+
+
+def stream(messages, **kwargs):
+  return get_gateway().stream(messages, **kwargs)
+
+
+def init_app(app):
+  app.config.setdefault("LLM_BACKEND", "mock" if os.environ.get("OPENAI_MOCK", "0") == "1" else "openai")
+  app.config.setdefault("LLM_TIMEOUT", 20.0)
+  app.config.setdefault("LLM_MAX_RETRIES", 2)
+  app.config.setdefault("LLM_MAX_CONCURRENCY", 8)
+  app.config.setdefault("LLM_MOCK_LATENCY_MS", 0)
+  app.config.setdefault("OPENAI_BASE_URL", os.environ.get("OPENAI_BASE_URL"))
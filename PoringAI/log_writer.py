@@ -0,0 +1,260 @@
+"""
+로그 테이블 전용 단일 writer 큐 (group commit)
+
+bike_location_log / bike_status_log / lock_status / chat_log 같은 append 위주 테이블은
+요청 안에서 한 줄씩 커밋하지 않고 append() 로 큐에 넣는다.
+백그라운드 스레드 하나가 LOG_BATCH_SIZE 개가 모이거나 LOG_FLUSH_MS 가 지나면
+db 의 writer 연결을 잡고 한 트랜잭션(executemany)으로 커밋한다.
+
+- 큐가 꽉 차면 LOG_PUT_TIMEOUT_S 만큼 기다리다 LogQueueFull (back-pressure)
+- durable=True 면 커밋될 때까지 기다린다. (writer 를 잡은 요청 안에서는 쓸 수 없다)
+  기다리는 호출자가 있으면 마감 시간을 기다리지 않고, 커밋하는 동안 쌓인 것을 다음 배치로 묶는다.
+- 배치 커밋이 예외로 실패해도 스레드는 계속 돈다. (그 배치의 durable 호출자는 예외를 받는다)
+- 프로세스 종료(atexit) 때 남은 것을 모두 커밋한다.
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+from .db import get_manager
+
+# 큐로 받을 수 있는 테이블과 컬럼
+LOG_TABLES = {
+  "bike_location_log": ("bike_id", "lat", "lng", "logged_at"),
+  "bike_status_log": ("bike_id", "status", "logged_at"),
+  "lock_status": ("bike_id", "user_id", "locked_at", "lat", "lng", "transferable", "is_active"),
+  "chat_log": ("user_id", "user_question", "gpt_answer", "inferred_intent", "function_called", "logged_at", "session_id"),
+}
+
+
+class LogQueueFull(Exception):
+  """큐가 꽉 차서 LOG_PUT_TIMEOUT_S 안에 넣지 못했을 때"""
+
+
+class _Job:
+  __slots__ = ("sql", "params", "done", "error")
+
+  def __init__(self, sql, params, durable):
+    self.sql = sql
+    self.params = params
+    self.done = threading.Event() if durable else None
+    self.error = None
+
+
+_STOP = object()
+
+
+def _insert_sql(table, columns):
+  return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+
+class LogWriter:
+  def __init__(self, app, batch_size=500, flush_ms=20, queue_size=10000,
+               put_timeout_s=0.5, ack_timeout_s=5.0):
+    self.app = app
+    self.batch_size = batch_size
+    self.flush_s = flush_ms / 1000.0
+    self.put_timeout_s = put_timeout_s
+    self.ack_timeout_s = ack_timeout_s
+    self._queue = queue.Queue(maxsize=queue_size)
+    self._thread = None
+    self._start_lock = threading.Lock()
+    self._closed = False
+
+    self.enqueued = 0
+    self.committed = 0
+    self.failed = 0
+    self.batches = 0
+    self.max_batch = 0
+
+  def append(self, table, durable=False, **values):
+    """
+    table 에 한 줄 추가를 예약한다.
+    durable=True 면 커밋될 때까지 기다리고, 실패하면 그 예외를 그대로 올린다.
+    """
+    columns = LOG_TABLES.get(table)
+    if columns is None:
+      raise ValueError(f"{table} 은 로그 큐 대상이 아닙니다.")
+    unknown = set(values) - set(columns)
+    if unknown:
+      raise ValueError(f"{table} 에 없는 컬럼: {', '.join(sorted(unknown))}")
+    if durable and get_manager(self.app).writer_owner == threading.get_ident():
+      raise RuntimeError("writer 를 잡은 채로 durable append 를 기다리면 교착된다.")
+
+    cols = tuple(c for c in columns if c in values)
+    job = _Job(_insert_sql(table, cols), tuple(values[c] for c in cols), durable)
+    self._ensure_started()
+    try:
+      self._queue.put(job, timeout=self.put_timeout_s)
+    except queue.Full:
+      raise LogQueueFull(f"log queue full ({self._queue.maxsize})") from None
+    self.enqueued += 1
+
+    if durable:
+      if not job.done.wait(self.ack_timeout_s):
+        raise TimeoutError("log commit ack timeout")
+      if job.error is not None:
+        raise job.error
+    return job
+
+  def flush(self, timeout=None):
+    """지금까지 넣은 것이 모두 커밋될 때까지 기다린다."""
+    if self._thread is None:
+      return True
+    marker = _Job(None, None, durable=True)
+    self._queue.put(marker)
+    return marker.done.wait(timeout if timeout is not None else self.ack_timeout_s)
+
+  def close(self, timeout=10.0):
+    """남은 것을 커밋하고 스레드를 멈춘다. (atexit)"""
+    if self._closed:
+      return
+    self._closed = True
+    if self._thread is not None:
+      self._queue.put(_STOP)
+      self._thread.join(timeout)
+
+  def stats(self):
+    return {
+      "queued": self._queue.qsize(),
+      "enqueued": self.enqueued,
+      "committed": self.committed,
+      "failed": self.failed,
+      "batches": self.batches,
+      "max_batch": self.max_batch,
+    }
+
+  def _ensure_started(self):
+    if self._thread is not None:
+      return
+    with self._start_lock:
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._loop, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+  def _loop(self):
+    stop = False
+    while not stop:
+      job = self._queue.get()
+      if job is _STOP:
+        break
+      batch = [job]
+      waiting = job.done is not None   # durable 호출자가 기다리는 중
+      deadline = time.monotonic() + self.flush_s
+      while len(batch) < self.batch_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+          break
+        try:
+          # 기다리는 호출자가 있으면 이미 쌓인 것만 모아서 바로 커밋한다
+          job = self._queue.get_nowait() if waiting else self._queue.get(timeout=remaining)
+        except queue.Empty:
+          break
+        if job is _STOP:
+          stop = True
+          break
+        batch.append(job)
+        waiting = waiting or job.done is not None
+      self._commit_safe(batch)
+
+    # 종료: 남은 것까지 커밋
+    rest = []
+    while True:
+      try:
+        job = self._queue.get_nowait()
+      except queue.Empty:
+        break
+      if job is not _STOP:
+        rest.append(job)
+    for i in range(0, len(rest), self.batch_size):
+      self._commit_safe(rest[i:i + self.batch_size])
+
+  def _commit_safe(self, batch):
+    """_commit 이 예상 못 한 예외로 죽어도 스레드는 살려 두고, 기다리는 호출자는 에러와 함께 깨운다."""
+    try:
+      self._commit(batch)
+    except Exception as e:
+      self.app.logger.exception("log batch of %d lost", len(batch))
+      for j in batch:
+        if j.sql is not None and j.error is None:
+          j.error = e
+          self.failed += 1
+        if j.done is not None:
+          j.done.set()
+
+  def _commit(self, batch):
+    jobs = [j for j in batch if j.sql is not None]
+    if not jobs:
+      for j in batch:
+        j.done.set()
+      return
+    manager = get_manager(self.app)
+    db = manager.acquire_writer()
+    try:
+      try:
+        groups = {}
+        for j in jobs:
+          groups.setdefault(j.sql, []).append(j.params)
+        for sql, rows in groups.items():
+          db.executemany(sql, rows)
+        db.commit()
+        self.committed += len(jobs)
+      except sqlite3.Error as e:
+        # 한 줄 때문에 배치 전체를 버리지 않도록 한 줄씩 다시
+        db.rollback()
+        self.app.logger.warning("log batch failed, retrying row by row: %s", e)
+        self._commit_each(db, jobs)
+    finally:
+      manager.release_writer()
+
+    self.batches += 1
+    self.max_batch = max(self.max_batch, len(jobs))
+    for j in batch:
+      if j.done is not None:
+        j.done.set()
+
+  def _commit_each(self, db, jobs):
+    for j in jobs:
+      try:
+        db.execute(j.sql, j.params)
+        self.committed += 1
+      except sqlite3.Error as e:
+        j.error = e
+        self.failed += 1
+    try:
+      db.commit()
+    except sqlite3.Error as e:
+      db.rollback()
+      for j in jobs:
+        j.error = j.error or e
+
+
+def get_log_writer(app=None):
+  app = app or current_app
+  return app.extensions["log_writer"]
+
+
+def append(table, durable=False, **values):
+  return get_log_writer().append(table, durable=durable, **values)
+
+
+def init_app(app):
+  app.config.setdefault("LOG_BATCH_SIZE", 500)
+  app.config.setdefault("LOG_FLUSH_MS", 20)
+  app.config.setdefault("LOG_QUEUE_SIZE", 10000)
+  app.config.setdefault("LOG_PUT_TIMEOUT_S", 0.5)
+  app.config.setdefault("LOG_ACK_TIMEOUT_S", 5.0)
+
+  app.extensions["log_writer"] = LogWriter(
+    app,
+    batch_size=int(app.config["LOG_BATCH_SIZE"]),
+    flush_ms=float(app.config["LOG_FLUSH_MS"]),
+    queue_size=int(app.config["LOG_QUEUE_SIZE"]),
+    put_timeout_s=float(app.config["LOG_PUT_TIMEOUT_S"]),
+    ack_timeout_s=float(app.config["LOG_ACK_TIMEOUT_S"]),
+  )
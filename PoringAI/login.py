@@ -1,6 +1,7 @@
 # login.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from .db import get_db
+from . import repository
 
 bp = Blueprint('login', __name__, url_prefix='/login')
 
@@ -14,16 +15,13 @@ def login():
         else:
             db = get_db()
 
-            # users_id인지 user_id인지 확인해서 맞춰줘
-            row = db.execute(
-                "SELECT * FROM users WHERE user_id = ?", (user_id,)
-            ).fetchone()
+            user = repository.user_by_id(db, user_id)
 
-            if row is None:
+            if user is None:
                 flash("존재하지 않는 user_id입니다.")
             else:
                 session.clear()
-                session["user_id"] = row["user_id"]
+                session["user_id"] = user.user_id
                 return redirect(url_for("index"))
 
     return render_template("login/login.html")
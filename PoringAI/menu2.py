@@ -3,6 +3,7 @@ from flask import(
 )
 from werkzeug.exceptions import abort
 from .db import get_db
+from . import repository, service
 
 bp = Blueprint('menu2', __name__, url_prefix='/menu2')
 
@@ -10,21 +11,14 @@ bp = Blueprint('menu2', __name__, url_prefix='/menu2')
 def menu2():
   db = get_db()
 
-  sql = '''
-  SELECT
-        h.hub_id,
-        h.hub_name,
-        h.latitude,
-        h.longitude,
-        COALESCE(SUM(s.parked_slot), 0) AS parked_sum,
-        COALESCE(SUM(s.total_slots), 0)  AS total_sum
-    FROM hubs h
-    LEFT JOIN stations s ON s.hub_id = h.hub_id
-    GROUP BY h.hub_id, h.hub_name, h.latitude, h.longitude
-    ORDER BY h.hub_id;
-  '''
-  rows = db.execute(sql).fetchall()
+  # 버전을 먼저 읽는다. 그 사이 바뀐 허브는 다음 폴링(since=version)에 다시 온다.
+  version = service.occupancy_version()
 
-  hubs = [dict(row) for row in rows]
+  # 허브별 주차 합계는 hub_counters 에 미리 집계되어 있다 (counters.py)
+  rows = repository.occupancy(db)
 
-  return render_template("menu2.html", hubs=hubs);
\ No newline at end of file
+  hubs = [row.as_dict() for row in rows]
+
+  return render_template("menu2.html", hubs=hubs, version=version,
+                         poll_url=url_for('api.hub_occupancy'),
+                         live_url=url_for('api.hub_occupancy_stream'));
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""
+요청 지연 분해, /metrics (Prometheus 텍스트 형식), JSON 로그
+
+METRICS_ENABLED 일 때만 요청마다 Trace 를 만들고 구간(span)별 시간을 모은다.
+- db       : SQLite execute/fetch (db.ConnectionManager 가 추적용 연결을 쓴다)
+- llm      : 게이트웨이 호출. 스트리밍은 청크를 기다린 시간만 (클라이언트에 쓰는 시간은 빠진다)
+- http     : LLM 클라이언트의 나가는 HTTP (요청 보냄 -> 응답 헤더)
+- tool     : 챗봇 도구 실행 (스레드 풀)
+- sentence : 안내 문장 (캐시 또는 LLM)
+요청이 끝나면 엔드포인트별 히스토그램(요청 전체, 구간 합)에 넣고, 요청 id 가 붙은 JSON 로그 한 줄을 남긴다.
+요청 id 는 X-Request-ID 헤더를 그대로 쓰거나 새로 만들고, 응답 헤더로 돌려준다.
+
+꺼져 있으면 span() 은 ContextVar 하나를 읽고 공용 no-op 을 돌려줄 뿐이고, DB 연결도 평범한 sqlite3 연결이다.
+log() 는 켜고 끄는 것과 상관없이 JSON 한 줄 (요청 안이면 request_id 포함).
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from flask import Response, current_app, g, request
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_trace = ContextVar("poring_trace", default=None)
+logger = logging.getLogger("PoringAI.events")
+
+
+class Trace:
+  __slots__ = ("request_id", "started", "spans", "status", "_lock")
+
+  def __init__(self, request_id):
+    self.request_id = request_id
+    self.started = time.perf_counter()
+    self.spans = {}   # kind -> [초 합, 횟수]
+    self.status = None
+    self._lock = threading.Lock()
+
+  def add(self, kind, seconds):
+    with self._lock:
+      s = self.spans.get(kind)
+      if s is None:
+        self.spans[kind] = [seconds, 1]
+      else:
+        s[0] += seconds
+        s[1] += 1
+
+
+class _Span:
+  __slots__ = ("trace", "kind", "t0")
+
+  def __init__(self, trace, kind):
+    self.trace = trace
+    self.kind = kind
+
+  def __enter__(self):
+    self.t0 = time.perf_counter()
+    return self
+
+  def __exit__(self, *exc):
+    self.trace.add(self.kind, time.perf_counter() - self.t0)
+    return False
+
+
+class _NoSpan:
+  __slots__ = ()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    return False
+
+
+_NOOP = _NoSpan()
+
+
+def current():
+  """지금 요청의 Trace (꺼져 있거나 요청 밖이면 None)"""
+  return _trace.get()
+
+
+def span(kind):
+  trace = _trace.get()
+  return _NOOP if trace is None else _Span(trace, kind)
+
+
+def add(kind, seconds):
+  trace = _trace.get()
+  if trace is not None:
+    trace.add(kind, seconds)
+
+
+@contextmanager
+def attached(trace):
+  """다른 스레드(도구 풀 등)에서 한 일을 요청의 Trace 에 넣는다."""
+  if trace is None:
+    yield
+    return
+  token = _trace.set(trace)
+  try:
+    yield
+  finally:
+    _trace.reset(token)
+
+
+def httpx_hooks():
+  """LLM 클라이언트(httpx)용 event_hooks: 요청 보냄 -> 응답 헤더 받음 을 http 구간으로"""
+  def on_request(req):
+    req.extensions["poring_t0"] = time.perf_counter()
+
+  def on_response(resp):
+    t0 = resp.request.extensions.get("poring_t0")
+    if t0 is not None:
+      add("http", time.perf_counter() - t0)
+
+  return {"request": [on_request], "response": [on_response]}
+
+
+# ----- 히스토그램 -----
+
+class Histogram:
+  __slots__ = ("counts", "sum", "count")
+
+  def __init__(self, n):
+    self.counts = [0] * n
+    self.sum = 0.0
+    self.count = 0
+
+
+class Registry:
+  def __init__(self, buckets=BUCKETS):
+    self.buckets = tuple(buckets)
+    self._hists = {}   # (name, labels) -> Histogram
+    self._lock = threading.Lock()
+
+  def observe(self, name, labels, value):
+    key = (name, labels)
+    i = bisect.bisect_left(self.buckets, value)
+    with self._lock:
+      h = self._hists.get(key)
+      if h is None:
+        h = self._hists[key] = Histogram(len(self.buckets) + 1)
+      h.counts[i] += 1
+      h.sum += value
+      h.count += 1
+
+  def render(self):
+    """Prometheus 텍스트 형식 (0.0.4)"""
+    with self._lock:
+      items = sorted((k, list(h.counts), h.sum, h.count) for k, h in self._hists.items())
+    out, seen = [], set()
+    for (name, labels), counts, total, count in items:
+      if name not in seen:
+        seen.add(name)
+        out.append(f"# HELP {name} {HELP.get(name, name)}")
+        out.append(f"# TYPE {name} histogram")
+      base = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+      sep = "," if base else ""
+      acc = 0
+      for le, c in zip(self.buckets + (float("inf"),), counts):
+        acc += c
+        out.append(f'{name}_bucket{{{base}{sep}le="{"+Inf" if le == float("inf") else le}"}} {acc}')
+      out.append(f"{name}_sum{{{base}}} {total:.6f}")
+      out.append(f"{name}_count{{{base}}} {count}")
+    return out
+
+
+HELP = {
+  "poring_request_seconds": "HTTP 요청 처리 시간",
+  "poring_span_seconds": "요청 하나에서 구간(db/llm/http/tool/sentence)에 쓴 시간 합",
+}
+
+
+def _escape(v):
+  return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def get_registry(app=None):
+  app = app or current_app
+  return app.extensions["metrics"]
+
+
+# ----- JSON 로그 -----
+
+def log(event, level=logging.INFO, **fields):
+  """JSON 한 줄. 요청 안이면 request_id 를 붙인다."""
+  if not logger.isEnabledFor(level):
+    return
+  record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "level": logging.getLevelName(level).lower(), "event": event}
+  trace = _trace.get()
+  if trace is not None:
+    record["request_id"] = trace.request_id
+  record.update(fields)
+  logger.log(level, json.dumps(record, ensure_ascii=False, default=str))
+
+
+# ----- 요청 훅 -----
+
+def _start():
+  rid = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+  g.metrics_trace = trace = Trace(rid[:64])
+  _trace.set(trace)
+
+
+def _headers(response):
+  trace = g.get("metrics_trace")
+  if trace is not None:
+    trace.status = response.status_code
+    response.headers["X-Request-ID"] = trace.request_id
+  return response
+
+
+def _finish(exc=None):
+  # 스트리밍 응답은 본문을 다 보낸 뒤에 여기로 온다
+  trace = g.pop("metrics_trace", None)
+  if trace is None:
+    return
+  _trace.set(None)
+  elapsed = time.perf_counter() - trace.started
+  req = request._get_current_object()
+  status = trace.status or (500 if exc is not None else 200)
+  endpoint = req.endpoint or "unmatched"
+  registry = get_registry()
+  registry.observe("poring_request_seconds",
+                   (("endpoint", endpoint), ("method", req.method), ("status", str(status))), elapsed)
+  for kind, (seconds, _) in trace.spans.items():
+    registry.observe("poring_span_seconds", (("endpoint", endpoint), ("kind", kind)), seconds)
+  log("request", method=req.method, path=req.path, endpoint=endpoint, status=status,
+      duration_ms=round(elapsed * 1000, 3),
+      spans={k: {"ms": round(s * 1000, 3), "n": n} for k, (s, n) in trace.spans.items()})
+
+
+def metrics_view():
+  if not current_app.config["METRICS_ENABLED"]:
+    return "metrics disabled\n", 404
+  lines = get_registry().render()
+  writer = current_app.extensions.get("log_writer")
+  if writer is not None:
+    stats = writer.stats()
+    lines += [
+      "# TYPE poring_log_queue_depth gauge", f"poring_log_queue_depth {stats['queued']}",
+      "# TYPE poring_log_committed_total counter", f"poring_log_committed_total {stats['committed']}",
+      "# TYPE poring_log_failed_total counter", f"poring_log_failed_total {stats['failed']}",
+    ]
+  return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+  app.config.setdefault("METRICS_ENABLED", False)
+  app.config.setdefault("METRICS_BUCKETS", BUCKETS)
+  app.config.setdefault("LOG_LEVEL", "INFO")
+
+  if not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.propagate = False
+  logger.setLevel(app.config["LOG_LEVEL"])
+
+  app.extensions["metrics"] = Registry(app.config["METRICS_BUCKETS"])
+  app.add_url_rule("/metrics", "metrics", metrics_view)
+  if app.config["METRICS_ENABLED"]:
+    app.before_request(_start)
+    app.after_request(_headers)
+    app.teardown_request(_finish)
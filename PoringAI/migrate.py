@@ -0,0 +1,212 @@
+"""
+예전 테이블(hubs/stations/bikes/users/rentals) -> 정식 스키마(schema.sql) 이전
+
+실행: flask migrate-db
+
+- hubs + stations        -> hub  (capacity = 스테이션 total_slots 합, current_bikes = 주차 합)
+- bikes                  -> bike (bikes_id 그대로)
+    Station 에 Returned 로 있는 자전거만 current_hub_id = assigned_hub_id
+    Zone/대여 중인 자전거는 허브 밖(NULL)
+    수리 중/폐기 -> lock_state 'fault', 반납됨 -> 'locked', 나머지 -> 'unlocked'
+- users                  -> user
+- rentals                -> ride
+정식 테이블에 이미 행이 있으면 그 테이블은 건너뛴다. (덮어쓰지 않는다)
+이전이 끝나면 예전 테이블은 legacy_* 로 이름만 바꿔 두고, 트리거를 지우고, hub_counters 를 다시 집계한다.
+스키마(테이블/트리거)는 schema.sql 한 곳에 있다. 이미 있는 테이블에 나중에 생긴 컬럼은 COLUMNS 로 먼저 더한다.
+스키마 생성부터 user_version 까지 전부 한 트랜잭션(BEGIN IMMEDIATE)이라 중간에 실패하면 아무것도 바뀌지 않는다.
+(executescript 는 먼저 COMMIT 하므로 스크립트도 문장 단위로 나눠 같은 트랜잭션에서 돌린다)
+"""
+import sqlite3
+
+import click
+from flask import current_app
+
+from . import counters
+from .db import get_writer
+
+SCHEMA_VERSION = 3   # 2: 버전 트리거 등 모듈마다 만들던 테이블을 schema.sql 로 모음, 3: bike.battery_at
+LEGACY_TABLES = ("hubs", "stations", "zones", "bikes", "users", "rentals")
+
+# 예전 DB 에 이미 있는 테이블에 나중에 더해진 컬럼 (schema.sql 의 인덱스/트리거가 쓰므로 스키마보다 먼저)
+COLUMNS = (
+  ("hub", "region", "TEXT"),
+  ("hub_counters", "version", "INTEGER NOT NULL DEFAULT 0"),
+  ("bike", "last_lat", "REAL"),
+  ("bike", "last_lng", "REAL"),
+  ("bike", "last_seen_at", "TEXT"),
+  ("bike", "battery_at", "TEXT"),
+  ("chat_log", "session_id", "TEXT"),
+)
+
+
+def _tables(db):
+  return {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _columns(db, table):
+  return {r[1] for r in db.execute(f"PRAGMA table_info({table})")}
+
+
+def _pick(cols, *names, prefix="", default="NULL"):
+  """names 중 table 에 있는 첫 컬럼 식 (없으면 default 식)"""
+  return next((prefix + n for n in names if n in cols), default)
+
+
+def _script(db, sql):
+  """executescript 와 같지만 커밋하지 않는다. (열린 트랜잭션 안에서 문장 하나씩)"""
+  stmt = ""
+  for line in sql.splitlines(keepends=True):
+    stmt += line
+    if sqlite3.complete_statement(stmt):
+      db.execute(stmt)
+      stmt = ""
+
+
+def _add_columns(db):
+  tables = _tables(db)
+  for table, column, kind in COLUMNS:
+    if table in tables and column not in _columns(db, table):
+      db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+
+def _empty(db, table):
+  return db.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None
+
+
+def _hubs(db, tables, report):
+  cols = _columns(db, "hubs")
+  region = _pick(cols, "region", prefix="h.")
+  if "stations" in tables:
+    parked = _pick(_columns(db, "stations"), "parked_slot", "parked_slots", default="0")
+    slots = f'''
+      LEFT JOIN (SELECT hub_id, SUM(COALESCE(total_slots, 0)) AS capacity,
+                        SUM(COALESCE({parked}, 0)) AS parked
+                   FROM stations GROUP BY hub_id) s ON s.hub_id = h.hub_id'''
+  else:
+    slots = " LEFT JOIN (SELECT NULL AS hub_id, 0 AS capacity, 0 AS parked) s ON 0"
+
+  skipped = [r[0] for r in db.execute("SELECT hub_name FROM hubs WHERE latitude IS NULL OR longitude IS NULL")]
+  db.execute(f'''
+    INSERT INTO hub (hub_id, name, lat, lng, capacity, current_bikes, region)
+    SELECT h.hub_id, h.hub_name, h.latitude, h.longitude,
+           COALESCE(s.capacity, 0), MAX(COALESCE(s.parked, 0), 0), {region}
+      FROM hubs h{slots}
+     WHERE h.latitude IS NOT NULL AND h.longitude IS NOT NULL''')
+  report["hub"] = db.execute("SELECT COUNT(*) FROM hub").fetchone()[0]
+  if skipped:
+    report["hub_skipped_no_coordinates"] = skipped
+
+
+def _bikes(db, report):
+  cols = _columns(db, "bikes")
+  ok = " AND ".join(f"COALESCE(b.{c}, {v}) = {v}" for c, v in
+                    (("is_active", 1), ("is_under_repair", 0), ("is_retired", 0)) if c in cols) or "1"
+  broken = " OR ".join(f"COALESCE(b.{c}, 0) = 1" for c in ("is_under_repair", "is_retired") if c in cols) or "0"
+  returned = "b.status = 'Returned'"
+  battery = _pick(cols, "battery_percent", "battery", prefix="b.", default="100")
+  db.execute(f'''
+    INSERT INTO bike (bike_id, current_hub_id, lock_state, battery_percent, is_available)
+    SELECT b.bikes_id,
+           CASE WHEN {returned} AND b.where_parked = 'Station' THEN h.hub_id END,
+           CASE WHEN {broken} THEN 'fault' WHEN {returned} THEN 'locked' ELSE 'unlocked' END,
+           MIN(MAX(COALESCE({battery}, 100), 0), 100),
+           ({returned} AND {ok})
+      FROM bikes b
+      LEFT JOIN hub h ON h.hub_id = b.assigned_hub_id''')
+  report["bike"] = db.execute("SELECT COUNT(*) FROM bike").fetchone()[0]
+
+
+def _users(db, report):
+  cols = _columns(db, "users")
+  name = _pick(cols, "name", "user_name", "username")
+  db.execute(f'''
+    INSERT INTO user (user_id, name, student_no, phone, grade, joined_at)
+    SELECT user_id,
+           COALESCE({name}, 'user' || user_id),
+           {_pick(cols, "student_no", "student_id")},
+           {_pick(cols, "phone", "phone_number")},
+           {_pick(cols, "grade", "role")},
+           COALESCE({_pick(cols, "joined_at", "created_at")}, datetime('now'))
+      FROM users''')
+  report["user"] = db.execute("SELECT COUNT(*) FROM user").fetchone()[0]
+
+
+def _rentals(db, report):
+  cols = _columns(db, "rentals")
+  start = _pick(cols, "rental_start_datetime", "start_at", prefix="r.")
+  end = _pick(cols, "rental_end_datetime", "end_at", prefix="r.")
+  start_hub = _pick(cols, "start_hub_id", prefix="r.")
+  end_hub = _pick(cols, "end_hub_id", prefix="r.")
+  fare = _pick(cols, "fare_amount", "fare", "price", prefix="r.", default="0")
+  db.execute(f'''
+    INSERT INTO ride (user_id, bike_id, start_hub_id, end_hub_id, start_at, end_at, duration_min, fare_amount)
+    SELECT r.user_id, r.bike_id,
+           (SELECT hub_id FROM hub WHERE hub_id = {start_hub}),
+           (SELECT hub_id FROM hub WHERE hub_id = {end_hub}),
+           {start}, {end},
+           CASE WHEN {end} IS NOT NULL
+                THEN CAST((julianday({end}) - julianday({start})) * 24 * 60 AS INTEGER) END,
+           COALESCE({fare}, 0)
+      FROM rentals r
+     WHERE {start} IS NOT NULL
+     ORDER BY {start}''')
+  report["ride"] = db.execute("SELECT COUNT(*) FROM ride").fetchone()[0]
+
+
+def migrate(db):
+  """
+  예전 테이블을 정식 스키마로 옮긴다. db 는 writer 연결.
+  반환: {테이블: 행 수 / 건너뛴 이유 ...}
+  """
+  report = {}
+  if db.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+    report["skipped"] = "already migrated"
+    return report
+
+  with current_app.open_resource('schema.sql') as f:
+    schema = f.read().decode('utf-8')
+
+  db.execute("BEGIN IMMEDIATE")
+  try:
+    _add_columns(db)
+    _script(db, schema)
+    db.execute("DROP INDEX IF EXISTS idx_bike_hub")   # idx_bike_hub_available 이 대신한다
+
+    tables = _tables(db)
+    legacy = [t for t in LEGACY_TABLES if t in tables]
+    steps = (("hubs", "hub", lambda: _hubs(db, tables, report)),
+             ("bikes", "bike", lambda: _bikes(db, report)),
+             ("users", "user", lambda: _users(db, report)),
+             ("rentals", "ride", lambda: _rentals(db, report)))
+    for old, new, copy in steps:
+      if old not in tables:
+        continue
+      if not _empty(db, new):
+        report[new] = "not empty, left as is"
+        continue
+      copy()
+
+    # 예전 테이블에 걸린 트리거(카운터/버전)는 지우고, 테이블은 legacy_* 로 남긴다
+    for t in legacy:
+      for name, in db.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (t,)).fetchall():
+        db.execute(f"DROP TRIGGER {name}")
+      db.execute(f"ALTER TABLE {t} RENAME TO legacy_{t}")
+    report["renamed"] = [f"legacy_{t}" for t in legacy]
+
+    counters.recount(db)
+    db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+  except BaseException:
+    db.rollback()
+    raise
+  db.commit()
+  return report
+
+
+@click.command('migrate-db')
+def migrate_db_command():
+  for k, v in migrate(get_writer()).items():
+    click.echo(f'{k}: {v}')
+
+
+def init_app(app):
+  app.cli.add_command(migrate_db_command)
@@ -0,0 +1,365 @@
+"""
+요금/인센티브 계산 (fare_policy, incentive_policy)
+
+정책마다 시각 구간(time_start ~ time_end, 'HH:MM:SS')이 있다. time_end < time_start 면 자정을 넘는 구간
+(22:00 ~ 02:00 = [22:00, 24:00) + [00:00, 02:00)), 같으면 하루 종일.
+시각은 현지 시각이다. (DB 는 UTC, PRICING_UTC_OFFSET_S 를 더한다)
+
+요금 (라이딩 시작 시각)
+  출발/도착 허브의 region 이 구역(zone). 정책의 구역이 '*' 면 아무 구역(허브 밖 포함)에나 맞는다.
+  여러 정책이 맞으면: 구역이 정확히 맞는 쪽 > 구간이 좁은 쪽 > 최신(fare_id).
+  (출발, 도착) 구역 쌍마다 하루를 겹치지 않는 조각으로 나누고, 조각마다 이기는 정책을 미리 정해 둔다.
+  조회는 bisect 한 번이고, 맞는 정책이 없으면 PRICING_DEFAULT_PER_MIN.
+  요금 = 분당 요금 x max(1, 이용 분) + adj (discount 는 빼고 surcharge 는 더한다)
+인센티브 (라이딩 끝 시각)
+  도착 허브(존 반납이면 그 허브)가 target_hub_id, 현지 날짜가 start_date ~ end_date, 현지 시각이 구간 안이면 적용.
+  자정을 넘는 구간의 새벽 쪽은 전날 날짜로 본다. 여러 개면 금액이 큰 것 하나.
+  최종 요금 = max(0, 요금 - 인센티브), incentive_applied = 1
+
+색인은 versioning.cached 로 fare_policy / incentive_policy / hub 버전이 바뀔 때만 다시 만든다.
+- quote()   : 반납 시점 한 건 (rides.zone_return, 하이파이브 인계)
+- reprice() : 정책을 바꾼 뒤 라이딩 이력을 NumPy 로 배치째 다시 계산해서 바뀐 행만 고친다. (flask reprice-rides)
+"""
+import time
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date, datetime, timezone
+
+import click
+import numpy as np
+from flask import current_app
+
+from . import repository, versioning
+from .db import get_db, get_manager
+
+DAY = 86400
+WILDCARD = "*"
+ADJ_SIGN = {"discount": -1, "surcharge": 1}
+NO_END = 1 << 40   # end_date 가 없는 인센티브
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+Price = namedtuple("Price", "end_at duration_min fare_amount incentive_applied fare_id incentive_id")
+
+Fare = namedtuple("Fare", "fare_id origin dest per_min adj width pieces")
+Incentive = namedtuple("Incentive", "amount policy_id first_day last_day shifted")
+
+
+def _seconds(hms):
+  parts = (hms.split(":") + ["0", "0"])[:3]
+  return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(float(parts[2]))
+
+
+def pieces(time_start, time_end):
+  """하루 안의 [lo, hi) 조각들과 그 조각이 자정 뒤 쪽인지"""
+  lo, hi = _seconds(time_start) % DAY, _seconds(time_end) % DAY   # '24:00:00' 은 0 과 같다
+  if lo == hi:
+    return ((0, DAY, False),)
+  if lo < hi:
+    return ((lo, hi, False),)
+  return ((lo, DAY, False), (0, hi, True))
+
+
+def _day(text, default):
+  return date.fromisoformat(text).toordinal() - _EPOCH_DAY if text else default
+
+
+def epoch(text):
+  """DB 시각 문자열(UTC) -> 유닉스 초"""
+  dt = datetime.fromisoformat(text)
+  if dt.tzinfo is not None:
+    dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+  return int((dt - _EPOCH).total_seconds())
+
+
+def epochs(texts):
+  """epoch() 의 배열판"""
+  return np.array(texts, dtype="datetime64[us]").astype("datetime64[s]").astype(np.int64)
+
+
+def _cut(cands):
+  """[(lo, hi, item)] -> 하루를 겹치지 않는 조각으로 (starts, 조각마다 덮는 item 목록)"""
+  cuts = sorted({0, DAY, *(c[0] for c in cands), *(c[1] for c in cands)})
+  starts, covers = [], []
+  for lo, hi in zip(cuts, cuts[1:]):
+    cover = tuple(item for a, b, item in cands if a <= lo and hi <= b)
+    if covers and covers[-1] == cover:
+      continue
+    starts.append(lo)
+    covers.append(cover)
+  return starts, covers
+
+
+# ----- 요금 색인 -----
+
+def _rank(fare):
+  return ((fare.origin != WILDCARD) + (fare.dest != WILDCARD), -fare.width, fare.fare_id)
+
+
+class FareIndex:
+  """(출발 구역, 도착 구역) 쌍마다 하루 조각 -> 이기는 Fare (없으면 None)"""
+
+  def __init__(self, fares):
+    self.fares = fares
+    names = sorted(({f.origin for f in fares} | {f.dest for f in fares}) - {WILDCARD})
+    self.codes = {name: i for i, name in enumerate(names)}
+    self.unknown = len(names)     # 정책에 나오지 않는 구역/허브 밖: '*' 정책만 맞는다
+    n = self.unknown + 1
+    self.tables = {}
+    for o in range(n):
+      for d in range(n):
+        on, dn = (names[o] if o < self.unknown else None), (names[d] if d < self.unknown else None)
+        cands = [(lo, hi, f) for f in fares if f.origin in (WILDCARD, on) and f.dest in (WILDCARD, dn)
+                 for lo, hi, _ in f.pieces]
+        starts, covers = _cut(cands)
+        self.tables[(o, d)] = (starts, [max(c, key=_rank) if c else None for c in covers])
+
+    # 배열판: key = (o * n + d) * DAY + 조각 시작
+    keys, per_min, adj, fare_id = [], [], [], []
+    for (o, d), (starts, winners) in sorted(self.tables.items()):
+      for s, w in zip(starts, winners):
+        keys.append((o * n + d) * DAY + s)
+        per_min.append(-1 if w is None else w.per_min)
+        adj.append(0 if w is None else w.adj)
+        fare_id.append(0 if w is None else w.fare_id)
+    self.n = n
+    self.keys = np.array(keys, dtype=np.int64)
+    self.per_min = np.array(per_min, dtype=np.int64)
+    self.adj = np.array(adj, dtype=np.int64)
+    self.fare_id = np.array(fare_id, dtype=np.int64)
+
+  def code(self, region):
+    return self.codes.get(region, self.unknown)
+
+  def find(self, origin_code, dest_code, tod):
+    starts, winners = self.tables[(origin_code, dest_code)]
+    return winners[bisect_right(starts, tod) - 1]
+
+
+FARES_SQL = "SELECT fare_id, origin_zone, dest_zone, time_start, time_end, base_per_min, adj_type, adj_amount FROM fare_policy"
+
+
+def _load_fares(db):
+  fares = []
+  for fare_id, origin, dest, ts, te, per_min, adj_type, adj_amount in db.execute(FARES_SQL).fetchall():
+    p = pieces(ts, te)
+    fares.append(Fare(fare_id, origin or WILDCARD, dest or WILDCARD, per_min,
+                      ADJ_SIGN.get(adj_type, 0) * (adj_amount or 0), sum(hi - lo for lo, hi, _ in p), p))
+  return FareIndex(fares)
+
+
+# ----- 인센티브 색인 -----
+
+class IncentiveIndex:
+  """허브마다 하루 조각 -> 그 시각을 덮는 Incentive 들 (날짜는 조회할 때 거른다)"""
+
+  def __init__(self, rows):
+    by_hub = {}
+    for policy_id, hub_id, start_date, end_date, ts, te, amount in rows:
+      first, last = _day(start_date, 0), _day(end_date, NO_END)
+      for lo, hi, shifted in pieces(ts, te):
+        by_hub.setdefault(hub_id, []).append((lo, hi, Incentive(amount, policy_id, first, last, shifted)))
+    self.pieces = by_hub
+    self.tables = {hub: _cut(cands) for hub, cands in by_hub.items()}
+
+  def find(self, hub_id, tod, day):
+    table = self.tables.get(hub_id)
+    if table is None:
+      return None
+    starts, covers = table
+    best = None
+    for inc in covers[bisect_right(starts, tod) - 1]:
+      if inc.first_day <= day - inc.shifted <= inc.last_day and (
+          best is None or (inc.amount, inc.policy_id) > (best.amount, best.policy_id)):
+        best = inc
+    return best
+
+
+INCENTIVES_SQL = '''
+    SELECT policy_id, target_hub_id, start_date, end_date, time_start, time_end, amount FROM incentive_policy
+    '''
+
+
+def _load_incentives(db):
+  return IncentiveIndex(db.execute(INCENTIVES_SQL).fetchall())
+
+
+def _load_regions(db):
+  return {h.hub_id: h.region for h in repository.hubs(db)}
+
+
+# ----- 계산 -----
+
+class Engine:
+  def __init__(self, fares, incentives, regions, offset_s=9 * 3600, default_per_min=100):
+    self.fares = fares
+    self.incentives = incentives
+    self.regions = regions
+    self.offset_s = offset_s
+    self.default_per_min = default_per_min
+
+  def _zone(self, hub_id):
+    return self.fares.code(self.regions.get(hub_id)) if hub_id is not None else self.fares.unknown
+
+  def quote(self, start_hub_id, end_hub_id, start_at, end_at=None):
+    """start_at ~ end_at(없으면 지금) 라이딩 한 건의 Price"""
+    if end_at is None:
+      end_s = int(time.time())
+      end_at = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(end_s))
+    else:
+      end_s = epoch(end_at)
+    start_s = epoch(start_at)
+    minutes = max(0, end_s - start_s) // 60
+    return self.price(start_hub_id, end_hub_id, start_s, end_s, minutes, end_at)
+
+  def price(self, start_hub_id, end_hub_id, start_s, end_s, minutes, end_at=None):
+    local = start_s + self.offset_s
+    fare = self.fares.find(self._zone(start_hub_id), self._zone(end_hub_id), local % DAY)
+    billed = max(1, minutes)
+    amount = billed * self.default_per_min if fare is None else billed * fare.per_min + fare.adj
+
+    inc = None
+    if end_hub_id is not None:
+      local = end_s + self.offset_s
+      inc = self.incentives.find(end_hub_id, local % DAY, local // DAY)
+    if inc is not None:
+      amount -= inc.amount
+    return Price(end_at, minutes, max(0, amount), int(inc is not None),
+                 fare.fare_id if fare else None, inc.policy_id if inc else None)
+
+  def price_many(self, start_hub, end_hub, start_s, end_s, minutes):
+    """
+    price() 의 배열판. 허브 id 는 허브 밖이면 0.
+    반환: (fare_amount, incentive_applied, fare_id, incentive_id), id 는 없으면 0
+    """
+    top = int(max(start_hub.max(initial=0), end_hub.max(initial=0), max(self.regions, default=0)))
+    zone = np.full(top + 1, self.fares.unknown, dtype=np.int64)
+    for hub_id, region in self.regions.items():
+      zone[hub_id] = self.fares.code(region)
+
+    fi = self.fares
+    tod = (start_s + self.offset_s) % DAY
+    key = (zone[start_hub] * fi.n + zone[end_hub]) * DAY + tod
+    seg = np.searchsorted(fi.keys, key, side="right") - 1
+    billed = np.maximum(1, minutes)
+    per_min = fi.per_min[seg]
+    amount = np.where(per_min < 0, billed * self.default_per_min, billed * per_min + fi.adj[seg])
+    fare_id = fi.fare_id[seg]
+
+    # 인센티브: 도착 허브로 정렬해서 정책마다 그 허브 구간만 본다
+    best = np.zeros(len(end_hub), dtype=np.int64)
+    best_id = np.zeros(len(end_hub), dtype=np.int64)
+    if self.incentives.pieces:
+      local = end_s + self.offset_s
+      etod, eday = local % DAY, local // DAY
+      order = np.argsort(end_hub, kind="stable")
+      hubs_sorted = end_hub[order]
+      for hub_id, cands in self.incentives.pieces.items():
+        lo_i, hi_i = np.searchsorted(hubs_sorted, [hub_id, hub_id + 1])
+        if lo_i == hi_i:
+          continue
+        idx = order[lo_i:hi_i]
+        t, d = etod[idx], eday[idx]
+        for lo, hi, inc in cands:
+          day = d - inc.shifted
+          hit = (t >= lo) & (t < hi) & (day >= inc.first_day) & (day <= inc.last_day)
+          # best_id == 0 은 "아직 없음" (find 의 best is None). 음수 인센티브도 고를 수 있게
+          cur, cur_id = best[idx], best_id[idx]
+          better = hit & ((cur_id == 0) | (inc.amount > cur) | ((inc.amount == cur) & (inc.policy_id > cur_id)))
+          best[idx] = np.where(better, inc.amount, best[idx])
+          best_id[idx] = np.where(better, inc.policy_id, best_id[idx])
+
+    applied = best_id > 0
+    return np.maximum(0, amount - best), applied.astype(np.int64), fare_id, best_id
+
+
+def get_engine():
+  """지금 정책으로 만든 Engine. 트랜잭션 밖에서 부른다. (색인 재생성/버전 트리거 설치가 읽기 연결을 쓴다)"""
+  cfg = current_app.config
+  return Engine(versioning.cached("fare_policy", "pricing_fares", _load_fares),
+                versioning.cached("incentive_policy", "pricing_incentives", _load_incentives),
+                versioning.cached("hub", "pricing_regions", _load_regions),
+                cfg["PRICING_UTC_OFFSET_S"], cfg["PRICING_DEFAULT_PER_MIN"])
+
+
+# ----- 배치 재계산 -----
+
+REPRICE_BATCH_SQL = '''
+    SELECT ride_id, start_hub_id, end_hub_id, start_at, end_at, duration_min, fare_amount, incentive_applied
+      FROM ride
+     WHERE ride_id > ? AND end_at IS NOT NULL AND start_at >= ?
+     ORDER BY ride_id
+     LIMIT ?
+    '''
+
+REPRICE_UPDATE_SQL = "UPDATE ride SET fare_amount = ?, incentive_applied = ? WHERE ride_id = ?"
+
+
+def reprice(batch=None, since=None, dry_run=False):
+  """
+  끝난 라이딩(start_at >= since)을 ride_id 순으로 batch 건씩 다시 계산해서 요금/인센티브가 바뀐 행만 고친다.
+  계산은 읽기 연결 + NumPy, writer 는 배치마다 UPDATE 에만 잡고 놓는다. 반환: 통계 dict
+  """
+  cfg = current_app.config
+  batch = batch or cfg["PRICING_REPRICE_BATCH"]
+  pause_s = cfg["PRICING_REPRICE_PAUSE_MS"] / 1000.0
+  engine = get_engine()
+  manager = get_manager()
+  reader = get_db()
+  stats = {"rides": 0, "changed": 0, "incentives": 0, "fare_total": 0, "compute_s": 0.0, "write_s": 0.0}
+  t0 = time.perf_counter()
+  after = 0
+  while True:
+    rows = reader.execute(REPRICE_BATCH_SQL, (after, since or "", batch)).fetchall()
+    if not rows:
+      break
+    t1 = time.perf_counter()
+    ride_id, start_hub, end_hub, start_at, end_at, minutes, old_fare, old_inc = zip(*rows)
+    start_s, end_s = epochs(start_at), epochs(end_at)
+    minutes = np.array([(-1 if m is None else m) for m in minutes], dtype=np.int64)
+    minutes = np.where(minutes < 0, np.maximum(0, end_s - start_s) // 60, minutes)
+    hub = lambda v: np.array([h or 0 for h in v], dtype=np.int64)
+    fare, inc, _, _ = engine.price_many(hub(start_hub), hub(end_hub), start_s, end_s, minutes)
+    ids = np.array(ride_id, dtype=np.int64)
+    changed = (fare != np.array([f or 0 for f in old_fare])) | (inc != np.array(old_inc))
+    updates = list(zip(fare[changed].tolist(), inc[changed].tolist(), ids[changed].tolist()))
+    stats["compute_s"] += time.perf_counter() - t1
+
+    if updates and not dry_run:
+      t1 = time.perf_counter()
+      db = manager.acquire_writer()
+      try:
+        with db:
+          db.executemany(REPRICE_UPDATE_SQL, updates)
+      finally:
+        manager.release_writer()
+      stats["write_s"] += time.perf_counter() - t1
+      time.sleep(pause_s)   # 배치 사이에 대여/반납 writer 에게 양보
+
+    stats["rides"] += len(rows)
+    stats["changed"] += len(updates)
+    stats["incentives"] += int(inc.sum())
+    stats["fare_total"] += int(fare.sum())
+    after = rows[-1][0]
+
+  stats["seconds"] = round(time.perf_counter() - t0, 3)
+  stats["compute_s"] = round(stats["compute_s"], 3)
+  stats["write_s"] = round(stats["write_s"], 3)
+  return stats
+
+
+@click.command('reprice-rides')
+@click.option('--since', default=None, help='이 날짜(YYYY-MM-DD, UTC) 이후 시작한 라이딩만')
+@click.option('--batch', type=int, default=None, help='한 번에 계산/갱신할 라이딩 수')
+@click.option('--dry-run', is_flag=True, help='계산만 하고 쓰지 않는다.')
+def reprice_rides_command(since, batch, dry_run):
+  for k, v in reprice(batch=batch, since=since, dry_run=dry_run).items():
+    click.echo(f'{k}: {v}')
+
+
+def init_app(app):
+  app.config.setdefault("PRICING_UTC_OFFSET_S", 9 * 3600)   # 현지 시각(KST)
+  app.config.setdefault("PRICING_DEFAULT_PER_MIN", 100)     # 맞는 요금 정책이 없을 때 분당 요금(원)
+  app.config.setdefault("PRICING_REPRICE_BATCH", 200000)
+  app.config.setdefault("PRICING_REPRICE_PAUSE_MS", 20)
+  app.cli.add_command(reprice_rides_command)
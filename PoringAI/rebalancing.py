@@ -0,0 +1,316 @@
+"""
+재배치 인센티브 자동 생성 (incentive_policy 의 'rebalancing')
+
+한 번 돌 때마다 (flask rebalance / REBALANCE_SCHEDULE_S 마다 백그라운드)
+1) 체크포인트 뒤의 새 라이딩만 읽어 허브 x REBALANCE_BUCKET_S 구간별 도착/출발 수를 hub_flow 에 더한다.
+   - 출발: ride_id 순 (INSERT 순서), 도착: (end_at, ride_id) 순 (idx_ride_end_at), 지금까지 끝난 것만
+   - 배치 집계는 NumPy (구간 키 np.unique), 배치마다 upsert + 체크포인트를 한 트랜잭션으로
+   - 가장 긴 창보다 오래된 구간은 지운다. 처음에는 그 창 안의 라이딩부터 시작한다.
+2) 허브별로 지금 주차 대수(hub_counters) 와 REBALANCE_WINDOWS_S 창들의 순유입(도착 - 출발) 속도로
+   REBALANCE_HORIZON_S 뒤 대수를 예상한다. (허브 x 구간 행렬의 누적합)
+   - 예상 >= capacity x REBALANCE_HIGH : 꽉 차 가는 허브 -> 가까운 허브(반경 REBALANCE_RADIUS_KM) 에 반납 인센티브
+   - 예상 <= capacity x REBALANCE_LOW  : 비어 가는 허브 -> 그 허브에 반납 인센티브
+3) 대상 허브마다 지금부터 REBALANCE_TTL_S 동안의 incentive_policy 를 만들고,
+   더는 대상이 아닌 허브의 것은 지금 시각에서 끊는다. (지난 라이딩의 재계산 결과가 바뀌지 않게 지우지 않는다)
+   만든 정책은 rebalancing_policy 에 적어 두고 그것만 건드린다. (사람이 넣은 정책은 그대로)
+인센티브는 pricing 이 도착 허브 기준으로 적용한다. 정책 시각은 현지 시각(PRICING_UTC_OFFSET_S).
+"""
+import threading
+import time
+
+import click
+import numpy as np
+from flask import current_app
+
+from . import metrics, pricing, spatial
+from .db import get_db, transaction
+
+DEPARTURES_SQL = "SELECT ride_id, start_hub_id, start_at FROM ride WHERE ride_id > ? ORDER BY ride_id LIMIT ?"
+
+ARRIVALS_SQL = '''
+    SELECT ride_id, end_hub_id, end_at FROM ride
+     WHERE end_at >= ? AND (end_at > ? OR ride_id > ?) AND end_at <= ?
+     ORDER BY end_at, ride_id
+     LIMIT ?
+    '''
+
+FLOW_UPSERT = '''
+    INSERT INTO hub_flow (hub_id, bucket_start, arrivals, departures) VALUES (?, ?, ?, ?)
+    ON CONFLICT(hub_id, bucket_start) DO UPDATE SET
+      arrivals   = arrivals + excluded.arrivals,
+      departures = departures + excluded.departures
+    '''
+
+CHECKPOINT_UPSERT = '''
+    INSERT INTO rebalancing_checkpoint (name, ride_id, end_at) VALUES (?, ?, ?)
+    ON CONFLICT(name) DO UPDATE SET ride_id = excluded.ride_id, end_at = excluded.end_at
+    '''
+
+CHECKPOINT_SQL = "SELECT ride_id, end_at FROM rebalancing_checkpoint WHERE name = ?"
+
+FLOW_SQL = "SELECT hub_id, bucket_start, arrivals, departures FROM hub_flow WHERE bucket_start >= ?"
+
+OCCUPANCY_SQL = "SELECT hub_id, parked_sum, total_sum FROM hub_counters"
+
+OPEN_SQL = "SELECT policy_id, hub_id, ends_at FROM rebalancing_policy WHERE expired_at IS NULL"
+
+INSERT_POLICY_SQL = '''
+    INSERT INTO incentive_policy (target_hub_id, start_date, end_date, time_start, time_end, amount, policy_type)
+    VALUES (?, ?, ?, ?, ?, ?, 'rebalancing')
+    '''
+
+
+def _ts(seconds):
+  return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds))
+
+
+def _local(seconds):
+  """유닉스 초 -> 현지 ('YYYY-MM-DD', 'HH:MM:SS')"""
+  t = time.gmtime(seconds + current_app.config["PRICING_UTC_OFFSET_S"])
+  return time.strftime("%Y-%m-%d", t), time.strftime("%H:%M:%S", t)
+
+
+# ----- 1) 증분 집계 -----
+
+def aggregate(hub_ids, times, bucket_s, since):
+  """라이딩 배치 -> [(hub_id, bucket_start, 건수)]. 허브 밖(NULL)과 since 이전은 버린다."""
+  hubs = np.array([h or 0 for h in hub_ids], dtype=np.int64)
+  t = pricing.epochs(times)
+  keep = (hubs > 0) & (t >= since)
+  keys, counts = np.unique((hubs[keep] << 32) | (t[keep] // bucket_s), return_counts=True)
+  return list(zip((keys >> 32).tolist(), ((keys & 0xFFFFFFFF) * bucket_s).tolist(), counts.tolist()))
+
+
+def first_ride_since(db, cutoff):
+  """start_at >= cutoff 인 첫 ride_id 근처 (ride_id 와 start_at 이 같이 늘어난다고 보고 PK 로 이분 탐색)"""
+  lo, hi = db.execute("SELECT COALESCE(MIN(ride_id), 0), COALESCE(MAX(ride_id), 0) FROM ride").fetchone()
+  while lo < hi:
+    mid = (lo + hi) // 2
+    row = db.execute("SELECT start_at FROM ride WHERE ride_id >= ? ORDER BY ride_id LIMIT 1", (mid,)).fetchone()
+    if row[0] < cutoff:
+      lo = mid + 1
+    else:
+      hi = mid
+  return lo
+
+
+def _checkpoints(db, cutoff):
+  rows = {r[0]: (r[1], r[2]) for r in db.execute("SELECT name, ride_id, end_at FROM rebalancing_checkpoint")}
+  if "departures" not in rows:
+    rows["departures"] = (first_ride_since(db, cutoff) - 1, None)
+  if "arrivals" not in rows:
+    rows["arrivals"] = (0, cutoff)
+  return rows
+
+
+def ingest(now, batch, bucket_s, keep_s):
+  """
+  체크포인트 뒤의 라이딩을 hub_flow 에 더한다. 반환: (출발 수, 도착 수)
+  배치는 reader 에서 읽고, 쓰기 트랜잭션 안에서 체크포인트가 읽기 시작한 값 그대로일 때만 더한다.
+  (다른 프로세스가 그 사이 같은 배치를 더했으면 버리고 옮겨진 체크포인트부터 다시 읽는다)
+  """
+  reader = get_db()
+  since, until = now - keep_s, _ts(now)
+  cuts = _checkpoints(reader, _ts(since))
+  counted = {"departures": 0, "arrivals": 0}
+
+  def drain(name, fetch, column):
+    start = cuts[name]
+    while True:
+      rows = fetch(*start)
+      if not rows:
+        return
+      ids, hubs, times = zip(*rows)
+      flows = aggregate(hubs, times, bucket_s, since)
+      done = (ids[-1], times[-1] if name == "arrivals" else None)
+      with transaction() as db:
+        stored = db.execute(CHECKPOINT_SQL, (name,)).fetchone()
+        moved = stored is not None and tuple(stored) != start
+        if not moved:
+          db.executemany(FLOW_UPSERT, [(h, b, n, 0) if column == "arrivals" else (h, b, 0, n) for h, b, n in flows])
+          db.execute(CHECKPOINT_UPSERT, (name, *done))
+      if moved:
+        start = tuple(stored)
+        continue
+      start = done
+      counted[name] += len(rows)
+      if len(rows) < batch:
+        return
+
+  drain("departures", lambda rid, _: reader.execute(DEPARTURES_SQL, (rid, batch)).fetchall(), "departures")
+  drain("arrivals",
+        lambda rid, end_at: reader.execute(ARRIVALS_SQL, (end_at, end_at, rid, until, batch)).fetchall(), "arrivals")
+  with transaction() as db:
+    db.execute("DELETE FROM hub_flow WHERE bucket_start < ?", (since - bucket_s,))
+  return counted["departures"], counted["arrivals"]
+
+
+# ----- 2) 추세 -----
+
+def assess(db, now, windows, bucket_s, horizon_s, high, low):
+  """
+  허브별 {hub_id: (parked, capacity, 순유입 속도(대/시), 예상 대수, 'full' | 'empty' | None)}
+  창마다 순유입 속도를 구해 평균하고, 지금 대수 + 속도 x horizon 을 예상으로 본다.
+  """
+  occ = {r[0]: (r[1], r[2]) for r in db.execute(OCCUPANCY_SQL)}
+  ids = np.array(sorted(occ), dtype=np.int64)
+  if not len(ids):
+    return {}
+  n_buckets = max(windows) // bucket_s + 1
+  net = np.zeros((len(ids), n_buckets))
+  rows = db.execute(FLOW_SQL, (now - max(windows),)).fetchall()
+  if rows:
+    hub, start, arr, dep = (np.array(c, dtype=np.int64) for c in zip(*rows))
+    pos = np.searchsorted(ids, hub)
+    ok = (pos < len(ids)) & (ids[np.minimum(pos, len(ids) - 1)] == hub)
+    age = np.clip((now - start) // bucket_s, 0, n_buckets - 1)   # 0 = 지금 구간
+    np.add.at(net, (pos[ok], age[ok]), (arr - dep)[ok])
+  recent = np.cumsum(net, axis=1)   # recent[:, k] = 최근 k+1 구간의 순유입
+  rate = np.mean([recent[:, min(n_buckets, max(1, w // bucket_s)) - 1] / w for w in windows], axis=0)
+
+  parked = np.array([occ[h][0] for h in ids.tolist()], dtype=float)
+  capacity = np.array([occ[h][1] for h in ids.tolist()], dtype=float)
+  projected = np.clip(parked + rate * horizon_s, 0, None)
+  full = (capacity > 0) & (projected >= capacity * high)
+  empty = (capacity > 0) & (projected <= capacity * low)
+  state = np.where(full, "full", np.where(empty, "empty", ""))
+  return {h: (int(p), int(c), round(float(r) * 3600, 2), round(float(x), 1), s or None)
+          for h, p, c, r, x, s in zip(ids.tolist(), parked, capacity, rate, projected, state.tolist())}
+
+
+def targets(trends, radius_km, divert):
+  """{인센티브 걸 허브: (reason, source_hub_id)}"""
+  out = {h: ("empty", h) for h, t in trends.items() if t[4] == "empty"}
+  index = spatial.get_index()
+  hubs = {h.hub_id: h for h in index.hubs}
+  for h, t in trends.items():
+    if t[4] != "full" or h not in hubs:
+      continue
+    near = index.nearest(hubs[h].lat, hubs[h].lon, k=divert + 1, radius_km=radius_km,
+                         accept=lambda c: c.hub_id != h and trends.get(c.hub_id, (0, 0, 0, 0, None))[4] != "full")
+    for hit in near[:divert]:
+      out.setdefault(hit.hub.hub_id, ("full", h))
+  return out
+
+
+# ----- 3) 정책 -----
+
+def _expire(db, policy_id, now):
+  """정책을 지금 시각에서 끊는다. 아직 한 순간도 지나지 않았으면 지운다."""
+  row = db.execute("SELECT time_start FROM incentive_policy WHERE policy_id = ?", (policy_id,)).fetchone()
+  _, hms = _local(now)
+  if row is not None:
+    if row[0] == hms:
+      db.execute("DELETE FROM incentive_policy WHERE policy_id = ?", (policy_id,))
+    else:
+      db.execute("UPDATE incentive_policy SET time_end = ? WHERE policy_id = ?", (hms, policy_id))
+  db.execute("UPDATE rebalancing_policy SET expired_at = ? WHERE policy_id = ?", (now, policy_id))
+
+
+def apply(db, wanted, now, ttl_s, amount):
+  """wanted({hub: (reason, source)}) 에 맞춰 정책을 만들고/끊는다. 반환: (만든 수, 끊은 수)"""
+  ttl_s = min(ttl_s, 86400 - 60)   # 하루를 넘는 시각 구간은 표현할 수 없다
+  emitted = expired = 0
+  open_ = {}
+  for policy_id, hub_id, ends_at in db.execute(OPEN_SQL).fetchall():
+    if ends_at <= now:
+      db.execute("UPDATE rebalancing_policy SET expired_at = ends_at WHERE policy_id = ?", (policy_id,))
+    elif hub_id not in wanted or ends_at - now < ttl_s / 2:
+      # 대상에서 빠졌거나 곧 끝나면 지금 끊고, 계속 대상이면 아래에서 새로 건다
+      _expire(db, policy_id, now)
+      expired += 1
+    else:
+      open_[hub_id] = policy_id
+  for hub_id, (reason, source) in sorted(wanted.items()):
+    if hub_id in open_:
+      continue
+    day, start = _local(now)
+    _, end = _local(now + ttl_s)
+    policy_id = db.execute(INSERT_POLICY_SQL, (hub_id, day, day, start, end, amount)).lastrowid
+    db.execute("INSERT INTO rebalancing_policy (policy_id, hub_id, reason, source_hub_id, created_at, ends_at) "
+               "VALUES (?, ?, ?, ?, ?, ?)", (policy_id, hub_id, reason, source, now, now + ttl_s))
+    emitted += 1
+  return emitted, expired
+
+
+def run(now=None, dry_run=False):
+  """한 번 실행 (app context 안에서). 반환: 통계 dict"""
+  cfg = current_app.config
+  now = int(time.time() if now is None else now)
+  windows = tuple(int(w) for w in cfg["REBALANCE_WINDOWS_S"])
+  bucket_s = int(cfg["REBALANCE_BUCKET_S"])
+  t0 = time.perf_counter()
+
+  departures, arrivals = ingest(now, cfg["REBALANCE_BATCH"], bucket_s, max(windows))
+  t1 = time.perf_counter()
+  trends = assess(get_db(), now, windows, bucket_s, cfg["REBALANCE_HORIZON_S"],
+                  cfg["REBALANCE_HIGH"], cfg["REBALANCE_LOW"])
+  wanted = targets(trends, cfg["REBALANCE_RADIUS_KM"], cfg["REBALANCE_DIVERT_HUBS"])
+  emitted = expired = 0
+  if not dry_run:
+    with transaction() as db:
+      emitted, expired = apply(db, wanted, now, cfg["REBALANCE_TTL_S"], cfg["REBALANCE_AMOUNT"])
+
+  stats = {
+    "departures": departures, "arrivals": arrivals,
+    "full": sorted(h for h, t in trends.items() if t[4] == "full"),
+    "empty": sorted(h for h, t in trends.items() if t[4] == "empty"),
+    "targets": sorted(wanted), "emitted": emitted, "expired": expired,
+    "ingest_s": round(t1 - t0, 3), "seconds": round(time.perf_counter() - t0, 3),
+  }
+  metrics.log("rebalance", **{k: v for k, v in stats.items() if k not in ("full", "empty", "targets")})
+  return stats
+
+
+class Scheduler:
+  """REBALANCE_SCHEDULE_S 마다 run() 을 부르는 데몬 스레드 (프로세스당 하나)"""
+
+  def __init__(self, app, every_s):
+    self.app = app
+    self.every_s = every_s
+    self.runs = 0
+    self.last = None
+    self._thread = None
+    self._lock = threading.Lock()
+
+  def start(self):
+    with self._lock:
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._loop, name="rebalancing", daemon=True)
+        self._thread.start()
+
+  def _loop(self):
+    while True:
+      time.sleep(self.every_s)
+      with self.app.app_context():
+        try:
+          self.last = run()
+          self.runs += 1
+        except Exception as e:
+          self.app.logger.warning("rebalancing run failed: %s", e)
+
+
+@click.command('rebalance')
+@click.option('--dry-run', is_flag=True, help='집계와 판정만 하고 정책은 바꾸지 않는다.')
+def rebalance_command(dry_run):
+  for k, v in run(dry_run=dry_run).items():
+    click.echo(f'{k}: {v}')
+
+
+def init_app(app):
+  app.config.setdefault("REBALANCE_BUCKET_S", 300)
+  app.config.setdefault("REBALANCE_WINDOWS_S", (900, 3600))   # 순유입 속도를 볼 창들
+  app.config.setdefault("REBALANCE_HORIZON_S", 3600)          # 이만큼 뒤의 대수를 예상
+  app.config.setdefault("REBALANCE_HIGH", 0.9)
+  app.config.setdefault("REBALANCE_LOW", 0.1)
+  app.config.setdefault("REBALANCE_RADIUS_KM", 0.5)
+  app.config.setdefault("REBALANCE_DIVERT_HUBS", 2)
+  app.config.setdefault("REBALANCE_AMOUNT", 300)
+  app.config.setdefault("REBALANCE_TTL_S", 3600)
+  app.config.setdefault("REBALANCE_BATCH", 50000)
+  app.config.setdefault("REBALANCE_SCHEDULE_S", 0)   # 0 이면 스케줄러 끔
+
+  app.cli.add_command(rebalance_command)
+  if app.config["REBALANCE_SCHEDULE_S"]:
+    scheduler = app.extensions["rebalancing"] = Scheduler(app, float(app.config["REBALANCE_SCHEDULE_S"]))
+    app.before_request(scheduler.start)
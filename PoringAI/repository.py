@@ -0,0 +1,283 @@
+"""
+정식 스키마(schema.sql: user/hub/bike/ride/lock_status) 조회·갱신을 한곳에 모은 데이터 접근 계층.
+
+- 라우트/서비스는 SQL 을 직접 쓰지 않고 여기 함수를 부른다.
+- 조회 결과는 sqlite3.Row -> dict 복사 대신 __slots__ 행 객체로 바로 만든다. (cursor.row_factory)
+- SQL 은 모듈 상수라서 연결의 문장 캐시(cached_statements)에서 재사용된다.
+- 자주 쓰는 조회는 HOT_QUERIES 에 등록하고, `flask explain-queries` 로 실행 계획을 확인한다.
+
+쓰기 함수는 커밋하지 않는다. 트랜잭션 경계(commit/rollback)는 호출한 쪽(writer 연결)이 정한다.
+허브별 대수/집계 테이블 유지(counters, retention, telemetry, log_writer)는 각 모듈이 자기 SQL 을 가진다.
+"""
+import click
+
+from .db import get_db
+
+
+class _Row:
+  __slots__ = ()
+
+  def __init__(self, *values):
+    for name, value in zip(self.__slots__, values):
+      setattr(self, name, value)
+
+  @classmethod
+  def _factory(cls, cursor, row):
+    return cls(*row)
+
+  def as_dict(self):
+    return {name: getattr(self, name) for name in self.__slots__}
+
+  def __repr__(self):
+    return f"{type(self).__name__}({', '.join(f'{k}={getattr(self, k)!r}' for k in self.__slots__)})"
+
+
+class Hub(_Row):
+  __slots__ = ("hub_id", "hub_name", "lat", "lon", "region")
+
+
+class Occupancy(_Row):
+  # menu2 지도 / /api/hub-occupancy 응답 키 그대로
+  __slots__ = ("hub_id", "hub_name", "latitude", "longitude", "parked_sum", "total_sum", "available_bikes")
+
+
+class User(_Row):
+  __slots__ = ("user_id", "name", "grade")
+
+
+class Bike(_Row):
+  __slots__ = ("bike_id", "current_hub_id", "lock_state", "battery_percent", "is_available")
+
+
+class Ride(_Row):
+  __slots__ = ("ride_id", "user_id", "bike_id", "start_hub_id", "start_at")
+
+
+class Lock(_Row):
+  __slots__ = ("lock_id", "transferable")
+
+
+def _all(db, cls, sql, params=()):
+  cur = db.cursor()
+  cur.row_factory = cls._factory
+  return cur.execute(sql, params).fetchall()
+
+
+def _one(db, cls, sql, params=()):
+  cur = db.cursor()
+  cur.row_factory = cls._factory
+  return cur.execute(sql, params).fetchone()
+
+
+# ----- 허브 -----
+
+HUBS_SQL = "SELECT hub_id, name, lat, lng, region FROM hub ORDER BY hub_id"
+
+OCCUPANCY_SQL = '''
+    SELECT h.hub_id, h.name, h.lat, h.lng,
+           COALESCE(c.parked_sum, 0),
+           COALESCE(c.total_sum, 0),
+           COALESCE(c.available_bikes, 0)
+      FROM hub h
+      LEFT JOIN hub_counters c ON c.hub_id = h.hub_id
+     WHERE COALESCE(c.version, 0) > ?
+     ORDER BY h.hub_id
+    '''
+
+HUB_FULL_SQL = "SELECT parked_sum >= total_sum FROM hub_counters WHERE hub_id = ?"
+
+
+def hubs(db):
+  """허브 전체 (hub_id 순)"""
+  return _all(db, Hub, HUBS_SQL)
+
+
+def occupancy(db, since=-1):
+  """
+  menu2 지도용 허브별 주차 현황.
+  since 를 주면 그 hub_counters 버전 이후에 값이 바뀐 허브만.
+  """
+  return _all(db, Occupancy, OCCUPANCY_SQL, (since,))
+
+
+def hub_is_full(db, hub_id) -> bool:
+  """허브에 주차된 대수가 capacity 이상인지. 없는 허브는 False."""
+  row = db.execute(HUB_FULL_SQL, (hub_id,)).fetchone()
+  return bool(row and row[0])
+
+
+# ----- 사용자 -----
+
+USER_SQL = "SELECT user_id, name, grade FROM user WHERE user_id = ?"
+
+
+def user_by_id(db, user_id):
+  return _one(db, User, USER_SQL, (user_id,))
+
+
+# ----- 자전거 -----
+
+BIKE_SQL = "SELECT bike_id, current_hub_id, lock_state, battery_percent, is_available FROM bike WHERE bike_id = ?"
+
+# 비교 후 교체(CAS): 읽은 상태(is_available, lock_state)가 그대로일 때만 바꾼다
+SET_BIKE_STATE_SQL = '''
+    UPDATE bike SET is_available = ?, lock_state = ?
+     WHERE bike_id = ? AND is_available = ? AND lock_state = ?
+    '''
+
+SET_BIKE_STATE_OFF_HUB_SQL = '''
+    UPDATE bike SET is_available = ?, lock_state = ?, current_hub_id = NULL
+     WHERE bike_id = ? AND is_available = ? AND lock_state = ?
+    '''
+
+
+def bike_by_id(db, bike_id):
+  return _one(db, Bike, BIKE_SQL, (bike_id,))
+
+
+def set_bike_state(db, bike_id, expect, to, off_hub=False) -> bool:
+  """
+  expect=(is_available, lock_state) 일 때만 to 로 바꾼다. off_hub 면 허브에서도 뺀다.
+  다른 요청이 먼저 바꿨으면 False.
+  """
+  sql = SET_BIKE_STATE_OFF_HUB_SQL if off_hub else SET_BIKE_STATE_SQL
+  return db.execute(sql, (*to, bike_id, *expect)).rowcount == 1
+
+
+# ----- 라이딩 -----
+
+RIDE_COLUMNS = "ride_id, user_id, bike_id, start_hub_id, start_at"
+
+START_RIDE_SQL = '''
+    INSERT INTO ride (user_id, bike_id, start_hub_id, start_at) VALUES (?, ?, ?, ?)
+    '''
+
+OPEN_RIDE_SQL = f'''
+    SELECT {RIDE_COLUMNS} FROM ride
+     WHERE bike_id = ? AND user_id = ? AND end_at IS NULL
+     ORDER BY start_at DESC
+     LIMIT 1
+    '''
+
+OPEN_RIDE_BY_BIKE_SQL = f'''
+    SELECT {RIDE_COLUMNS} FROM ride WHERE bike_id = ? AND end_at IS NULL ORDER BY start_at DESC LIMIT 1
+    '''
+
+OPEN_RIDE_BY_USER_SQL = f'''
+    SELECT {RIDE_COLUMNS} FROM ride WHERE user_id = ? AND end_at IS NULL ORDER BY start_at DESC LIMIT 1
+    '''
+
+END_RIDE_SQL = '''
+    UPDATE ride
+       SET end_hub_id        = ?,
+           end_at            = ?,
+           duration_min      = ?,
+           fare_amount       = ?,
+           incentive_applied = ?
+     WHERE ride_id = ? AND end_at IS NULL
+    '''
+
+
+def start_ride(db, user_id, bike_id, start_hub_id, start_at):
+  """새 라이딩 ride_id"""
+  return db.execute(START_RIDE_SQL, (user_id, bike_id, start_hub_id, start_at)).lastrowid
+
+
+def open_ride(db, user_id, bike_id):
+  """user 가 bike 로 진행 중인 가장 최근 라이딩 (없으면 None)"""
+  return _one(db, Ride, OPEN_RIDE_SQL, (bike_id, user_id))
+
+
+def open_ride_by_bike(db, bike_id):
+  return _one(db, Ride, OPEN_RIDE_BY_BIKE_SQL, (bike_id,))
+
+
+def open_ride_by_user(db, user_id):
+  return _one(db, Ride, OPEN_RIDE_BY_USER_SQL, (user_id,))
+
+
+def end_ride(db, ride_id, price, end_hub_id=None) -> bool:
+  """
+  진행 중인 라이딩을 price(pricing.Price: 끝난 시각/분/요금/인센티브)대로 끝낸다.
+  end_hub_id 는 반납한 허브(존 반납이면 그 존의 허브), 허브와 상관없는 곳이면 NULL. 이미 끝났으면 False.
+  """
+  return db.execute(END_RIDE_SQL, (end_hub_id, price.end_at, price.duration_min, price.fare_amount,
+                                   price.incentive_applied, ride_id)).rowcount == 1
+
+
+# ----- 잠금 -----
+
+ACTIVE_LOCK_SQL = '''
+    SELECT lock_id, transferable FROM lock_status
+     WHERE bike_id = ? AND user_id = ? AND is_active = 1
+     ORDER BY locked_at DESC
+     LIMIT 1
+    '''
+
+DEACTIVATE_LOCKS_SQL = "UPDATE lock_status SET is_active = 0 WHERE bike_id = ? AND user_id = ? AND is_active = 1"
+
+DEACTIVATE_BIKE_LOCKS_SQL = "UPDATE lock_status SET is_active = 0 WHERE bike_id = ? AND is_active = 1"
+
+ADD_LOCK_SQL = '''
+    INSERT INTO lock_status (bike_id, user_id, locked_at, lat, lng, transferable, is_active)
+    VALUES (?, ?, datetime('now'), ?, ?, ?, 1)
+    '''
+
+SET_TRANSFERABLE_SQL = "UPDATE lock_status SET transferable = 1 WHERE lock_id = ? AND is_active = 1 AND transferable = 0"
+
+
+def active_lock(db, user_id, bike_id):
+  return _one(db, Lock, ACTIVE_LOCK_SQL, (bike_id, user_id))
+
+
+def deactivate_locks(db, user_id, bike_id):
+  """user 가 bike 에 걸어 둔 활성 잠금을 모두 끈다."""
+  db.execute(DEACTIVATE_LOCKS_SQL, (bike_id, user_id))
+
+
+def deactivate_bike_locks(db, bike_id):
+  """bike 에 걸린 활성 잠금을 누가 걸었든 모두 끈다. (새 사용자가 가져갈 때)"""
+  db.execute(DEACTIVATE_BIKE_LOCKS_SQL, (bike_id,))
+
+
+def add_lock(db, user_id, bike_id, lat=None, lng=None, transferable=False):
+  return db.execute(ADD_LOCK_SQL, (bike_id, user_id, lat, lng, int(bool(transferable)))).lastrowid
+
+
+def set_lock_transferable(db, lock_id) -> bool:
+  """활성이고 아직 양도 불가인 잠금만 양도 가능으로. 바꿨으면 True."""
+  return db.execute(SET_TRANSFERABLE_SQL, (lock_id,)).rowcount == 1
+
+
+# 요청 경로에서 자주 쓰는 조회와 예시 파라미터 (explain-queries)
+HOT_QUERIES = {
+  "hubs": (HUBS_SQL, ()),
+  "occupancy": (OCCUPANCY_SQL, (-1,)),
+  "hub_is_full": (HUB_FULL_SQL, (1,)),
+  "user_by_id": (USER_SQL, (1,)),
+  "bike_by_id": (BIKE_SQL, (1,)),
+  "open_ride": (OPEN_RIDE_SQL, (1, 1)),
+  "open_ride_by_bike": (OPEN_RIDE_BY_BIKE_SQL, (1,)),
+  "open_ride_by_user": (OPEN_RIDE_BY_USER_SQL, (1,)),
+  "active_lock": (ACTIVE_LOCK_SQL, (1, 1)),
+}
+
+
+def explain(db):
+  """{이름: [EXPLAIN QUERY PLAN 줄]}"""
+  return {
+    name: [r["detail"] for r in db.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+    for name, (sql, params) in HOT_QUERIES.items()
+  }
+
+
+@click.command('explain-queries')
+def explain_queries_command():
+  for name, plan in explain(get_db()).items():
+    click.echo(name)
+    for line in plan:
+      click.echo(f'  {line}')
+
+
+def init_app(app):
+  app.cli.add_command(explain_queries_command)
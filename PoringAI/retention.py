@@ -0,0 +1,237 @@
+"""
+위치/상태 로그 보존 정책 (다운샘플링 + 시간별 허브 롤업)
+
+RETENTION_RAW_DAYS 보다 오래된 원본 로그를
+- bike_location_summary : 자전거별 RETENTION_BUCKET_S 구간 (샘플 수, 좌표 합, 처음/마지막 시각)
+- bike_status_summary   : 자전거별 구간 x 상태별 횟수
+- hub_hourly_rollup     : 허브별 1시간 (샘플 수, 자전거-구간 수)
+로 합친 뒤 원본을 지운다. (요약 테이블은 schema.sql)
+
+log_id 순서로 RETENTION_BATCH 줄씩 짧은 트랜잭션으로 처리하고 배치 사이에 쉬어서
+대여/반납/텔레메트리 쓰기가 오래 기다리지 않게 한다.
+요약은 합계로 저장하므로 여러 번 나눠 돌려도 결과가 같고, 배치마다 집계와 삭제를
+같은 트랜잭션에서 하므로 여러 프로세스가 동시에 돌려도 두 번 더해지지 않는다.
+
+실행: flask retention [--days N] / RETENTION_SCHEDULE_S > 0 이면 백그라운드로 주기 실행
+"""
+import threading
+import time
+
+import click
+from flask import current_app
+
+from . import spatial
+from .db import get_db, transaction
+
+BUCKET = "datetime((CAST(strftime('%s', logged_at) AS INTEGER) / {iv}) * {iv}, 'unixepoch')"
+
+LOCATION_BATCH_SQL = '''
+    SELECT bike_id, {bucket} AS bucket_start, COUNT(*) AS samples,
+           SUM(lat) AS lat_sum, SUM(lng) AS lng_sum,
+           MIN(logged_at) AS first_at, MAX(logged_at) AS last_at
+      FROM bike_location_log
+     WHERE log_id > ? AND log_id <= ? AND logged_at < ?
+     GROUP BY bike_id, bucket_start
+    '''
+
+LOCATION_UPSERT = '''
+    INSERT INTO bike_location_summary (bike_id, bucket_start, samples, lat_sum, lng_sum, first_at, last_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(bike_id, bucket_start) DO UPDATE SET
+      samples  = samples + excluded.samples,
+      lat_sum  = lat_sum + excluded.lat_sum,
+      lng_sum  = lng_sum + excluded.lng_sum,
+      first_at = MIN(first_at, excluded.first_at),
+      last_at  = MAX(last_at, excluded.last_at)
+    '''
+
+STATUS_BATCH_SQL = '''
+    SELECT bike_id, {bucket} AS bucket_start, status, COUNT(*) AS samples
+      FROM bike_status_log
+     WHERE log_id > ? AND log_id <= ? AND logged_at < ?
+     GROUP BY bike_id, bucket_start, status
+    '''
+
+STATUS_UPSERT = '''
+    INSERT INTO bike_status_summary (bike_id, bucket_start, status, samples) VALUES (?, ?, ?, ?)
+    ON CONFLICT(bike_id, bucket_start, status) DO UPDATE SET samples = samples + excluded.samples
+    '''
+
+HUB_UPSERT = '''
+    INSERT INTO hub_hourly_rollup (hub_id, hour, samples, bike_buckets) VALUES (?, ?, ?, ?)
+    ON CONFLICT(hub_id, hour) DO UPDATE SET
+      samples      = samples + excluded.samples,
+      bike_buckets = bike_buckets + excluded.bike_buckets
+    '''
+
+
+def _batch_range(db, table, after, limit):
+  row = db.execute(
+    f"SELECT MAX(log_id), COUNT(*) FROM (SELECT log_id FROM {table} WHERE log_id > ? ORDER BY log_id LIMIT ?)",
+    (after, limit),
+  ).fetchone()
+  return row[0], row[1]
+
+
+def _hub_rollups(index, rows, radius_km):
+  """자전거-구간 요약을 가장 가까운 허브 / 시각(시간 단위)으로 묶는다."""
+  out = {}
+  for r in rows:
+    lat, lng = r["lat_sum"] / r["samples"], r["lng_sum"] / r["samples"]
+    hits = index.nearest(lat, lng, k=1, radius_km=radius_km)
+    if not hits:
+      continue
+    key = (hits[0].hub.hub_id, r["bucket_start"][:13] + ":00:00")
+    samples, buckets = out.get(key, (0, 0))
+    out[key] = (samples + r["samples"], buckets + 1)
+  return [(hub_id, hour, s, b) for (hub_id, hour), (s, b) in out.items()]
+
+
+class RetentionStats:
+  def __init__(self):
+    self.location_rows = 0
+    self.status_rows = 0
+    self.summaries = 0
+    self.hub_rollups = 0
+    self.batches = 0
+    self.seconds = 0.0
+
+  def as_dict(self):
+    return dict(self.__dict__, seconds=round(self.seconds, 3))
+
+
+def _process(table, cutoff, batch, pause_s, prepare, counted):
+  """
+  table 을 log_id 순서로 batch 줄씩 훑는다.
+  배치 범위는 읽기 연결에서 정하고, 집계(prepare -> [(sql, rows)]) + upsert + 원본 삭제는
+  한 BEGIN IMMEDIATE 안에서 한다. 요약은 더하기(upsert)라서, 같은 범위를 다른 실행
+  (워커마다 있는 스케줄러, flask retention)이 먼저 처리했으면 잠금을 잡은 뒤에는
+  원본이 이미 지워져 있어 아무것도 더하지 않는다.
+  텔레메트리는 지난 시각(ts)도 받으므로 log_id 순서가 시각 순서와 같지 않다.
+  오래된 줄이 없는 배치는 쓰기 잠금 없이 건너뛰고 끝까지 훑는다.
+  """
+  reader = get_db()
+  after = 0
+  while True:
+    hi, n = _batch_range(reader, table, after, batch)
+    if not n:
+      return
+    old_sql = f"SELECT COUNT(*) FROM {table} WHERE log_id > ? AND log_id <= ? AND logged_at < ?"
+    if not reader.execute(old_sql, (after, hi, cutoff)).fetchone()[0]:
+      after = hi
+      continue
+
+    with transaction() as db:
+      old = db.execute(old_sql, (after, hi, cutoff)).fetchone()[0]
+      if old:
+        for sql, rows in prepare(db, after, hi):
+          db.executemany(sql, rows)
+        db.execute(f"DELETE FROM {table} WHERE log_id > ? AND log_id <= ? AND logged_at < ?", (after, hi, cutoff))
+    counted(old)
+    after = hi
+    time.sleep(pause_s)   # 배치 사이에 다른 writer 에게 양보
+
+
+def run(days=None, batch=None):
+  """보존 정책 한 번 실행. (app context 안에서)"""
+  cfg = current_app.config
+  days = cfg["RETENTION_RAW_DAYS"] if days is None else days
+  batch = batch or cfg["RETENTION_BATCH"]
+  interval = int(cfg["RETENTION_BUCKET_S"])
+  pause_s = cfg["RETENTION_PAUSE_MS"] / 1000.0
+  radius_km = cfg["RETENTION_HUB_RADIUS_KM"]
+
+  db = get_db()
+  cutoff = db.execute("SELECT datetime('now', ?)", (f"-{int(days)} days",)).fetchone()[0]
+  try:
+    index = spatial.get_index()
+  except Exception:
+    index = None   # hub 테이블이 없으면 허브 롤업은 건너뛴다
+
+  stats = RetentionStats()
+  t0 = time.perf_counter()
+  location_sql = LOCATION_BATCH_SQL.format(bucket=BUCKET.format(iv=interval))
+  status_sql = STATUS_BATCH_SQL.format(bucket=BUCKET.format(iv=interval))
+
+  def locations(db, lo, hi):
+    rows = db.execute(location_sql, (lo, hi, cutoff)).fetchall()
+    stats.summaries += len(rows)
+    writes = [(LOCATION_UPSERT, [tuple(r) for r in rows])]
+    if index is not None and len(index):
+      rollups = _hub_rollups(index, rows, radius_km)
+      stats.hub_rollups += len(rollups)
+      writes.append((HUB_UPSERT, rollups))
+    return writes
+
+  def statuses(db, lo, hi):
+    return [(STATUS_UPSERT, [tuple(r) for r in db.execute(status_sql, (lo, hi, cutoff))])]
+
+  def counted(attr):
+    def add(n):
+      setattr(stats, attr, getattr(stats, attr) + n)
+      stats.batches += 1
+    return add
+
+  _process("bike_location_log", cutoff, batch, pause_s, locations, counted("location_rows"))
+  _process("bike_status_log", cutoff, batch, pause_s, statuses, counted("status_rows"))
+  stats.seconds = time.perf_counter() - t0
+  return stats
+
+
+def hub_history(db, hub_id, since):
+  """허브의 시간별 롤업 (since 이후, 시간 순)"""
+  return db.execute(
+    "SELECT hour, samples, bike_buckets FROM hub_hourly_rollup WHERE hub_id = ? AND hour >= ? ORDER BY hour",
+    (hub_id, since),
+  ).fetchall()
+
+
+class Scheduler:
+  """RETENTION_SCHEDULE_S 마다 run() 을 부르는 데몬 스레드 (프로세스당 하나)"""
+
+  def __init__(self, app, every_s):
+    self.app = app
+    self.every_s = every_s
+    self.runs = 0
+    self.last = None
+    self._thread = None
+    self._lock = threading.Lock()
+
+  def start(self):
+    with self._lock:
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._loop, name="retention", daemon=True)
+        self._thread.start()
+
+  def _loop(self):
+    while True:
+      time.sleep(self.every_s)
+      with self.app.app_context():
+        try:
+          self.last = run().as_dict()
+          self.runs += 1
+        except Exception as e:
+          self.app.logger.warning("retention run failed: %s", e)
+
+
+@click.command('retention')
+@click.option('--days', type=int, default=None, help='이 일수보다 오래된 원본을 요약한다.')
+@click.option('--batch', type=int, default=None, help='한 트랜잭션에서 처리할 원본 줄 수')
+def retention_command(days, batch):
+  stats = run(days=days, batch=batch)
+  for k, v in stats.as_dict().items():
+    click.echo(f'{k}: {v}')
+
+
+def init_app(app):
+  app.config.setdefault("RETENTION_RAW_DAYS", 7)
+  app.config.setdefault("RETENTION_BUCKET_S", 300)
+  app.config.setdefault("RETENTION_BATCH", 2000)
+  app.config.setdefault("RETENTION_PAUSE_MS", 20)
+  app.config.setdefault("RETENTION_HUB_RADIUS_KM", 0.3)
+  app.config.setdefault("RETENTION_SCHEDULE_S", 0)   # 0 이면 스케줄러 끔
+
+  app.cli.add_command(retention_command)
+  if app.config["RETENTION_SCHEDULE_S"]:
+    scheduler = app.extensions["retention"] = Scheduler(app, float(app.config["RETENTION_SCHEDULE_S"]))
+    app.before_request(scheduler.start)
@@ -0,0 +1,161 @@
+"""
+대여/잠금/반납 상태 전이
+
+자전거 상태는 bike(is_available, lock_state) 와 진행 중인 ride 유무로 정해진다.
+
+  parked  : 허브/존에 잠겨 있고 누구나 대여 가능      (1, locked), 진행 중 ride 없음
+  riding  : 대여 중                                   (0, unlocked)
+  held    : 대여자가 일시잠금                         (0, locked)
+  offered : 일시잠금 후 양도 가능(하이파이브)         (1, locked), 진행 중 ride 있음
+  fault   : 고장/점검                                 lock_state = fault
+
+  rent        : parked, offered        -> riding   (offered 면 이전 대여자의 ride 를 끝낸다)
+  hold        : riding, held, offered  -> held     (내 ride 만)
+  offer       : held                   -> offered  (내 잠금만)
+  zone_return : riding, held, offered  -> parked   (내 ride 만, 허브가 꽉 찼을 때)
+
+전이마다 db.transaction() (BEGIN IMMEDIATE) 하나로 읽고-검사하고-쓴다.
+쓰기는 읽은 상태가 그대로일 때만 바꾸는 조건부 UPDATE 라서,
+같은 자전거를 두 요청이 동시에 건드려도 하나만 성공하고 나머지는 TransitionError("conflict").
+라이딩이 끝나면(존 반납, 하이파이브 인계) pricing 으로 요금/인센티브를 계산해 같이 쓴다.
+시각은 datetime('now') 와 같은 UTC 'YYYY-MM-DD HH:MM:SS'.
+"""
+import time
+
+from . import pricing, repository
+from .db import transaction
+
+PARKED, RIDING, HELD, OFFERED, FAULT = "parked", "riding", "held", "offered", "fault"
+
+# 상태 -> bike(is_available, lock_state)
+BIKE_STATE = {
+  PARKED: (1, "locked"),
+  RIDING: (0, "unlocked"),
+  HELD: (0, "locked"),
+  OFFERED: (1, "locked"),
+}
+
+TRANSITIONS = {
+  "rent": ({PARKED, OFFERED}, RIDING),
+  "hold": ({RIDING, HELD, OFFERED}, HELD),
+  "offer": ({HELD}, OFFERED),
+  "zone_return": ({RIDING, HELD, OFFERED}, PARKED),
+}
+
+# reason -> (HTTP status, 메시지)
+REASONS = {
+  "no_bike": (404, "존재하지 않는 자전거입니다."),
+  "not_available": (409, "이미 대여 중이거나 이용 불가능한 자전거입니다."),
+  "already_riding": (409, "이미 대여 중인 자전거가 있습니다."),
+  "no_active_ride": (400, "현재 진행 중인 라이딩을 찾을 수 없습니다."),
+  "hub_not_full": (400, "허브에 아직 빈 자리가 있어서 Zone 반납이 불가능합니다."),
+  "no_active_lock": (400, "현재 이 사용자가 일시잠금한 자전거가 없습니다."),
+  "bad_state": (409, "지금 자전거 상태에서는 할 수 없는 요청입니다."),
+  "conflict": (409, "다른 요청이 먼저 자전거 상태를 바꿨습니다. 다시 시도해 주세요."),
+}
+
+
+class TransitionError(Exception):
+  def __init__(self, reason):
+    self.reason = reason
+    self.status, self.message = REASONS[reason]
+    super().__init__(self.message)
+
+
+def state_of(bike, open_ride):
+  if bike.lock_state == "fault":
+    return FAULT
+  if not bike.is_available:
+    return RIDING if bike.lock_state == "unlocked" else HELD
+  return OFFERED if open_ride is not None else PARKED
+
+
+def _move(db, bike, state, action, off_hub=False):
+  allowed, to = TRANSITIONS[action]
+  if state not in allowed:
+    raise TransitionError("not_available" if action == "rent" else "bad_state")
+  expect = (bike.is_available, bike.lock_state)
+  if not repository.set_bike_state(db, bike.bike_id, expect, BIKE_STATE[to], off_hub=off_hub):
+    raise TransitionError("conflict")
+
+
+def _bike(db, bike_id):
+  bike = repository.bike_by_id(db, bike_id)
+  if bike is None:
+    raise TransitionError("no_bike")
+  return bike
+
+
+def rent(user_id, bike_id):
+  """대여 시작. 반환: {ride_id, start_hub_id, start_at, handover_from}"""
+  start_at = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+  engine = pricing.get_engine()   # 색인 재생성은 읽기 연결에서, 트랜잭션 밖에서
+  with transaction() as db:
+    bike = _bike(db, bike_id)
+    prev = repository.open_ride_by_bike(db, bike_id)
+    if state_of(bike, prev) not in TRANSITIONS["rent"][0]:
+      raise TransitionError("not_available")
+    if repository.open_ride_by_user(db, user_id) is not None:
+      raise TransitionError("already_riding")
+
+    handover_from = None
+    if prev is not None:
+      # 하이파이브: 양도 가능으로 둔 사람의 라이딩은 여기서 끝난다
+      price = engine.quote(prev.start_hub_id, None, prev.start_at, start_at)
+      if not repository.end_ride(db, prev.ride_id, price):
+        raise TransitionError("conflict")
+      handover_from = prev.user_id
+    repository.deactivate_bike_locks(db, bike_id)
+    _move(db, bike, state_of(bike, prev), "rent", off_hub=True)
+    ride_id = repository.start_ride(db, user_id, bike_id, bike.current_hub_id, start_at)
+
+  return {"ride_id": ride_id, "start_hub_id": bike.current_hub_id, "start_at": start_at,
+          "handover_from": handover_from}
+
+
+def hold(user_id, bike_id, lat=None, lng=None):
+  """일시잠금 (다시 탈 생각, 양도 불가)"""
+  with transaction() as db:
+    bike = _bike(db, bike_id)
+    ride = repository.open_ride(db, user_id, bike_id)
+    if ride is None:
+      raise TransitionError("no_active_ride")
+    _move(db, bike, state_of(bike, ride), "hold")
+    repository.deactivate_locks(db, user_id, bike_id)
+    repository.add_lock(db, user_id, bike_id, lat, lng, transferable=False)
+
+
+def offer(user_id, bike_id):
+  """일시잠금한 자전거를 다른 사용자가 가져갈 수 있게 (하이파이브)"""
+  with transaction() as db:
+    bike = _bike(db, bike_id)
+    lock = repository.active_lock(db, user_id, bike_id)
+    if lock is None:
+      raise TransitionError("no_active_lock")
+    _move(db, bike, state_of(bike, repository.open_ride(db, user_id, bike_id)), "offer")
+    if not repository.set_lock_transferable(db, lock.lock_id):
+      raise TransitionError("conflict")
+
+
+def zone_return(user_id, bike_id, hub_id, lat=None, lng=None):
+  """
+  허브가 꽉 찼을 때 존에 반납. 자전거는 허브 밖에서 대여 가능 + 잠김.
+  ride.end_hub_id 는 그 존의 허브. 반환: {ride_id, duration_min, fare_amount, incentive_applied}
+  """
+  engine = pricing.get_engine()
+  with transaction() as db:
+    if not repository.hub_is_full(db, hub_id):
+      raise TransitionError("hub_not_full")
+    ride = repository.open_ride(db, user_id, bike_id)
+    if ride is None:
+      raise TransitionError("no_active_ride")
+    bike = _bike(db, bike_id)
+    price = engine.quote(ride.start_hub_id, hub_id, ride.start_at)
+    if not repository.end_ride(db, ride.ride_id, price, end_hub_id=hub_id):
+      raise TransitionError("conflict")
+    _move(db, bike, state_of(bike, ride), "zone_return", off_hub=True)
+    # 이전 잠금은 끄고, 존 반납용 잠금을 transferable=1 (누구나 가져가도 됨) 로 남긴다
+    repository.deactivate_locks(db, user_id, bike_id)
+    repository.add_lock(db, user_id, bike_id, lat, lng, transferable=True)
+  return {"ride_id": ride.ride_id, "duration_min": price.duration_min, "fare_amount": price.fare_amount,
+          "incentive_applied": bool(price.incentive_applied)}
@@ -1,7 +1,7 @@
 PRAGMA foreign_keys = ON;
 
 -- 1) 사용자
-CREATE TABLE user (
+CREATE TABLE IF NOT EXISTS user (
   user_id        INTEGER PRIMARY KEY AUTOINCREMENT,
   name           TEXT NOT NULL,
   student_no     TEXT,
@@ -10,41 +10,49 @@ CREATE TABLE user (
   joined_at      TEXT NOT NULL DEFAULT (datetime('now'))  -- ISO8601
 );
 
-CREATE UNIQUE INDEX idx_user_student_no ON user(student_no);
-CREATE UNIQUE INDEX idx_user_phone ON user(phone);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_student_no ON user(student_no);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_phone ON user(phone);
 
 -- 2) 허브
-CREATE TABLE hub (
+--    허브별 주차/대여가능 대수는 hub_counters 가 트리거로 집계한다. (counters.py)
+--    current_bikes 는 예전 스키마에서 옮겨 온 값으로, 갱신하지 않는다.
+CREATE TABLE IF NOT EXISTS hub (
   hub_id         INTEGER PRIMARY KEY AUTOINCREMENT,
   name           TEXT NOT NULL,
   lat            REAL NOT NULL,
   lng            REAL NOT NULL,
   capacity       INTEGER NOT NULL CHECK (capacity >= 0),
-  current_bikes  INTEGER NOT NULL DEFAULT 0 CHECK (current_bikes >= 0)
+  current_bikes  INTEGER NOT NULL DEFAULT 0 CHECK (current_bikes >= 0),
+  region         TEXT                  -- 지역 묶음(선택), 챗봇 도구 설명에 쓰인다
 );
 
-CREATE INDEX idx_hub_coord ON hub(lat, lng);
+CREATE INDEX IF NOT EXISTS idx_hub_coord ON hub(lat, lng);
 
 -- 3) 자전거
-CREATE TABLE bike (
+CREATE TABLE IF NOT EXISTS bike (
   bike_id            INTEGER PRIMARY KEY AUTOINCREMENT,
   current_hub_id     INTEGER,          -- 허브 밖(거리)에 있을 수 있어 NULL 허용
   lock_state         TEXT NOT NULL DEFAULT 'locked',  -- 'locked' | 'unlocked' | 'fault'
   battery_percent    INTEGER NOT NULL DEFAULT 100 CHECK (battery_percent BETWEEN 0 AND 100),
   is_available       INTEGER NOT NULL DEFAULT 1,      -- 1/0 (TRUE/FALSE)
+  last_lat           REAL,                             -- 텔레메트리 최신 위치
+  last_lng           REAL,
+  last_seen_at       TEXT,
+  battery_at         TEXT,                             -- battery_percent 를 보고한 샘플 시각
   FOREIGN KEY (current_hub_id) REFERENCES hub(hub_id) ON UPDATE CASCADE
 );
 
-CREATE INDEX idx_bike_hub ON bike(current_hub_id);
-CREATE INDEX idx_bike_available ON bike(is_available);
+-- 허브별 대수 재집계(counters.check/rebuild)가 테이블을 읽지 않도록 커버링
+CREATE INDEX IF NOT EXISTS idx_bike_hub_available ON bike(current_hub_id, is_available);
+CREATE INDEX IF NOT EXISTS idx_bike_available ON bike(is_available);
 
 -- 4) 대여 기록
-CREATE TABLE ride (
+CREATE TABLE IF NOT EXISTS ride (
   ride_id        INTEGER PRIMARY KEY AUTOINCREMENT,
   user_id        INTEGER NOT NULL,
   bike_id        INTEGER NOT NULL,
   start_hub_id   INTEGER,                 -- 허브 밖에서 시작하면 NULL
-  end_hub_id     INTEGER,                 -- 허브 밖 반납이면 NULL
+  end_hub_id     INTEGER,                 -- 허브 밖 반납이면 NULL (존 반납은 그 존의 허브)
   start_at       TEXT NOT NULL,           -- datetime ISO8601
   end_at         TEXT,                    -- 진행중이면 NULL
   duration_min   INTEGER,                 -- 종료 시 계산 저장(분)
@@ -56,12 +64,15 @@ CREATE TABLE ride (
   FOREIGN KEY (end_hub_id)   REFERENCES hub(hub_id)
 );
 
-CREATE INDEX idx_ride_user_time ON ride(user_id, start_at);
-CREATE INDEX idx_ride_bike_time ON ride(bike_id, start_at);
-CREATE INDEX idx_ride_end_at ON ride(end_at);
+CREATE INDEX IF NOT EXISTS idx_ride_user_time ON ride(user_id, start_at);
+CREATE INDEX IF NOT EXISTS idx_ride_bike_time ON ride(bike_id, start_at);
+CREATE INDEX IF NOT EXISTS idx_ride_end_at ON ride(end_at);
+-- 진행 중인 라이딩 찾기 (반납 경로)
+CREATE INDEX IF NOT EXISTS idx_ride_open ON ride(bike_id, user_id, start_at) WHERE end_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_ride_open_user ON ride(user_id, start_at) WHERE end_at IS NULL;
 
 -- 5) 잠금 상태(일시잠금/중간대여 베이스 로그)
-CREATE TABLE lock_status (
+CREATE TABLE IF NOT EXISTS lock_status (
   lock_id        INTEGER PRIMARY KEY AUTOINCREMENT,
   bike_id        INTEGER NOT NULL,
   user_id        INTEGER NOT NULL,
@@ -74,10 +85,12 @@ CREATE TABLE lock_status (
   FOREIGN KEY (user_id) REFERENCES user(user_id)
 );
 
-CREATE INDEX idx_lock_active ON lock_status(is_active, transferable);
+CREATE INDEX IF NOT EXISTS idx_lock_active ON lock_status(is_active, transferable);
+-- 사용자의 활성 잠금 찾기 (잠금/양도/반납 경로)
+CREATE INDEX IF NOT EXISTS idx_lock_bike_active ON lock_status(bike_id, user_id, locked_at) WHERE is_active = 1;
 
 -- 6) 양도 의사
-CREATE TABLE transfer_intent (
+CREATE TABLE IF NOT EXISTS transfer_intent (
   transfer_id    INTEGER PRIMARY KEY AUTOINCREMENT,
   lock_id        INTEGER NOT NULL,
   registered_at  TEXT NOT NULL,
@@ -87,10 +100,10 @@ CREATE TABLE transfer_intent (
   FOREIGN KEY (matched_user_id) REFERENCES user(user_id)
 );
 
-CREATE INDEX idx_transfer_match ON transfer_intent(is_matched);
+CREATE INDEX IF NOT EXISTS idx_transfer_match ON transfer_intent(is_matched);
 
 -- 7) 인센티브 정책 (허브 혼잡 해소 등)
-CREATE TABLE incentive_policy (
+CREATE TABLE IF NOT EXISTS incentive_policy (
   policy_id      INTEGER PRIMARY KEY AUTOINCREMENT,
   target_hub_id  INTEGER NOT NULL,
   start_date     TEXT NOT NULL,        -- 'YYYY-MM-DD'
@@ -102,10 +115,10 @@ CREATE TABLE incentive_policy (
   FOREIGN KEY (target_hub_id) REFERENCES hub(hub_id)
 );
 
-CREATE INDEX idx_incentive_range ON incentive_policy(target_hub_id, start_date, end_date);
+CREATE INDEX IF NOT EXISTS idx_incentive_range ON incentive_policy(target_hub_id, start_date, end_date);
 
 -- 8) 요금 정책 (존/시간대별 가감 요금)
-CREATE TABLE fare_policy (
+CREATE TABLE IF NOT EXISTS fare_policy (
   fare_id        INTEGER PRIMARY KEY AUTOINCREMENT,
   origin_zone    TEXT NOT NULL,
   dest_zone      TEXT NOT NULL,
@@ -116,10 +129,10 @@ CREATE TABLE fare_policy (
   adj_amount     INTEGER DEFAULT 0
 );
 
-CREATE INDEX idx_fare_zone ON fare_policy(origin_zone, dest_zone);
+CREATE INDEX IF NOT EXISTS idx_fare_zone ON fare_policy(origin_zone, dest_zone);
 
 -- 9) 자전거 상태 로그
-CREATE TABLE bike_status_log (
+CREATE TABLE IF NOT EXISTS bike_status_log (
   log_id         INTEGER PRIMARY KEY AUTOINCREMENT,
   bike_id        INTEGER NOT NULL,
   status         TEXT NOT NULL,        -- 'ok','low_battery','repair_needed',…
@@ -127,10 +140,10 @@ CREATE TABLE bike_status_log (
   FOREIGN KEY (bike_id) REFERENCES bike(bike_id)
 );
 
-CREATE INDEX idx_bike_status_time ON bike_status_log(bike_id, logged_at);
+CREATE INDEX IF NOT EXISTS idx_bike_status_time ON bike_status_log(bike_id, logged_at);
 
 -- 10) 자전거 위치 로그
-CREATE TABLE bike_location_log (
+CREATE TABLE IF NOT EXISTS bike_location_log (
   log_id         INTEGER PRIMARY KEY AUTOINCREMENT,
   bike_id        INTEGER NOT NULL,
   lat            REAL NOT NULL,
@@ -139,11 +152,11 @@ CREATE TABLE bike_location_log (
   FOREIGN KEY (bike_id) REFERENCES bike(bike_id)
 );
 
-CREATE INDEX idx_bike_loc_time ON bike_location_log(bike_id, logged_at);
-CREATE INDEX idx_bike_loc_geo ON bike_location_log(lat, lng);
+CREATE INDEX IF NOT EXISTS idx_bike_loc_time ON bike_location_log(bike_id, logged_at);
+CREATE INDEX IF NOT EXISTS idx_bike_loc_geo ON bike_location_log(lat, lng);
 
 -- 11) 챗봇 상호작용 로그
-CREATE TABLE chat_log (
+CREATE TABLE IF NOT EXISTS chat_log (
   chat_id        INTEGER PRIMARY KEY AUTOINCREMENT,
   user_id        INTEGER,
   user_question  TEXT NOT NULL,
@@ -151,7 +164,214 @@ CREATE TABLE chat_log (
   inferred_intent TEXT,
   function_called INTEGER NOT NULL DEFAULT 0,
   logged_at      TEXT NOT NULL DEFAULT (datetime('now')),
+  session_id     TEXT,                      -- menu1 대화 id (chat_history)
   FOREIGN KEY (user_id) REFERENCES user(user_id)
 );
 
-CREATE INDEX idx_chat_user_time ON chat_log(user_id, logged_at);
+CREATE INDEX IF NOT EXISTS idx_chat_user_time ON chat_log(user_id, logged_at);
+CREATE INDEX IF NOT EXISTS idx_chat_session ON chat_log(session_id, chat_id) WHERE session_id IS NOT NULL;
+
+-- 12) 허브 집계 카운터 (counters.py)
+--    bike / hub 트리거가 행이 바뀔 때마다 이전 값을 빼고 새 값을 더한다.
+--    값이 바뀌면 data_version('hub_counters') 를 +1 하고 그 값을 행의 version 에 찍는다.
+CREATE TABLE IF NOT EXISTS hub_counters (
+  hub_id          INTEGER PRIMARY KEY,
+  available_bikes INTEGER NOT NULL DEFAULT 0,
+  parked_sum      INTEGER NOT NULL DEFAULT 0,
+  total_sum       INTEGER NOT NULL DEFAULT 0,
+  version         INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_bike_counters_ins AFTER INSERT ON bike
+WHEN NEW.current_hub_id IS NOT NULL
+BEGIN
+  INSERT INTO hub_counters (hub_id, available_bikes, parked_sum)
+    VALUES (NEW.current_hub_id, NEW.is_available = 1, 1)
+    ON CONFLICT(hub_id) DO UPDATE SET available_bikes = available_bikes + excluded.available_bikes,
+                                      parked_sum      = parked_sum + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_bike_counters_del AFTER DELETE ON bike
+WHEN OLD.current_hub_id IS NOT NULL
+BEGIN
+  UPDATE hub_counters
+     SET available_bikes = available_bikes - (OLD.is_available = 1),
+         parked_sum      = parked_sum - 1
+   WHERE hub_id = OLD.current_hub_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_bike_counters_upd
+AFTER UPDATE OF current_hub_id, is_available ON bike
+WHEN OLD.current_hub_id IS NOT NEW.current_hub_id
+  OR (OLD.is_available = 1) IS NOT (NEW.is_available = 1)
+BEGIN
+  UPDATE hub_counters
+     SET available_bikes = available_bikes - (OLD.is_available = 1),
+         parked_sum      = parked_sum - 1
+   WHERE hub_id = OLD.current_hub_id;
+  INSERT INTO hub_counters (hub_id, available_bikes, parked_sum)
+    SELECT NEW.current_hub_id, NEW.is_available = 1, 1
+     WHERE NEW.current_hub_id IS NOT NULL
+    ON CONFLICT(hub_id) DO UPDATE SET available_bikes = available_bikes + excluded.available_bikes,
+                                      parked_sum      = parked_sum + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hub_counters_capacity_ins AFTER INSERT ON hub
+BEGIN
+  INSERT INTO hub_counters (hub_id, total_sum) VALUES (NEW.hub_id, NEW.capacity)
+    ON CONFLICT(hub_id) DO UPDATE SET total_sum = total_sum + excluded.total_sum;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hub_counters_capacity_del AFTER DELETE ON hub
+BEGIN
+  UPDATE hub_counters SET total_sum = total_sum - OLD.capacity WHERE hub_id = OLD.hub_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hub_counters_capacity_upd
+AFTER UPDATE OF hub_id, capacity ON hub
+WHEN OLD.hub_id IS NOT NEW.hub_id OR OLD.capacity IS NOT NEW.capacity
+BEGIN
+  UPDATE hub_counters SET total_sum = total_sum - OLD.capacity WHERE hub_id = OLD.hub_id;
+  INSERT INTO hub_counters (hub_id, total_sum) VALUES (NEW.hub_id, NEW.capacity)
+    ON CONFLICT(hub_id) DO UPDATE SET total_sum = total_sum + excluded.total_sum;
+END;
+
+-- 13) 테이블 데이터 버전 (versioning.py, counters.py)
+--    hub / fare_policy / incentive_policy 는 행이 바뀔 때마다 +1. 메모리 캐시(versioning.cached)가 이걸 보고 다시 만든다.
+CREATE TABLE IF NOT EXISTS data_version (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0);
+INSERT OR IGNORE INTO data_version (name, version) VALUES ('hub_counters', 0);
+INSERT OR IGNORE INTO data_version (name, version) VALUES ('hub', 0);
+INSERT OR IGNORE INTO data_version (name, version) VALUES ('fare_policy', 0);
+INSERT OR IGNORE INTO data_version (name, version) VALUES ('incentive_policy', 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_hub_version_INSERT AFTER INSERT ON hub
+BEGIN
+  UPDATE data_version SET version = version + 1 WHERE name = 'hub';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hub_version_UPDATE AFTER UPDATE ON hub
+BEGIN
+  UPDATE data_version SET version = version + 1 WHERE name = 'hub';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hub_version_DELETE AFTER DELETE ON hub
+BEGIN
+  UPDATE data_version SET version = version + 1 WHERE name = 'hub';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fare_policy_version_INSERT AFTER INSERT ON fare_policy
+BEGIN
+  UPDATE data_version SET version = version + 1 WHERE name = 'fare_policy';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fare_policy_version_UPDATE AFTER UPDATE ON fare_policy
+BEGIN
+  UPDATE data_version SET version = version + 1 WHERE name = 'fare_policy';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fare_policy_version_DELETE AFTER DELETE ON fare_policy
+BEGIN
+  UPDATE data_version SET version = version + 1 WHERE name = 'fare_policy';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_incentive_policy_version_INSERT AFTER INSERT ON incentive_policy
+BEGIN
+  UPDATE data_version SET version = version + 1 WHERE name = 'incentive_policy';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_incentive_policy_version_UPDATE AFTER UPDATE ON incentive_policy
+BEGIN
+  UPDATE data_version SET version = version + 1 WHERE name = 'incentive_policy';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_incentive_policy_version_DELETE AFTER DELETE ON incentive_policy
+BEGIN
+  UPDATE data_version SET version = version + 1 WHERE name = 'incentive_policy';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hub_counters_stamp_ins AFTER INSERT ON hub_counters
+BEGIN
+  UPDATE data_version SET version = version + 1 WHERE name = 'hub_counters';
+  UPDATE hub_counters SET version = (SELECT version FROM data_version WHERE name = 'hub_counters')
+   WHERE hub_id = NEW.hub_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_hub_counters_stamp_upd
+AFTER UPDATE OF available_bikes, parked_sum, total_sum ON hub_counters
+WHEN OLD.available_bikes IS NOT NEW.available_bikes
+  OR OLD.parked_sum IS NOT NEW.parked_sum
+  OR OLD.total_sum IS NOT NEW.total_sum
+BEGIN
+  UPDATE data_version SET version = version + 1 WHERE name = 'hub_counters';
+  UPDATE hub_counters SET version = (SELECT version FROM data_version WHERE name = 'hub_counters')
+   WHERE hub_id = NEW.hub_id;
+END;
+
+-- 14) 로그 보존 요약 (retention.py)
+--    RETENTION_RAW_DAYS 보다 오래된 bike_location_log / bike_status_log 를 합친 것
+CREATE TABLE IF NOT EXISTS bike_location_summary (
+  bike_id      INTEGER NOT NULL,
+  bucket_start TEXT NOT NULL,
+  samples      INTEGER NOT NULL,
+  lat_sum      REAL NOT NULL,
+  lng_sum      REAL NOT NULL,
+  first_at     TEXT NOT NULL,
+  last_at      TEXT NOT NULL,
+  PRIMARY KEY (bike_id, bucket_start)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS bike_status_summary (
+  bike_id      INTEGER NOT NULL,
+  bucket_start TEXT NOT NULL,
+  status       TEXT NOT NULL,
+  samples      INTEGER NOT NULL,
+  PRIMARY KEY (bike_id, bucket_start, status)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS hub_hourly_rollup (
+  hub_id       INTEGER NOT NULL,
+  hour         TEXT NOT NULL,          -- 'YYYY-MM-DD HH:00:00'
+  samples      INTEGER NOT NULL,
+  bike_buckets INTEGER NOT NULL,       -- (자전거, 구간) 개수
+  PRIMARY KEY (hub_id, hour)
+) WITHOUT ROWID;
+
+-- 15) 재배치 인센티브 (rebalancing.py)
+--    허브별 시간 구간 대여/반납 수, 라이딩을 어디까지 더했는지, 자동으로 건 인센티브
+CREATE TABLE IF NOT EXISTS hub_flow (
+  hub_id       INTEGER NOT NULL,
+  bucket_start INTEGER NOT NULL,       -- 유닉스 초 (REBALANCE_BUCKET_S 단위)
+  arrivals     INTEGER NOT NULL DEFAULT 0,
+  departures   INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (hub_id, bucket_start)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rebalancing_checkpoint (
+  name     TEXT PRIMARY KEY,           -- 'departures' | 'arrivals'
+  ride_id  INTEGER NOT NULL,
+  end_at   TEXT                        -- arrivals 만
+);
+
+CREATE TABLE IF NOT EXISTS rebalancing_policy (
+  policy_id     INTEGER PRIMARY KEY,   -- incentive_policy.policy_id
+  hub_id        INTEGER NOT NULL,      -- 인센티브를 건 허브
+  reason        TEXT NOT NULL,         -- 'empty' | 'full'
+  source_hub_id INTEGER NOT NULL,      -- 추세를 보인 허브 (full 이면 옆 허브에 건다)
+  created_at    INTEGER NOT NULL,      -- 유닉스 초
+  ends_at       INTEGER NOT NULL,
+  expired_at    INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_rebalancing_open ON rebalancing_policy(hub_id) WHERE expired_at IS NULL;
+
+-- 16) 허브별 수요 예측 (forecast.py, flask fit-forecast 가 통째로 바꿔 쓴다)
+CREATE TABLE IF NOT EXISTS hub_forecast (
+  hub_id     INTEGER NOT NULL,
+  how        INTEGER NOT NULL,         -- 현지 요일·시각 (월 00시 = 0 ... 일 23시 = 167)
+  at         INTEGER NOT NULL,         -- 예측한 시각 (유닉스 초, 정시)
+  bikes      REAL NOT NULL,            -- 예상 이용가능 대수
+  pickups    REAL NOT NULL,            -- 그 한 시간의 평균 대여 수
+  dropoffs   REAL NOT NULL,            -- 그 한 시간의 평균 반납 수
+  fitted_at  INTEGER NOT NULL,
+  PRIMARY KEY (hub_id, how)
+) WITHOUT ROWID;
@@ -0,0 +1,455 @@
+"""
+합성 데이터 생성기 (flask seed-db)
+
+빈 DB 에 캠퍼스 규모의 가짜 데이터를 채운다. 쿼리/인덱스/부하 튜닝용.
+- hub        : 실제 캠퍼스 건물 좌표(CAMPUS) 와 그 주변에 --hubs 개.
+               region = 구역(zone), capacity = 스테이션 거치대 합 (정식 스키마에는 stations/zones 테이블이 없다)
+- user       : --users 명. 자주 타는 사람과 가끔 타는 사람이 섞여 있다.
+- ride       : --rides 건, 최근 --days 일. 시간대(출근/점심/퇴근/야간) x 요일 가중치,
+               아침에는 생활관 -> 강의/연구동, 저녁에는 그 반대가 많다.
+               한 자전거의 라이딩은 겹치지 않고, 일부는 허브 밖에서 시작/끝난다. 몇 대는 지금 대여 중.
+- lock_status / transfer_intent : 라이딩 중 일시잠금 (--lock-rate), 그중 일부는 양도 등록/매칭
+- bike_location_log : 라이딩마다 --points 개 (출발 -> 도착 보간 + 잡음)
+- bike_status_log   : 자전거마다 하루 한 줄 (ok / low_battery / repair_needed)
+- bike       : 마지막 라이딩이 끝난 곳에 둔다.
+시각은 현지(KST) 패턴으로 만들고 datetime('now') 처럼 UTC 'YYYY-MM-DD HH:MM:SS' 로 저장한다.
+
+적재는 전용 연결 하나로 한다: journal_mode=OFF, synchronous=OFF, 큰 cache, foreign_keys 끔.
+대상 테이블의 보조 인덱스/트리거는 지웠다가 끝나고 다시 만들고(hub_counters 는 재집계), ANALYZE 한다.
+정수 PK 를 순서대로 --batch 줄씩 executemany. 저널이 없으므로 중간에 끊기면 DB 파일을 지우고 다시 돌린다.
+
+실행: flask seed-db [--hubs 60] [--bikes 10000] [--users 20000] [--rides 2000000] [--days 180] [--seed 0]
+"""
+import sqlite3
+import time
+
+import click
+import numpy as np
+from flask import current_app
+
+from . import counters
+
+UTC_OFFSET_S = 9 * 3600   # 캠퍼스 현지 시각(KST)
+
+# (이름, 위도, 경도, 구역)
+CAMPUS = [
+  ("무은재기념관", 36.0107, 129.3216, "강의"), ("학생회관", 36.0125, 129.3228, "강의"),
+  ("환경공학동", 36.0113, 129.3245, "강의"), ("박태준학술정보관", 36.0098, 129.3233, "강의"),
+  ("생활관21동", 36.0158, 129.3225, "생활관"), ("생활관3동", 36.0146, 129.3252, "생활관"),
+  ("생활관12동", 36.0165, 129.3262, "생활관"), ("생활관15동", 36.0171, 129.3241, "생활관"),
+  ("친환경소재대학원", 36.0083, 129.3260, "연구"), ("제1실험동", 36.0131, 129.3281, "연구"),
+  ("기계실험동", 36.0121, 129.3296, "연구"), ("가속기IBS", 36.0075, 129.3300, "연구"),
+]
+ZONES = ("강의", "생활관", "연구")
+
+# 현지 시각별 대여 가중치 (출근 8-9시, 점심, 퇴근 17-19시, 생활관 야간)
+HOUR_WEIGHTS = (3, 2, 1, 1, 0.5, 0.5, 1, 4, 9, 7, 5, 6, 9, 7, 5, 6, 6, 8, 9, 7, 6, 5, 5, 4)
+WEEKDAY_WEIGHTS = (1.0, 1.0, 1.0, 1.0, 0.9, 0.6, 0.5)   # 월..일
+
+# 시간대별 (출발 구역 가중치, 도착 구역 가중치), 순서는 ZONES
+FLOWS = {
+  "morning": ((0.25, 0.6, 0.15), (0.5, 0.15, 0.35)),   # 6-10시
+  "day":     ((0.45, 0.2, 0.35), (0.45, 0.2, 0.35)),
+  "evening": ((0.4, 0.2, 0.4), (0.15, 0.7, 0.15)),     # 17-02시
+}
+
+STATIONS_SLOTS = 10     # 스테이션 하나의 거치대 수
+CAPACITY_SLACK = 1.3    # 전체 거치대 = 자전거 수 x 이 값
+OFF_HUB_START = 0.05
+OFF_HUB_END = 0.08
+SPEED_M_S = 3.3
+GAP_S = 60              # 같은 자전거의 라이딩 사이 최소 간격
+FARE_PER_MIN = 100      # 단순 분당 요금(원)
+RIDING_NOW = 0.01       # 지금 대여 중인 자전거 비율
+FAULT = 0.01
+STATUSES = (("ok", 0.93), ("low_battery", 0.05), ("repair_needed", 0.02))
+
+TABLES = ("hub", "user", "bike", "ride", "lock_status", "transfer_intent", "bike_location_log", "bike_status_log")
+
+
+# ----- 생성 -----
+
+def _ts(seconds):
+  """유닉스 초 배열 -> 'YYYY-MM-DD HH:MM:SS' (UTC) 목록"""
+  return [s.replace("T", " ") for s in np.datetime_as_string(np.asarray(seconds, dtype="datetime64[s]")).tolist()]
+
+
+def make_hubs(rng, n, n_bikes):
+  """(hub_id, name, lat, lng, capacity, region) 목록"""
+  hubs = []
+  for i in range(n):
+    name, lat, lng, zone = CAMPUS[i % len(CAMPUS)]
+    if i >= len(CAMPUS):
+      name = f"{name} {i // len(CAMPUS) + 1}"
+      lat, lng = lat + rng.normal(0, 0.0012), lng + rng.normal(0, 0.0012)
+    hubs.append([i + 1, name, round(float(lat), 6), round(float(lng), 6), 0, zone])
+  # 스테이션 수는 허브마다 다르게, 전체 거치대는 자전거보다 조금 많게
+  weights = rng.uniform(0.5, 1.5, n)
+  stations = np.maximum(1, np.round(weights / weights.sum() * n_bikes * CAPACITY_SLACK / STATIONS_SLOTS))
+  for h, s in zip(hubs, stations.tolist()):
+    h[4] = int(s) * STATIONS_SLOTS
+  return hubs
+
+
+def make_users(rng, n, since):
+  joined = since - rng.integers(0, 3 * 365 * 86400, n)
+  grades = np.where(np.arange(n) < 3, "관리자", "일반").tolist()
+  for uid, (g, j) in enumerate(zip(grades, _ts(joined)), 1):
+    yield (uid, f"사용자{uid}", f"{2016 + uid % 9}{uid:07d}", f"010-{uid // 10000:04d}-{uid % 10000:04d}", g, j)
+
+
+def _coords(rng, hub_idx, hub_lat, hub_lng, off):
+  """허브 좌표, 허브 밖이면 아무 허브 근처"""
+  lat, lng = hub_lat[hub_idx].copy(), hub_lng[hub_idx].copy()
+  lat[off] += rng.normal(0, 0.002, off.sum())
+  lng[off] += rng.normal(0, 0.002, off.sum())
+  return lat, lng
+
+
+def _no_overlap(bike, start, dur):
+  """
+  자전거마다 start 순으로 e_k = max(s_k, e_{k-1}) + dur_k + GAP 가 되게 시작을 민다.
+  e_k = C_k + max_{j<=k}(s_j - C_{j-1}) 라서 누적합 + 그룹별 누적 max 로 한 번에 된다.
+  """
+  step = dur + GAP_S
+  csum = np.cumsum(step)
+  before = csum - step
+  first = np.r_[True, bike[1:] != bike[:-1]]
+  base = before[np.maximum.accumulate(np.where(first, np.arange(len(bike)), 0))]
+  group = np.cumsum(first).astype(np.int64) << 40   # 그룹 사이에 누적 max 가 넘어가지 않게
+  reach = np.maximum.accumulate(start - (before - base) + group) - group
+  return reach + (csum - base) - step
+
+
+def make_rides(rng, n, hubs, n_bikes, n_users, since, now):
+  """라이딩 배열 dict (시작 시각 순, ride_id = 순번 + 1). since 는 현지 자정"""
+  hub_lat = np.array([h[2] for h in hubs])
+  hub_lng = np.array([h[3] for h in hubs])
+  hub_zone = np.array([ZONES.index(h[5]) for h in hubs])
+  capacity = np.array([h[4] for h in hubs], dtype=float)
+
+  # 날짜 x 시각 (현지). 오늘 남은 시각과 now 뒤에 끝나는 라이딩은 아래에서 버린다
+  days = -(-(now - since) // 86400)
+  weekday = ((since + UTC_OFFSET_S) // 86400 + np.arange(days) + 3) % 7      # 1970-01-01 은 목요일
+  w = np.outer(np.take(WEEKDAY_WEIGHTS, weekday), HOUR_WEIGHTS).ravel()
+  slot = rng.choice(len(w), n, p=w / w.sum())
+  hour = slot % 24
+  start = since + slot * 3600 + rng.integers(0, 3600, n)
+
+  # 구역 흐름
+  band = np.where((hour >= 6) & (hour < 10), 0, np.where((hour >= 17) | (hour < 2), 2, 1))
+  origin = np.empty(n, dtype=np.int64)
+  dest = np.empty(n, dtype=np.int64)
+  for b, name in enumerate(("morning", "day", "evening")):
+    mask = band == b
+    o_w, d_w = FLOWS[name]
+    for out, zw in ((origin, o_w), (dest, d_w)):
+      zone = rng.choice(len(ZONES), mask.sum(), p=zw)
+      hub = np.empty(len(zone), dtype=np.int64)
+      for z in range(len(ZONES)):
+        members = np.flatnonzero(hub_zone == z)
+        if len(members) == 0:
+          members = np.arange(len(hubs))
+        zm = zone == z
+        hub[zm] = rng.choice(members, zm.sum(), p=capacity[members] / capacity[members].sum())
+      out[mask] = hub
+
+  off_start = rng.random(n) < OFF_HUB_START
+  off_end = rng.random(n) < OFF_HUB_END
+  lat0, lng0 = _coords(rng, origin, hub_lat, hub_lng, off_start)
+  lat1, lng1 = _coords(rng, dest, hub_lat, hub_lng, off_end)
+  meters = np.hypot((lat1 - lat0) * 110540, (lng1 - lng0) * 111320 * np.cos(np.radians(lat0)))
+  dur = np.clip(meters / SPEED_M_S + rng.lognormal(np.log(180), 0.8, n), 90, 3 * 3600).astype(np.int64)
+
+  # 자전거 배정 후 겹치지 않게
+  bike = rng.integers(1, n_bikes + 1, n)
+  order = np.lexsort((start, bike))
+  cols = dict(bike=bike, start=start, dur=dur, origin=origin, dest=dest, off_start=off_start, off_end=off_end,
+              lat0=lat0, lng0=lng0, lat1=lat1, lng1=lng1)
+  cols = {k: v[order] for k, v in cols.items()}
+  cols["start"] = _no_overlap(cols["bike"], cols["start"], cols["dur"])
+  cols["end"] = cols["start"] + cols["dur"]
+
+  keep = cols["end"] < now
+  order = np.argsort(cols["start"][keep], kind="stable")
+  cols = {k: v[keep][order] for k, v in cols.items()}
+
+  # 사용자: 활동량이 고르지 않다
+  activity = rng.gamma(0.6, 1.0, n_users)
+  cols["user"] = rng.choice(n_users, len(cols["start"]), p=activity / activity.sum()) + 1
+  return cols
+
+
+def _last_rides(rides, n_bikes):
+  """자전거별 마지막 라이딩 인덱스 (없으면 -1). 시작 시각 순이므로 뒤에 온 것이 마지막"""
+  last = np.full(n_bikes + 1, -1, dtype=np.int64)
+  np.maximum.at(last, rides["bike"], np.arange(len(rides["bike"])))
+  return last
+
+
+def make_open_rides(rng, rides, last, n_users, now):
+  """지금 대여 중인 자전거: 마지막 라이딩이 끝난 곳에서 시작해 아직 끝나지 않은 라이딩"""
+  n_bikes = len(last) - 1
+  bikes = np.sort(rng.choice(n_bikes, max(1, int(n_bikes * RIDING_NOW)), replace=False) + 1)
+  users = rng.choice(n_users, len(bikes), replace=n_users < len(bikes)) + 1
+  i = last[bikes]
+  ended = np.where(i >= 0, rides["end"][i], 0)
+  start = np.minimum(np.maximum(now - rng.integers(60, 1800, len(bikes)), ended + GAP_S), now)
+  hub = np.where((i >= 0) & ~rides["off_end"][i], rides["dest"][i] + 1, 0)
+  return list(zip(bikes.tolist(), users.tolist(), [h or None for h in hub.tolist()], _ts(start)))
+
+
+def bike_rows(rng, rides, last, hubs, open_rides):
+  """마지막 라이딩 위치에 둔 bike 행"""
+  n_bikes = len(last) - 1
+  capacity = {h[0]: h[4] for h in hubs}
+  parked = {}
+  riding = {o[0] for o in open_rides}
+  battery = rng.integers(20, 101, n_bikes + 1).tolist()
+  fault = (rng.random(n_bikes + 1) < FAULT).tolist()
+  seen = _ts(np.where(last >= 0, rides["end"][last], 0))
+  hub_lat = [h[2] for h in hubs]
+  hub_lng = [h[3] for h in hubs]
+  rows = []
+  for b in range(1, n_bikes + 1):
+    i = last[b]
+    if b in riding:
+      rows.append((b, None, "unlocked", battery[b], 0, None, None, None))
+      continue
+    if i < 0:
+      hub = (b - 1) % len(hubs) + 1
+      lat, lng, at = hub_lat[hub - 1], hub_lng[hub - 1], None
+    else:
+      hub = None if rides["off_end"][i] else int(rides["dest"][i]) + 1
+      lat, lng, at = float(rides["lat1"][i]), float(rides["lng1"][i]), seen[b]
+    if hub is not None:
+      parked[hub] = parked.get(hub, 0) + 1
+    state = "fault" if fault[b] else "locked"
+    rows.append((b, hub, state, battery[b], 0 if fault[b] else 1, round(lat, 6), round(lng, 6), at))
+  # 인기 허브에 몰린 만큼 거치대를 늘린다 (capacity 보다 많이 주차되지 않게)
+  for h in hubs:
+    h[4] = max(capacity[h[0]], -(-parked.get(h[0], 0) // STATIONS_SLOTS) * STATIONS_SLOTS)
+  return rows
+
+
+def ride_rows(rides, lo, hi):
+  r = {k: v[lo:hi] for k, v in rides.items()}
+  start_hub = np.where(r["off_start"], 0, r["origin"] + 1).tolist()
+  end_hub = np.where(r["off_end"], 0, r["dest"] + 1).tolist()
+  minutes = (r["dur"] // 60).tolist()
+  return [
+    (rid, u, b, sh or None, eh or None, s, e, m, m * FARE_PER_MIN, 0)
+    for rid, u, b, sh, eh, s, e, m in zip(range(lo + 1, hi + 1), r["user"].tolist(), r["bike"].tolist(),
+                                          start_hub, end_hub, _ts(r["start"]), _ts(r["end"]), minutes)
+  ]
+
+
+def lock_rows(rng, rides, lo, hi, rate, lock_id, transfer_id, n_users):
+  """(lock_status 행, transfer_intent 행)"""
+  idx = lo + np.flatnonzero(rng.random(hi - lo) < rate)
+  frac = rng.uniform(0.3, 0.8, len(idx))
+  at = rides["start"][idx] + (rides["dur"][idx] * frac).astype(np.int64)
+  lat = rides["lat0"][idx] + (rides["lat1"][idx] - rides["lat0"][idx]) * frac
+  lng = rides["lng0"][idx] + (rides["lng1"][idx] - rides["lng0"][idx]) * frac
+  transferable = rng.random(len(idx)) < 0.3
+  ids = np.arange(lock_id, lock_id + len(idx))
+  locks = list(zip(ids.tolist(), rides["bike"][idx].tolist(), rides["user"][idx].tolist(), _ts(at),
+                   np.round(lat, 6).tolist(), np.round(lng, 6).tolist(), transferable.astype(int).tolist(),
+                   [0] * len(idx)))
+  t = np.flatnonzero(transferable)
+  matched = rng.random(len(t)) < 0.4
+  who = np.where(matched, rng.integers(1, n_users + 1, len(t)), 0).tolist()
+  transfers = [
+    (tid, lid, reg, int(m), w or None)
+    for tid, lid, reg, m, w in zip(range(transfer_id, transfer_id + len(t)), ids[t].tolist(),
+                                   _ts(at[t] + 30), matched.tolist(), who)
+  ]
+  return locks, transfers
+
+
+def location_rows(rng, rides, lo, hi, points, log_id):
+  """라이딩마다 points 개: 출발 -> 도착 사이 (라이딩 순, 같은 라이딩 안에서 시각 순)"""
+  n = hi - lo
+  frac = np.tile((np.arange(points) + 1) / (points + 1), n)
+  ride = np.repeat(np.arange(lo, hi), points)
+  at = rides["start"][ride] + (rides["dur"][ride] * frac).astype(np.int64)
+  lat = rides["lat0"][ride] + (rides["lat1"][ride] - rides["lat0"][ride]) * frac + rng.normal(0, 0.0002, len(ride))
+  lng = rides["lng0"][ride] + (rides["lng1"][ride] - rides["lng0"][ride]) * frac + rng.normal(0, 0.0002, len(ride))
+  return list(zip(range(log_id, log_id + len(ride)), rides["bike"][ride].tolist(),
+                  np.round(lat, 6).tolist(), np.round(lng, 6).tolist(), _ts(at)))
+
+
+def status_rows(rng, n_bikes, day_lo, day_hi, since, log_id):
+  """자전거마다 하루 한 줄"""
+  days = day_hi - day_lo
+  bike = np.tile(np.arange(1, n_bikes + 1), days)
+  day = np.repeat(np.arange(day_lo, day_hi), n_bikes)
+  at = since + day * 86400 + rng.integers(0, 86400, len(bike))
+  names, p = zip(*STATUSES)
+  status = np.take(names, rng.choice(len(names), len(bike), p=p)).tolist()
+  return list(zip(range(log_id, log_id + len(bike)), bike.tolist(), status, _ts(at)))
+
+
+# ----- 적재 -----
+
+def _connect(path):
+  conn = sqlite3.connect(path, isolation_level=None)
+  with current_app.open_resource("schema.sql") as f:
+    conn.executescript(f.read().decode("utf-8"))
+  conn.execute("PRAGMA foreign_keys = OFF")
+  conn.execute("PRAGMA journal_mode = OFF")
+  conn.execute("PRAGMA synchronous = OFF")
+  conn.execute("PRAGMA cache_size = -262144")   # 256MB
+  conn.execute("PRAGMA temp_store = MEMORY")
+  conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+  return conn
+
+
+def _deferred(conn):
+  """대상 테이블의 보조 인덱스/트리거 정의 (지우고 나중에 다시 만든다)"""
+  marks = ",".join("?" * len(TABLES))
+  return conn.execute(
+    f"SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') "
+    f"AND tbl_name IN ({marks}) AND sql IS NOT NULL", TABLES).fetchall()
+
+
+def _insert(conn, table, columns, rows):
+  sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+  conn.executemany(sql, rows)
+  return len(rows)
+
+
+class Report:
+  def __init__(self):
+    self.rows = {}
+    self.seconds = {}
+
+  def add(self, table, n, seconds):
+    self.rows[table] = self.rows.get(table, 0) + n
+    self.seconds[table] = self.seconds.get(table, 0.0) + seconds
+
+
+def seed(path, hubs=60, bikes=10000, users=20000, rides=2_000_000, days=180, points=4,
+         lock_rate=0.15, seed=0, batch=50000, now=None, echo=print):
+  rng = np.random.default_rng(seed)
+  now = int(now if now is not None else time.time()) // 60 * 60
+  since = (now - days * 86400 + UTC_OFFSET_S) // 86400 * 86400 - UTC_OFFSET_S   # 현지 자정
+  report = Report()
+  conn = _connect(path)
+  try:
+    for table in TABLES:
+      if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is not None:
+        raise click.ClickException(f"{table} 에 이미 데이터가 있습니다. 빈 DB(flask init-db 직후)에서 실행하세요.")
+
+    deferred = _deferred(conn)
+    for kind, name, _ in deferred:
+      conn.execute(f"DROP {kind.upper()} {name}")
+
+    def load(table, columns, chunks):
+      t0 = time.perf_counter()
+      conn.execute("BEGIN")
+      n = sum(_insert(conn, table, columns, rows) for rows in chunks)
+      conn.execute("COMMIT")
+      report.add(table, n, time.perf_counter() - t0)
+      echo(f"{table}: {n} rows ({time.perf_counter() - t0:.1f}s)")
+
+    t0 = time.perf_counter()
+    hub_rows = make_hubs(rng, hubs, bikes)
+    load("user", ("user_id", "name", "student_no", "phone", "grade", "joined_at"),
+         _chunked(make_users(rng, users, since), batch))
+
+    r = make_rides(rng, rides, hub_rows, bikes, users, since, now)
+    last = _last_rides(r, bikes)
+    open_rides = make_open_rides(rng, r, last, users, now)
+    echo(f"generated {len(r['start'])} rides ({time.perf_counter() - t0:.1f}s)")
+
+    bike_list = bike_rows(rng, r, last, hub_rows, open_rides)
+    load("hub", ("hub_id", "name", "lat", "lng", "capacity", "region"), [[tuple(h) for h in hub_rows]])
+    load("bike", ("bike_id", "current_hub_id", "lock_state", "battery_percent", "is_available",
+                  "last_lat", "last_lng", "last_seen_at"), _chunked(bike_list, batch))
+
+    n = len(r["start"])
+    bounds = [(lo, min(lo + batch, n)) for lo in range(0, n, batch)]
+    load("ride", ("ride_id", "user_id", "bike_id", "start_hub_id", "end_hub_id", "start_at", "end_at",
+                  "duration_min", "fare_amount", "incentive_applied"),
+         (ride_rows(r, lo, hi) for lo, hi in bounds))
+    load("ride", ("ride_id", "bike_id", "user_id", "start_hub_id", "start_at"),
+         [[(n + k, *o) for k, o in enumerate(open_rides, 1)]])
+
+    # 양도 등록은 잠금을 만들면서 모아 두었다가 따로 넣는다
+    pending = []
+    ids = {"lock": 1, "transfer": 1}
+    def locks():
+      for lo, hi in bounds:
+        rows, transfers = lock_rows(rng, r, lo, hi, lock_rate, ids["lock"], ids["transfer"], users)
+        ids["lock"] += len(rows)
+        ids["transfer"] += len(transfers)
+        pending.append(transfers)
+        yield rows
+    load("lock_status", ("lock_id", "bike_id", "user_id", "locked_at", "lat", "lng", "transferable", "is_active"),
+         locks())
+    load("transfer_intent", ("transfer_id", "lock_id", "registered_at", "is_matched", "matched_user_id"), pending)
+
+    if points:
+      step = max(1, batch // points)
+      load("bike_location_log", ("log_id", "bike_id", "lat", "lng", "logged_at"),
+           (location_rows(rng, r, lo, min(lo + step, n), points, lo * points + 1) for lo in range(0, n, step)))
+    day_step = max(1, batch // max(1, bikes))
+    load("bike_status_log", ("log_id", "bike_id", "status", "logged_at"),
+         (status_rows(rng, bikes, d, min(d + day_step, days), since, d * bikes + 1) for d in range(0, days, day_step)))
+
+    t1 = time.perf_counter()
+    conn.execute("BEGIN")
+    for _, _, sql in deferred:
+      conn.execute(sql)
+    conn.execute("COMMIT")
+    report.add("indexes", len(deferred), time.perf_counter() - t1)
+    echo(f"rebuilt {len(deferred)} indexes/triggers ({time.perf_counter() - t1:.1f}s)")
+
+    # 트리거 없이 넣었으므로 집계/버전을 맞춘다
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'hub_counters'").fetchone():
+      counters.rebuild(conn)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'data_version'").fetchone():
+      conn.execute("UPDATE data_version SET version = version + 1")
+    conn.execute("ANALYZE")
+  finally:
+    conn.execute("PRAGMA locking_mode = NORMAL")
+    conn.execute(f"PRAGMA journal_mode = {'WAL' if current_app.config.get('DB_WAL', True) else 'DELETE'}")
+    conn.close()
+
+  total = sum(v for k, v in report.rows.items() if k != "indexes")
+  report.rows["total"] = total
+  report.seconds["total"] = round(time.perf_counter() - t0, 1)
+  return report
+
+
+def _chunked(rows, size):
+  chunk = []
+  for row in rows:
+    chunk.append(row)
+    if len(chunk) >= size:
+      yield chunk
+      chunk = []
+  if chunk:
+    yield chunk
+
+
+@click.command('seed-db')
+@click.option('--hubs', type=click.IntRange(1), default=60, show_default=True)
+@click.option('--bikes', type=click.IntRange(1), default=10000, show_default=True)
+@click.option('--users', type=click.IntRange(1), default=20000, show_default=True)
+@click.option('--rides', type=click.IntRange(1), default=2_000_000, show_default=True)
+@click.option('--days', type=int, default=180, show_default=True, help='오늘까지 며칠 치 라이딩')
+@click.option('--points', type=int, default=4, show_default=True, help='라이딩 하나의 위치 로그 수')
+@click.option('--lock-rate', type=float, default=0.15, show_default=True, help='일시잠금이 있는 라이딩 비율')
+@click.option('--seed', 'seed_', type=int, default=0, show_default=True)
+@click.option('--batch', type=int, default=50000, show_default=True, help='executemany 한 번의 행 수')
+def seed_db_command(hubs, bikes, users, rides, days, points, lock_rate, seed_, batch):
+  report = seed(current_app.config['DATABASE'], hubs=hubs, bikes=bikes, users=users, rides=rides, days=days,
+                points=points, lock_rate=lock_rate, seed=seed_, batch=batch, echo=click.echo)
+  total, seconds = report.rows['total'], report.seconds['total']
+  click.echo(f'Seeded {total} rows in {seconds}s ({total / max(seconds, 1e-9):,.0f} rows/s).')
+
+
+def init_app(app):
+  app.cli.add_command(seed_db_command)
@@ -0,0 +1,132 @@
+"""
+허브 안내 문장 캐시.
+
+(hub_name, available_bikes) -> 생성된 한국어 문장.
+같은 허브/같은 대수 조합이 계속 반복되므로 두 번째 LLM 호출을 건너뛴다.
+- LRU + TTL, 최대 SENTENCE_CACHE_SIZE 개
+- hits / misses / evictions(용량 초과) / expirations(TTL 만료) 카운터
+- refresh-ahead: 백그라운드 워커 1개가 "지금 각 허브의 대수" 문장을 미리 만든다
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+
+class SentenceCache:
+  def __init__(self, maxsize=512, ttl=600):
+    self.maxsize = maxsize
+    self.ttl = ttl
+    self._data = OrderedDict()  # key -> (expires_at, sentence)
+    self._lock = threading.Lock()
+    self._last_counts = {}       # hub_name -> 마지막으로 본 대수
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.expirations = 0
+
+  def get(self, key):
+    now = time.monotonic()
+    with self._lock:
+      item = self._data.get(key)
+      if item is not None and item[0] < now:
+        del self._data[key]
+        self.expirations += 1
+        item = None
+      if item is None:
+        self.misses += 1
+        return None
+      self._data.move_to_end(key)
+      self.hits += 1
+      return item[1]
+
+  def contains(self, key):
+    """카운터를 건드리지 않고 신선한 항목이 있는지만 확인"""
+    with self._lock:
+      item = self._data.get(key)
+      return item is not None and item[0] >= time.monotonic()
+
+  def put(self, key, sentence):
+    with self._lock:
+      self._data[key] = (time.monotonic() + self.ttl, sentence)
+      self._data.move_to_end(key)
+      while len(self._data) > self.maxsize:
+        self._data.popitem(last=False)
+        self.evictions += 1
+
+  def observe(self, hub_name, count):
+    """허브 대수를 기록하고, 이전과 달라졌으면 True"""
+    with self._lock:
+      changed = self._last_counts.get(hub_name) != count
+      self._last_counts[hub_name] = count
+      return changed
+
+  def clear(self):
+    with self._lock:
+      self._data.clear()
+      self._last_counts.clear()
+
+  def stats(self):
+    with self._lock:
+      total = self.hits + self.misses
+      return {
+        "size": len(self._data),
+        "maxsize": self.maxsize,
+        "ttl_sec": self.ttl,
+        "hits": self.hits,
+        "misses": self.misses,
+        "evictions": self.evictions,
+        "expirations": self.expirations,
+        "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+      }
+
+
+class RefreshAhead:
+  """백그라운드 워커 1개. 이미 대기 중인 갱신이 있으면 새 요청은 합쳐진다."""
+
+  def __init__(self):
+    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentence-refresh")
+    self._pending = False
+    self._lock = threading.Lock()
+    self.runs = 0
+
+  def schedule(self, app, job):
+    with self._lock:
+      if self._pending:
+        return False
+      self._pending = True
+    return self._executor.submit(self._run, app, job)
+
+  def _run(self, app, job):
+    with self._lock:
+      self._pending = False
+    with app.app_context():
+      try:
+        job()
+      except Exception as e:
+        app.logger.warning("sentence refresh-ahead failed: %s", e)
+    self.runs += 1
+
+
+def get_cache(app=None):
+  app = app or current_app
+  return app.extensions["sentence_cache"]
+
+
+def get_refresher(app=None):
+  app = app or current_app
+  return app.extensions["sentence_refresh"]
+
+
+def init_app(app):
+  app.config.setdefault("SENTENCE_CACHE_SIZE", 512)
+  app.config.setdefault("SENTENCE_CACHE_TTL", 600)
+  app.config.setdefault("SENTENCE_REFRESH_AHEAD", False)
+
+  app.extensions["sentence_cache"] = SentenceCache(
+    maxsize=int(app.config["SENTENCE_CACHE_SIZE"]),
+    ttl=float(app.config["SENTENCE_CACHE_TTL"]),
+  )
+  app.extensions["sentence_refresh"] = RefreshAhead()
@@ -0,0 +1,340 @@
+"""
+허브 조회 / 문장 생성 서비스 레이어.
+
+menu1 과 api 라우트가 같은 함수를 프로세스 안에서 직접 호출한다.
+(예전처럼 자기 자신에게 HTTP 요청을 보내지 않으므로 워커 슬롯을 하나만 쓴다.)
+모든 함수는 (data, status_code) 튜플을 돌려주고, 라우트는 그대로 jsonify 만 한다.
+"""
+import logging
+import time
+
+from flask import current_app
+
+from . import counters, forecast, live, llm, metrics, repository, sentence_cache, spatial, versioning
+from .db import get_db
+
+SYSTEM_PROMPT = "You are Poring-AI, a chatbot for a bike rental service. You will engage in natural conversation with the user to tell them the number of available bikes at a specified location. If there are no bikes at that location, recommend the nearest alternative station. Rules: 1) Always maintain a friendly and warm tone. 2) Keep answers concise, limited to 1-2 sentences. 3) Do not provide unnecessary explanations, background information, or verbose descriptions. 4) Avoid an overly humorous or casual tone. 5) Always respond in short, clear Korean sentences."
+
+
+def count_available_bikes(db, hub_id) -> int:
+  """허브 하나의 이용가능 대수 (hub_counters PK 조회)"""
+  return counters.get_available(db, hub_id)
+
+
+def available_counts(db):
+  """{hub_id: 이용가능 대수} 전체 허브"""
+  return counters.all_available(db)
+
+
+def _alternative(index, hub, counts):
+  """hub 에서 가장 가까운, 자전거가 있는 다른 허브"""
+  if hub.lat is None or hub.lon is None:
+    return None
+  hits = index.nearest(hub.lat, hub.lon, k=1,
+                       accept=lambda h: h.hub_id != hub.hub_id and counts.get(h.hub_id, 0) > 0)
+  if not hits:
+    return None
+  alt, dist = hits[0]
+  return {"hub_id": alt.hub_id, "hub_name": alt.hub_name,
+          "available_bikes": counts[alt.hub_id], "distance_km": round(dist, 3)}
+
+
+def hub_data(db, index, hub, count=None, counts=None, distance_km=None):
+  """
+  허브 하나의 응답 dict. 자전거가 0대면 가장 가까운 대안 허브를 같이 넣는다.
+  count 를 모르면 해당 허브만 COUNT 한다.
+  """
+  if count is None:
+    count = counts.get(hub.hub_id, 0) if counts is not None else count_available_bikes(db, hub.hub_id)
+  data = {"hub_id": hub.hub_id, "hub_name": hub.hub_name, "found": True, "available_bikes": count}
+  if distance_km is not None:
+    data["distance_km"] = round(distance_km, 3)
+  if count == 0:
+    alt = _alternative(index, hub, counts if counts is not None else available_counts(db))
+    if alt:
+      data["alternative"] = alt
+  return data
+
+
+def sentence_messages(data):
+  """허브 이름/자전거 수(+대안 허브)를 한 문장으로 바꿔 달라는 프롬프트"""
+  content = f"다음 값을 자연스럽게 한문장으로 바꿔줘 허브이름 : {data['hub_name']}, 자전거 개수 : {data['available_bikes']}"
+  alt = data.get("alternative")
+  if alt:
+    content += f", 가장 가까운 대안 허브 : {alt['hub_name']} (자전거 {alt['available_bikes']}대, {round(alt['distance_km'] * 1000)}m)"
+  return [
+    {"role": "system", "content": SYSTEM_PROMPT},
+    {"role": "user", "content": content},
+  ]
+
+
+def lookup_available_bikes(hub_name):
+  """허브 이름으로 이용가능 자전거 수만 조회 (LLM 호출 없음)"""
+  if not hub_name:
+    return {"error": "hub_name 쿼리 파라미터가 필요합니다."}, 400
+
+  index = spatial.get_index()
+  hub = index.by_name.get(hub_name)
+  if not hub:
+    return {"hub_name" : hub_name, "found" : False, "available_bikes": 0, "error" : f"{hub_name} 허브를 찾을 수 없습니다."}, 200
+
+  data = hub_data(get_db(), index, hub)
+  metrics.log("hub_lookup", logging.DEBUG, data=data)
+  _observe(data)
+  return data, 200
+
+
+DAY_LABELS = ("오늘", "내일", "모레")
+
+
+def _forecast_target(at, day_offset, now, offset_s):
+  """'HH:MM'(현지) + 며칠 뒤 -> 유닉스 초. 오늘 이미 지난 시각이면 내일로 본다."""
+  try:
+    hour, _, minute = str(at).strip().partition(":")
+    hour, minute, day_offset = int(hour), int(minute or 0), int(day_offset or 0)
+  except (TypeError, ValueError):
+    return None
+  if not (0 <= hour <= 24 and 0 <= minute < 60 and 0 <= day_offset < 7):
+    return None
+  local = now + offset_s
+  target = local - local % 86400 + day_offset * 86400 + hour * 3600 + minute * 60
+  if day_offset == 0 and target < local - 1800:
+    target += 86400
+  return target - offset_s
+
+
+def lookup_bike_forecast(hub_name, at, day_offset=0):
+  """허브 이름 + 시각으로 예상 이용가능 대수 조회 (hub_forecast PK 한 번, LLM 호출 없음)"""
+  if not hub_name or not at:
+    return {"error": "hub_name, time 파라미터가 필요합니다."}, 400
+
+  hub = spatial.get_index().by_name.get(hub_name)
+  if not hub:
+    return {"hub_name" : hub_name, "found" : False, "error" : f"{hub_name} 허브를 찾을 수 없습니다."}, 200
+
+  offset_s = current_app.config["PRICING_UTC_OFFSET_S"]
+  now = int(time.time())
+  target = _forecast_target(at, day_offset, now, offset_s)
+  if target is None:
+    return {"hub_name": hub_name, "found": False, "error": "time 은 'HH:MM', day_offset 은 0~6 이어야 합니다."}, 400
+
+  row = forecast.lookup(get_db(), hub.hub_id, target)
+  days = (target + offset_s) // 86400 - (now + offset_s) // 86400
+  data = {
+    "hub_id": hub.hub_id, "hub_name": hub.hub_name, "found": True,
+    "date": time.strftime("%Y-%m-%d", time.gmtime(target + offset_s)),
+    "day": DAY_LABELS[days] if days < len(DAY_LABELS) else f"{days}일 뒤",
+    "time": time.strftime("%H:%M", time.gmtime(target + offset_s)),
+  }
+  if row is None:
+    data["error"] = "아직 예측 데이터가 없어요."
+    return data, 200
+  data.update(expected_bikes=round(row["bikes"]), pickups_per_hour=row["pickups"], dropoffs_per_hour=row["dropoffs"],
+              fitted_at=time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(row["fitted_at"])))
+  metrics.log("hub_forecast", logging.DEBUG, data=data)
+  return data, 200
+
+
+def forecast_sentence(data):
+  """예측 결과 안내 문장 (템플릿, LLM 호출 없음)"""
+  hour, minute = data["time"].split(":")
+  when = f"{data['day']} {int(hour)}시" + (f" {int(minute)}분" if int(minute) else "")
+  return f"{data['hub_name']}에는 {when}쯤 자전거가 약 {data['expected_bikes']}대 있을 것으로 예상돼요."
+
+
+def _parse_coord(lat, lon):
+  try:
+    return float(lat), float(lon)
+  except (TypeError, ValueError):
+    return None
+
+
+def lookup_available_nearby_bikes(lat, lon):
+  """가장 가까운 허브의 이용가능 자전거 수만 조회 (LLM 호출 없음)"""
+  coord = _parse_coord(lat, lon)
+  if coord is None:
+    return {
+      "hub_name": None,
+      "found": False,
+      "available_bikes": 0,
+      "error": "lat, lon 쿼리 파라미터가 필요합니다 (float)"
+    }, 400
+
+  index = spatial.get_index()
+  hits = index.nearest(*coord, k=1)
+  if not hits:
+    return {
+      "hub_name": None,
+      "found": False,
+      "available_bikes": 0,
+      "error": "근처 허브를 찾을 수 없습니다."
+    }, 400
+
+  hub, dist = hits[0]
+  data = hub_data(get_db(), index, hub, distance_km=dist)
+  metrics.log("nearest_hub", logging.DEBUG, data=data)
+  _observe(data)
+  return data, 200
+
+
+def nearby_hubs(lat, lon, k=5, radius_km=None, available_only=False):
+  """가까운 허브 k 개 (반경/자전거 있는 곳만 필터) + 거리/대수"""
+  coord = _parse_coord(lat, lon)
+  if coord is None:
+    return {"error": "lat, lon 쿼리 파라미터가 필요합니다 (float)"}, 400
+
+  counts = available_counts(get_db())
+  accept = (lambda h: counts.get(h.hub_id, 0) > 0) if available_only else None
+  hits = spatial.get_index().nearest(*coord, k=k, radius_km=radius_km, accept=accept)
+  return {
+    "query": {"lat": coord[0], "lon": coord[1], "k": k, "r_km": radius_km, "available_only": available_only},
+    "hubs": [
+      {"hub_id": h.hub_id, "hub_name": h.hub_name, "distance_km": round(d, 3),
+       "available_bikes": counts.get(h.hub_id, 0)}
+      for h, d in hits
+    ],
+  }, 200
+
+
+def occupancy_version():
+  """
+  지도 데이터 버전 "<hub 버전>-<hub_counters 버전>".
+  허브 목록/좌표가 바뀌면 앞쪽이, 주차·대수가 바뀌면 뒤쪽이 올라간다.
+  """
+  db = get_db()
+  return f"{versioning.get_version(db, 'hub')}-{counters.version(db)}"
+
+
+def _since(token, current):
+  """since 토큰에서 hub_counters 버전. 허브 목록이 바뀌었거나 이상한 값이면 None (전체 전송)"""
+  try:
+    hubs_v, counters_v = (int(x) for x in (token or "").split("-"))
+    cur_hubs_v, cur_counters_v = (int(x) for x in current.split("-"))
+  except ValueError:
+    return None
+  if hubs_v != cur_hubs_v or counters_v > cur_counters_v:
+    return None
+  return counters_v
+
+
+def hub_occupancy(since=None, version=None):
+  """
+  허브별 주차 현황.
+  since 가 지금과 같은 허브 목록의 버전이면 그 뒤로 바뀐 허브만 돌려준다. (full=False)
+  """
+  version = version or occupancy_version()
+  base = _since(since, version) if since else None
+  rows = repository.occupancy(get_db(), since=-1 if base is None else base)
+  return {
+    "version": version,
+    "full": base is None,
+    "hubs": [r.as_dict() for r in rows],
+  }, 200
+
+
+def generate_sentence(messages_for_model, data):
+  """messages_for_model 로 GPT 를 호출해 data["content"] 에 문장을 채운다."""
+  data = dict(data or {})
+  if not isinstance(messages_for_model, list):
+    return {"error": "messages_for_model must be a list of messages"}, 400
+
+  try:
+    # GPT에게 질문 보내기 (OPENAI_MOCK=1 이면 게이트웨이가 로컬 mock 으로 처리)
+    with metrics.span("sentence"):
+      resp = llm.chat(messages=messages_for_model, temperature=0.1)
+
+    # output 추출
+    data["content"] = resp.choices[0].message.content
+    return data, 200
+
+  except Exception as e:
+    data["error"] = str(e)
+    return data, 400
+
+
+def sentence_key(data):
+  """문장 캐시 키: 허브, 대수, (0대일 때) 대안 허브와 그 대수"""
+  alt = data.get("alternative") or {}
+  return (data["hub_name"], data["available_bikes"], alt.get("hub_name"), alt.get("available_bikes"))
+
+
+def sentence_for(data):
+  """캐시에 있으면 그대로, 없으면 LLM 으로 문장을 만들어 캐시에 넣는다."""
+  cache = sentence_cache.get_cache()
+  key = sentence_key(data)
+  content = cache.get(key)
+  if content is not None:
+    return dict(data, content=content)
+
+  data, status = generate_sentence(sentence_messages(data), data)
+  if status == 200 and data.get("content"):
+    cache.put(key, data["content"])
+  return data
+
+
+def stream_sentence(data):
+  """sentence_for 의 스트리밍 버전. 캐시에 있으면 한 번에, 없으면 토큰이 오는 대로 낸다."""
+  cache = sentence_cache.get_cache()
+  key = sentence_key(data)
+  content = cache.get(key)
+  if content is not None:
+    yield content
+    return
+
+  parts = []
+  for kind, text in llm.stream(messages=sentence_messages(data), temperature=0.1):
+    if kind == "token":
+      parts.append(text)
+      yield text
+  if parts:
+    cache.put(key, "".join(parts))
+
+
+def available_bikes(hub_name):
+  """허브 조회 + 안내 문장 생성"""
+  data, status = lookup_available_bikes(hub_name)
+  if status != 200 or not data.get("found"):
+    return data, status
+  return sentence_for(data), 200
+
+
+def available_nearby_bikes(lat, lon):
+  """근처 허브 조회 + 안내 문장 생성"""
+  data, status = lookup_available_nearby_bikes(lat, lon)
+  if status != 200 or not data.get("found"):
+    return data, status
+  return sentence_for(data), 200
+
+
+def _observe(data):
+  # 다른 경로(직접 DB 수정 등)로 대수가 바뀐 것도 여기서 감지한다.
+  if sentence_cache.get_cache().observe(data["hub_name"], data["available_bikes"]):
+    notify_availability_changed()
+
+
+def notify_availability_changed(app=None):
+  """
+  대여/반납/잠금 커밋 후 호출.
+  지도 실시간 피드(live)에 알리고, refresh-ahead 가 켜져 있으면 문장을 미리 만든다.
+  """
+  app = app or current_app._get_current_object()
+  live.publish(app)
+  if app.config["SENTENCE_REFRESH_AHEAD"]:
+    sentence_cache.get_refresher(app).schedule(app, refresh_sentences)
+
+
+def refresh_sentences():
+  """모든 허브의 현재 대수에 대한 문장을 캐시에 채운다. (app context 안에서 실행)"""
+  cache = sentence_cache.get_cache()
+  db = get_db()
+  index = spatial.get_index()
+  counts = available_counts(db)
+  for hub in index.by_name.values():
+    data = hub_data(db, index, hub, counts=counts)
+    cache.observe(hub.hub_name, data["available_bikes"])
+    key = sentence_key(data)
+    if cache.contains(key):
+      continue
+    data, status = generate_sentence(sentence_messages(data), data)
+    if status == 200 and data.get("content"):
+      cache.put(key, data["content"])
@@ -0,0 +1,106 @@
+"""
+허브 좌표 공간 인덱스 (프로세스 전역, hub 버전이 바뀔 때만 다시 만든다)
+
+위경도를 단위 구 위의 (x, y, z) 로 바꿔 3차원 KD-tree 에 넣는다.
+구 위에서 직선(chord) 거리는 대원 거리와 단조 관계라서
+KD-tree 의 최근접 결과가 haversine 기준 최근접과 같다.
+거리 값 자체는 haversine 으로 계산해서 돌려준다.
+"""
+import heapq
+import math
+from collections import namedtuple
+
+from . import repository, versioning
+
+EARTH_RADIUS_KM = 6371.0088
+
+Hit = namedtuple("Hit", "hub distance_km")
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+  p1, p2 = math.radians(lat1), math.radians(lat2)
+  dp = p2 - p1
+  dl = math.radians(lon2 - lon1)
+  a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+  return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _xyz(lat, lon):
+  p, l = math.radians(lat), math.radians(lon)
+  return (math.cos(p) * math.cos(l), math.cos(p) * math.sin(l), math.sin(p))
+
+
+def _chord2(km):
+  """대원 거리 km 에 해당하는 단위 구 chord 길이의 제곱"""
+  return (2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)) ** 2
+
+
+class _Node:
+  __slots__ = ("hub", "xyz", "axis", "left", "right")
+
+
+class HubIndex:
+  def __init__(self, hubs):
+    hubs = list(hubs)
+    self.by_name = {h.hub_name: h for h in hubs}
+    self.hubs = [h for h in hubs if h.lat is not None and h.lon is not None]
+    self.root = self._build([(_xyz(h.lat, h.lon), h) for h in self.hubs], 0)
+
+  def __len__(self):
+    return len(self.hubs)
+
+  def _build(self, items, depth):
+    if not items:
+      return None
+    axis = depth % 3
+    items.sort(key=lambda it: it[0][axis])
+    mid = len(items) // 2
+    node = _Node()
+    node.xyz, node.hub = items[mid]
+    node.axis = axis
+    node.left = self._build(items[:mid], depth + 1)
+    node.right = self._build(items[mid + 1:], depth + 1)
+    return node
+
+  def nearest(self, lat, lon, k=1, radius_km=None, accept=None):
+    """
+    (lat, lon) 에서 가까운 순서로 최대 k 개의 Hit.
+    radius_km 가 있으면 그 안쪽만, accept(hub) 가 있으면 True 인 허브만.
+    """
+    q = _xyz(float(lat), float(lon))
+    limit = _chord2(radius_km) if radius_km is not None else math.inf
+    best = []  # (-d2, hub_id, hub) 최대 힙
+
+    def visit(node):
+      if node is None:
+        return
+      d2 = (q[0] - node.xyz[0]) ** 2 + (q[1] - node.xyz[1]) ** 2 + (q[2] - node.xyz[2]) ** 2
+      if d2 <= limit and (accept is None or accept(node.hub)):
+        entry = (-d2, node.hub.hub_id, node.hub)
+        if len(best) < k:
+          heapq.heappush(best, entry)
+        elif d2 < -best[0][0]:
+          heapq.heapreplace(best, entry)
+      diff = q[node.axis] - node.xyz[node.axis]
+      near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+      visit(near)
+      bound = limit if len(best) < k else min(limit, -best[0][0])
+      if diff * diff <= bound:
+        visit(far)
+
+    if k > 0:
+      visit(self.root)
+    hits = sorted(best, key=lambda e: -e[0])
+    return [Hit(h, haversine_km(float(lat), float(lon), h.lat, h.lon)) for _, _, h in hits]
+
+  def within(self, lat, lon, radius_km, accept=None):
+    """반경 radius_km 안의 허브 전부 (가까운 순)"""
+    return self.nearest(lat, lon, k=len(self.hubs), radius_km=radius_km, accept=accept)
+
+
+def _build(db):
+  return HubIndex(repository.hubs(db))
+
+
+def get_index():
+  return versioning.cached("hub", "spatial", _build)
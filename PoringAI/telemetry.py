@@ -0,0 +1,175 @@
+"""
+자전거 텔레메트리(위치/배터리/상태) 일괄 수집
+
+입력 두 가지:
+- NDJSON (application/x-ndjson): 한 줄에 샘플 하나
+    {"bike_id": 7, "ts": 1760000000, "lat": 36.01, "lng": 129.32, "battery": 81, "status": "ok"}
+  lat/lng, battery, status 는 각각 생략할 수 있다. ts 는 유닉스 초 또는 ISO8601, 없으면 서버 시각.
+  ts 가 서버 시각보다 TELEMETRY_MAX_PAST_S 이전이거나 TELEMETRY_MAX_FUTURE_S 이후면 그 샘플은 버린다.
+- 바이너리 (application/x-poring-telemetry): 18바이트 레코드를 이어 붙인 것
+    <I bike_id, I ts(유닉스 초), i lat*1e7, i lng*1e7, B battery(255=없음), B status 코드>
+
+유효한 샘플만 한 트랜잭션에서 executemany 로
+bike_location_log / bike_status_log 에 넣고, 같은 패스에서 bike 의
+battery_percent 와 최신 위치(last_lat, last_lng, last_seen_at)를 갱신한다.
+잘못된 샘플은 건너뛰고 줄 번호와 이유를 돌려준다.
+"""
+import json
+import struct
+import time
+from datetime import datetime, timezone
+
+RECORD = struct.Struct("<IIiiBB")
+NO_BATTERY = 255
+STATUS_CODES = {0: None, 1: "ok", 2: "low_battery", 3: "repair_needed", 4: "fault"}
+MAX_STATUS_LEN = 32
+MAX_ERRORS = 20   # 응답에 담을 오류 줄 수
+
+
+class Sample:
+  __slots__ = ("bike_id", "logged_at", "lat", "lng", "battery", "status")
+
+  def __init__(self, bike_id, logged_at, lat, lng, battery, status):
+    self.bike_id = bike_id
+    self.logged_at = logged_at
+    self.lat = lat
+    self.lng = lng
+    self.battery = battery
+    self.status = status
+
+
+def _seconds(value):
+  """유닉스 초/ISO8601(시간대 없으면 UTC) -> 유닉스 초"""
+  if isinstance(value, (int, float)) and not isinstance(value, bool):
+    return value
+  if isinstance(value, str):
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+      dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+  raise ValueError("ts 는 유닉스 초 또는 ISO8601 문자열")
+
+
+def _ts(value, now, window):
+  """
+  ts -> 'YYYY-MM-DD HH:MM:SS' (UTC, datetime('now') 와 같은 모양). 없으면 now.
+  window = (과거 허용 초, 미래 허용 초). 밖이면 ValueError.
+  (먼 미래는 last_seen_at 을 영영 붙잡고, 음수는 글자 비교로 하는 시각 조건을 깨뜨린다)
+  """
+  seconds = now if value is None else _seconds(value)
+  if not (now - window[0] <= seconds <= now + window[1]):
+    raise ValueError("ts 가 서버 시각에서 너무 멀다")
+  return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds))
+
+
+def _check(bike_id, lat, lng, battery, status):
+  if not isinstance(bike_id, int) or isinstance(bike_id, bool) or bike_id <= 0:
+    raise ValueError("bike_id 는 양의 정수")
+  if (lat is None) != (lng is None):
+    raise ValueError("lat, lng 는 같이 있어야 함")
+  if lat is not None and not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+    raise ValueError("좌표 범위 밖")
+  if battery is not None and not (isinstance(battery, int) and 0 <= battery <= 100):
+    raise ValueError("battery 는 0~100 정수")
+  if status is not None and not (isinstance(status, str) and 0 < len(status) <= MAX_STATUS_LEN):
+    raise ValueError("status 는 1~32자 문자열")
+  if lat is None and battery is None and status is None:
+    raise ValueError("위치/배터리/상태 중 하나는 있어야 함")
+
+
+def parse_ndjson(body, window):
+  """(samples, errors) -- errors 는 (줄 번호, 이유). window 는 _ts 참고"""
+  now = int(time.time())
+  samples, errors = [], []
+  for no, line in enumerate(body.splitlines(), 1):
+    if not line.strip():
+      continue
+    try:
+      d = json.loads(line)
+      lat, lng = d.get("lat"), d.get("lng")
+      if lat is not None:
+        lat, lng = float(lat), float(lng)
+      battery, status = d.get("battery"), d.get("status")
+      _check(d.get("bike_id"), lat, lng, battery, status)
+      samples.append(Sample(d["bike_id"], _ts(d.get("ts"), now, window), lat, lng, battery, status))
+    except (ValueError, TypeError, AttributeError, OverflowError) as e:
+      errors.append((no, str(e)))
+  return samples, errors
+
+
+def parse_binary(body, window):
+  if len(body) % RECORD.size:
+    raise ValueError(f"바이너리 길이는 {RECORD.size} 의 배수여야 합니다.")
+  now = int(time.time())
+  samples, errors = [], []
+  for no, (bike_id, ts, lat7, lng7, battery, code) in enumerate(RECORD.iter_unpack(body), 1):
+    lat, lng = lat7 / 1e7, lng7 / 1e7
+    battery = None if battery == NO_BATTERY else battery
+    status = STATUS_CODES.get(code, "")
+    try:
+      _check(bike_id, lat, lng, battery, status)
+      logged_at = _ts(ts, now, window)
+    except ValueError as e:
+      errors.append((no, str(e)))
+      continue
+    samples.append(Sample(bike_id, logged_at, lat, lng, battery, status))
+  return samples, errors
+
+
+def _known_bikes(db, ids):
+  known = set()
+  ids = list(ids)
+  for i in range(0, len(ids), 900):   # SQLite 변수 개수 제한
+    chunk = ids[i:i + 900]
+    known.update(r[0] for r in db.execute(
+      f"SELECT bike_id FROM bike WHERE bike_id IN ({','.join('?' * len(chunk))})", chunk))
+  return known
+
+
+def ingest(db, samples):
+  """
+  유효한 샘플을 한 트랜잭션으로 기록한다. db 는 writer 연결.
+  반환: (accepted, unknown bike_id 로 버린 수)
+  """
+  known = _known_bikes(db, {s.bike_id for s in samples})
+
+  locations, statuses, latest, battery = [], [], {}, {}
+  dropped = 0
+  for s in samples:
+    if s.bike_id not in known:
+      dropped += 1
+      continue
+    if s.lat is not None:
+      locations.append((s.bike_id, s.lat, s.lng, s.logged_at))
+      prev = latest.get(s.bike_id)
+      if prev is None or s.logged_at >= prev[2]:
+        latest[s.bike_id] = (s.lat, s.lng, s.logged_at)
+    if s.status is not None:
+      statuses.append((s.bike_id, s.status, s.logged_at))
+    if s.battery is not None:
+      prev = battery.get(s.bike_id)
+      if prev is None or s.logged_at >= prev[1]:
+        battery[s.bike_id] = (s.battery, s.logged_at)
+
+  with db:
+    db.executemany("INSERT INTO bike_location_log (bike_id, lat, lng, logged_at) VALUES (?, ?, ?, ?)", locations)
+    db.executemany("INSERT INTO bike_status_log (bike_id, status, logged_at) VALUES (?, ?, ?)", statuses)
+    # 늦게 도착한 옛 샘플이 최신 배터리/위치를 덮지 않게 시각을 비교한다
+    db.executemany(
+      '''UPDATE bike SET battery_percent = ?, battery_at = ?
+         WHERE bike_id = ? AND (battery_at IS NULL OR battery_at <= ?)''',
+      [(b, at, bike_id, at) for bike_id, (b, at) in battery.items()],
+    )
+    db.executemany(
+      '''UPDATE bike SET last_lat = ?, last_lng = ?, last_seen_at = ?
+         WHERE bike_id = ? AND (last_seen_at IS NULL OR last_seen_at <= ?)''',
+      [(lat, lng, at, bike_id, at) for bike_id, (lat, lng, at) in latest.items()],
+    )
+  return len(samples) - dropped, dropped
+
+
+def init_app(app):
+  app.config.setdefault("TELEMETRY_MAX_BYTES", 16 * 1024 * 1024)
+  app.config.setdefault("TELEMETRY_MAX_SAMPLES", 100000)
+  app.config.setdefault("TELEMETRY_MAX_PAST_S", 7 * 86400)   # 오프라인으로 쌓아 둔 샘플까지
+  app.config.setdefault("TELEMETRY_MAX_FUTURE_S", 300)       # 단말 시계 오차
@@ -0,0 +1,71 @@
+"""
+OpenAI tools 정의를 hub 테이블에서 만든다.
+
+허브 이름은 긴 설명문 대신 enum 으로 넣어 프롬프트 토큰을 줄이고,
+region 이 채워진 허브가 있으면 "지역: 허브,허브" 한 줄을 덧붙인다.
+hub 버전이 바뀔 때만 다시 만든다. (versioning.cached)
+"""
+from . import repository, versioning
+
+NEARBY_TOOL = {
+  "type": "function",
+  "function": {
+    "name": "get_available_nearby_bikes",
+    "description": "자신 근처에 있는 허브의 이용가능 자전거 수를 조회한다. 질문에 자신의 근처를 묻는 것이 있어야한다."
+  }
+}
+
+
+def build_tools(db):
+  hubs = repository.hubs(db)
+  names = [h.hub_name for h in hubs]
+
+  regions = {}
+  for h in hubs:
+    if h.region:
+      regions.setdefault(h.region, []).append(h.hub_name)
+  description = "허브 이름."
+  if regions:
+    description += " 지역을 물으면 해당 허브들을 각각 조회: " + "; ".join(
+      f"{region}={','.join(hubs)}" for region, hubs in regions.items()
+    )
+
+  hub_name = {"type": "string", "description": description}
+  if names:
+    hub_name["enum"] = names
+
+  return [
+    {
+      "type": "function",
+      "function": {
+        "name": "get_available_bikes",
+        "description": "허브 이름으로 이용가능 자전거 수를 조회한다.",
+        "parameters": {
+          "type": "object",
+          "properties": {"hub_name": hub_name},
+          "required": ["hub_name"]
+        }
+      }
+    },
+    NEARBY_TOOL,
+    {
+      "type": "function",
+      "function": {
+        "name": "get_bike_forecast",
+        "description": "허브의 특정 시각(예: 18시쯤, 내일 아침 8시) 예상 이용가능 자전거 수를 조회한다. 지금 대수를 물으면 쓰지 않는다.",
+        "parameters": {
+          "type": "object",
+          "properties": {
+            "hub_name": hub_name,
+            "time": {"type": "string", "description": "현지 시각 24시간제 HH:MM (오후 6시 = 18:00)"},
+            "day_offset": {"type": "integer", "description": "며칠 뒤인지 (오늘 0, 내일 1, 모레 2)", "minimum": 0, "maximum": 6}
+          },
+          "required": ["hub_name", "time"]
+        }
+      }
+    },
+  ]
+
+
+def get_tools():
+  return versioning.cached("hub", "tools", build_tools)
@@ -0,0 +1,50 @@
+"""
+테이블 데이터 버전.
+
+data_version(name, version) 한 줄을 트리거가 INSERT/UPDATE/DELETE 마다 +1 한다.
+워커가 여러 개여도 DB 에서 읽으므로 버전이 맞고, 확인 비용은 PK 조회 한 번이다.
+테이블과 트리거는 schema.sql 에 있다. (init-db / migrate-db. 요청 경로에서는 만들지 않는다)
+메모리 캐시는 cached(name, builder) 로 "버전이 바뀌었을 때만" 다시 만든다.
+"""
+import sqlite3
+import threading
+
+from flask import current_app
+
+from .db import get_db
+
+
+def get_version(db, table):
+  """table 의 데이터 버전. 아직 migrate-db 전이라 data_version 이 없으면 0"""
+  try:
+    row = db.execute("SELECT version FROM data_version WHERE name = ?", (table,)).fetchone()
+  except sqlite3.OperationalError:
+    return 0
+  return row["version"] if row else 0
+
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+def _lock(key):
+  """캐시마다 따로 잠근다. (느린 빌더 하나가 다른 캐시의 재생성을 막지 않게)"""
+  with _locks_lock:
+    return _locks.setdefault(key, threading.Lock())
+
+
+def cached(table, key, builder):
+  """
+  table 버전이 같으면 메모리 값을, 바뀌었으면 builder(db) 로 다시 만든 값을 돌려준다.
+  key 는 같은 테이블에 걸린 캐시들을 구분한다. (예: "tools", "gazetteer")
+  """
+  db = get_db()
+  version = get_version(db, table)
+  store = current_app.extensions.setdefault("versioned_cache", {})
+  hit = store.get(key)
+  if hit is not None and hit[0] == version:
+    return hit[1]
+  with _lock(key):
+    hit = store.get(key)
+    if hit is None or hit[0] != version:
+      hit = store[key] = (version, builder(db))
+  return hit[1]
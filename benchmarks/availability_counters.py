@@ -0,0 +1,85 @@
+"""
+허브 카운터(hub_counters) vs 매번 재집계
+
+대수 N 의 자전거 fleet 에서
+- 허브 하나 대수:   COUNT(*) ... WHERE current_hub_id=?     vs  hub_counters PK 조회
+- 전체 허브 대수:   GROUP BY current_hub_id                 vs  hub_counters 전체
+- menu2 지도 집계:  hub LEFT JOIN bike GROUP BY             vs  hub LEFT JOIN hub_counters
+- 쓰기 비용:        상태 토글 UPDATE (트리거 있음/없음)
+- 일관성 검사 시간 (counters.check)
+
+사용법:
+  python -m benchmarks.availability_counters [--sizes 10000,100000] [-n 500]
+"""
+import argparse
+import json
+import random
+import sqlite3
+
+from PoringAI import counters, repository
+from .common import HUBS, make_app, summarize, timeit
+
+RECOUNT_ONE = '''
+    SELECT COUNT(*) AS cnt FROM bike WHERE current_hub_id = ? AND is_available = 1
+'''
+RECOUNT_ALL = '''
+    SELECT current_hub_id, COUNT(*) FROM bike WHERE is_available = 1 GROUP BY current_hub_id
+'''
+RECOUNT_MENU2 = '''
+    SELECT h.hub_id, h.name, h.lat, h.lng, COUNT(b.bike_id), h.capacity,
+           COALESCE(SUM(b.is_available = 1), 0)
+    FROM hub h LEFT JOIN bike b ON b.current_hub_id = h.hub_id
+    GROUP BY h.hub_id ORDER BY h.hub_id
+'''
+
+
+def toggles(db, n_bikes, n):
+  def one():
+    b = random.randint(1, n_bikes)
+    db.execute("UPDATE bike SET is_available = 1 - is_available WHERE bike_id = ?", (b,))
+    db.commit()
+  return summarize(timeit(one, n))
+
+
+def run(n_bikes, n):
+  app = make_app(n_bikes=n_bikes, capacity=n_bikes // len(HUBS) + 1)
+  db = sqlite3.connect(app.config["DATABASE"])
+  db.row_factory = sqlite3.Row
+  hub = lambda: random.randint(1, len(HUBS))
+
+  out = {"bikes": n_bikes}
+  # 카운터 트리거(schema.sql)를 잠깐 빼고 쓰기 비용을 잰 뒤 되돌린다
+  triggers = db.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                        "AND (name LIKE 'trg_bike_counters_%' OR name LIKE 'trg_hub_counters_capacity_%')").fetchall()
+  for name, _ in triggers:
+    db.execute(f"DROP TRIGGER {name}")
+  out["write_no_triggers"] = toggles(db, n_bikes, n)
+  for _, sql in triggers:
+    db.execute(sql)
+  counters.rebuild(db)
+
+  with app.app_context():
+    out["write_with_triggers"] = toggles(db, n_bikes, n)
+    out["one_hub_recount"] = summarize(timeit(lambda: db.execute(RECOUNT_ONE, (hub(),)).fetchone(), n))
+    out["one_hub_counter"] = summarize(timeit(lambda: counters.get_available(db, hub()), n))
+    out["all_hubs_recount"] = summarize(timeit(lambda: db.execute(RECOUNT_ALL).fetchall(), n // 5))
+    out["all_hubs_counter"] = summarize(timeit(lambda: counters.all_available(db), n // 5))
+    out["menu2_recount"] = summarize(timeit(lambda: db.execute(RECOUNT_MENU2).fetchall(), n // 5))
+    out["menu2_counter"] = summarize(timeit(lambda: repository.occupancy(db), n // 5))
+    out["consistency_check"] = summarize(timeit(lambda: counters.check(db), 5))
+    out["consistent"] = counters.check(db) == []
+  return out
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--sizes", default="10000,100000")
+  parser.add_argument("-n", type=int, default=500)
+  args = parser.parse_args()
+  random.seed(0)
+  results = [run(int(s), args.n) for s in args.sizes.split(",")]
+  print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,103 @@
+"""
+menu1 대화 기록: 서명 쿠키 세션(예전) vs chat_history (chat_log + LRU)
+
+대화 16개(메시지당 --chars 글자)가 쌓인 상태에서
+- cookie_bytes : 브라우저가 매 요청(정적 파일 포함)마다 보내는 session 쿠키 크기
+- history      : 기록을 읽고 세션을 다시 쓰는 요청 한 번 (예전: 쿠키 역직렬화/프루닝/재서명)
+- static       : 쿠키만 달고 가는 정적 파일 요청
+- cold_load    : LRU 에 없을 때 chat_log 에서 다시 읽는 비용 (store 만)
+
+사용법:
+  python -m benchmarks.chat_history [--chars 300] [-n 500]
+"""
+import argparse
+import json
+import random
+import time
+
+from flask import request, session
+
+from PoringAI import chat_history, log_writer
+from .common import make_app, summarize, timeit
+
+OLD_KEY = "menu1_hist"
+MAX_MSGS = 16
+TTL_SEC = 60 * 30
+
+
+def _old_history():
+  # user-018 이전 menu1._get_history 와 같은 일: 쿠키에서 꺼내 TTL/개수로 자르고 다시 넣는다
+  cut_off = int(time.time()) - TTL_SEC
+  hist = [m for m in session.get(OLD_KEY, []) if m.get("ts", 0) >= cut_off][-MAX_MSGS:]
+  session[OLD_KEY] = hist
+  session.modified = True
+  return str(len(hist))
+
+
+def _append():
+  # 턴 쌓기용. 실제 경로(menu1 폼/스트림)는 서버가 만든 답을 기록한다
+  payload = request.get_json()
+  chat_history.append_turn(payload["question"], payload["answer"])
+  return "", 204
+
+
+def _cookie(client):
+  cookie = client.get_cookie("session")
+  return cookie.value if cookie is not None else ""
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--chars", type=int, default=300)
+  parser.add_argument("-n", type=int, default=500)
+  args = parser.parse_args()
+
+  app = make_app(n_bikes=10)
+  app.add_url_rule("/bench/old-history", "old_history", _old_history)
+  app.add_url_rule("/bench/append", "append", _append, methods=["POST"])
+  app.add_url_rule("/bench/new-history", "new_history", lambda: str(len(chat_history.get_history())))
+  random.seed(0)
+  # 같은 문장 반복은 세션 쿠키의 zlib 압축에 너무 유리하다
+  text = lambda: "".join(chr(random.randint(0xAC00, 0xD7A3)) for _ in range(args.chars))
+  turns = MAX_MSGS // 2
+
+  old = app.test_client()
+  with old.session_transaction() as s:
+    now = int(time.time())
+    s[OLD_KEY] = [{"role": r, "content": text(), "ts": now} for _ in range(turns) for r in ("user", "system")]
+  old.get("/bench/old-history")
+
+  new = app.test_client()
+  for _ in range(turns):
+    new.post("/bench/append", json={"question": text(), "answer": text()})
+  log_writer.get_log_writer(app).flush()
+
+  store = chat_history.get_store(app)
+  with new.session_transaction() as s:
+    sid, seq = s[chat_history.SID_KEY], s[chat_history.SEQ_KEY]
+
+  def cold():
+    store._data.clear()
+    store.get(sid, seq)
+
+  static = "/static/css/chat.css"
+  results = {
+    "session_cookie": {
+      "cookie_bytes": len(_cookie(old)),
+      "history": summarize(timeit(lambda: old.get("/bench/old-history"), args.n)),
+      "static": summarize(timeit(lambda: old.get(static), args.n)),
+    },
+    "chat_history": {
+      "cookie_bytes": len(_cookie(new)),
+      "history": summarize(timeit(lambda: new.get("/bench/new-history"), args.n)),
+      "static": summarize(timeit(lambda: new.get(static), args.n)),
+    },
+  }
+  with app.test_request_context():
+    results["chat_history"]["cold_load"] = summarize(timeit(cold, args.n))
+  results["chat_history"]["store"] = store.stats()
+  print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,80 @@
+"""
+채팅 경로 지연시간 비교 (LLM 은 게이트웨이 mock 백엔드)
+
+before : menu1 -> HTTP GET /legacy/available-bikes -> HTTP POST /api/generate-sentence
+         (예전 루프백 구조를 그대로 재현)
+after  : menu1 -> service.lookup_available_bikes() + 문장 생성 (프로세스 내부 호출)
+
+사용법:
+  python -m benchmarks.chat_path [-n 200] [--llm-ms 0]
+"""
+import argparse
+import json
+import logging
+import threading
+from unittest import mock
+
+import requests
+from flask import Blueprint, url_for
+from werkzeug.serving import make_server
+
+from PoringAI import service
+from .common import make_app, summarize, timeit
+
+
+# 예전 /api/available-bikes 구현: 조회 후 자기 자신에게 POST
+legacy = Blueprint("legacy", __name__, url_prefix="/legacy")
+
+_lookup = service.lookup_available_bikes
+
+@legacy.route("/available-bikes")
+def legacy_available_bikes():
+  from flask import request
+  data, status = _lookup(request.args.get("hub_name"))
+  if status != 200 or not data.get("found"):
+    return data, status
+  res = requests.post(url_for("api.generate_sentence", _external=True),
+                      json={"messages_for_model": service.sentence_messages(data), "data": data},
+                      timeout=5)
+  return res.json()
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("-n", type=int, default=200)
+  parser.add_argument("--llm-ms", type=float, default=0.0, help="가짜 LLM 호출 1회당 지연(ms)")
+  args = parser.parse_args()
+
+  logging.getLogger("werkzeug").setLevel(logging.ERROR)
+  app = make_app(LLM_BACKEND="mock", LLM_MOCK_LATENCY_MS=args.llm_ms)
+  app.register_blueprint(legacy)
+  server = make_server("127.0.0.1", 0, app, threaded=True)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  base = f"http://127.0.0.1:{server.server_port}"
+
+  def legacy_fetch(hub_name):
+    res = requests.get(f"{base}/legacy/available-bikes", params={"hub_name": hub_name}, timeout=5)
+    return res.json(), res.status_code
+
+  sess = requests.Session()
+
+  def ask():
+    res = sess.post(f"{base}/menu1/", data={"question": "학생회관에 자전거 몇 대 있어?"}, allow_redirects=False)
+    assert res.status_code == 302, res.status_code
+
+  results = {}
+  with mock.patch("builtins.print"):
+    ask()
+    # 조회+문장 생성을 통째로 루프백 HTTP 로 대신한다.
+    with mock.patch.object(service, "lookup_available_bikes", legacy_fetch), \
+         mock.patch.object(service, "stream_sentence", lambda data: iter([data["content"]])):
+      ask()
+      results["before_loopback"] = summarize(timeit(ask, args.n))
+    results["after_in_process"] = summarize(timeit(ask, args.n))
+
+  server.shutdown()
+  print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,66 @@
+"""
+스트리밍 채팅 TTFB 비교 (LLM 은 게이트웨이 mock 백엔드)
+
+form   : POST /menu1/        -> 두 번의 LLM 호출이 끝나야 302 가 온다
+stream : POST /menu1/stream  -> 첫 이벤트(상태/토큰)까지의 시간과 전체 시간
+
+사용법:
+  python -m benchmarks.chat_stream [-n 20] [--llm-ms 400]
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from unittest import mock
+
+import requests
+from werkzeug.serving import make_server
+
+from .common import make_app, summarize
+
+QUESTIONS = ["학생회관에 자전거 몇 대 있어?", "안녕하세요, 오늘 날씨 어때?"]
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("-n", type=int, default=20)
+  parser.add_argument("--llm-ms", type=float, default=400.0)
+  args = parser.parse_args()
+
+  logging.getLogger("werkzeug").setLevel(logging.ERROR)
+  app = make_app(LLM_BACKEND="mock", LLM_MOCK_LATENCY_MS=args.llm_ms, SENTENCE_CACHE_SIZE=0)
+  server = make_server("127.0.0.1", 0, app, threaded=True)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  base = f"http://127.0.0.1:{server.server_port}"
+  sess = requests.Session()
+
+  results = {}
+  with mock.patch("builtins.print"):
+    for q in QUESTIONS:
+      form, ttfb, total = [], [], []
+      for _ in range(args.n):
+        t0 = time.perf_counter()
+        sess.post(f"{base}/menu1/", data={"question": q}, allow_redirects=False)
+        form.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        with sess.post(f"{base}/menu1/stream", data={"question": q}, stream=True) as res:
+          first = None
+          for line in res.iter_lines():
+            if first is None and line.startswith(b"event:"):
+              first = (time.perf_counter() - t0) * 1000
+        ttfb.append(first)
+        total.append((time.perf_counter() - t0) * 1000)
+      results[q] = {
+        "form_total": summarize(form),
+        "stream_first_event": summarize(ttfb),
+        "stream_total": summarize(total),
+      }
+
+  server.shutdown()
+  print(json.dumps({"llm_ms": args.llm_ms, "results": results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,64 @@
+"""
+벤치마크 공용 도구: 임시 DB 로 앱을 만들고, 지연시간 통계를 낸다.
+"""
+import os
+import statistics
+import tempfile
+import time
+
+from PoringAI import create_app
+from PoringAI.db import get_db, init_db
+
+HUBS = [
+  ("무은재기념관", 36.0107, 129.3216), ("학생회관", 36.0125, 129.3228),
+  ("환경공학동", 36.0113, 129.3245), ("생활관21동", 36.0158, 129.3225),
+  ("생활관3동", 36.0146, 129.3252), ("생활관12동", 36.0165, 129.3262),
+  ("생활관15동", 36.0171, 129.3241), ("박태준학술정보관", 36.0098, 129.3233),
+  ("친환경소재대학원", 36.0083, 129.3260), ("제1실험동", 36.0131, 129.3281),
+  ("기계실험동", 36.0121, 129.3296), ("가속기IBS", 36.0075, 129.3300),
+]
+
+
+def make_app(n_bikes=200, capacity=20, **config):
+  """임시 디렉터리에 정식 스키마(schema.sql)로 허브/자전거가 채워진 DB 를 만들고 앱을 돌려준다."""
+  tmp = tempfile.mkdtemp(prefix="poring-bench-")
+  cfg = {"TESTING": True, "DATABASE": os.path.join(tmp, "bench.db")}
+  cfg.update(config)
+  app = create_app(cfg)
+
+  with app.app_context():
+    init_db()
+    db = get_db()
+    db.executemany(
+      "INSERT INTO hub (hub_id, name, lat, lng, capacity) VALUES (?, ?, ?, ?, ?)",
+      [(i + 1, *h, capacity) for i, h in enumerate(HUBS)],
+    )
+    db.executemany(
+      "INSERT INTO bike (bike_id, current_hub_id, lock_state, is_available) VALUES (?, ?, 'locked', 1)",
+      [(b + 1, b % len(HUBS) + 1) for b in range(n_bikes)],
+    )
+    db.commit()
+  return app
+
+
+def timeit(fn, n):
+  """fn 을 n 번 실행한 지연시간(ms) 목록"""
+  out = []
+  for _ in range(n):
+    t0 = time.perf_counter()
+    fn()
+    out.append((time.perf_counter() - t0) * 1000)
+  return out
+
+
+def summarize(samples):
+  samples = sorted(samples)
+  def pct(p):
+    return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+  return {
+    "n": len(samples),
+    "mean_ms": round(statistics.fmean(samples), 3),
+    "p50_ms": round(pct(50), 3),
+    "p95_ms": round(pct(95), 3),
+    "p99_ms": round(pct(99), 3),
+  }
@@ -0,0 +1,73 @@
+"""
+대화 문맥 크기: 최근 16개 그대로 vs context 토큰 예산 + 롤링 요약
+
+말이 긴 대화를 --turns 턴 이어 가면서 턴마다 첫 LLM 호출에 들어갈 프롬프트 토큰(도구 정의 포함)을 센다.
+- last16  : user-019 이전처럼 최근 16개 메시지 + 질문
+- budget  : context.build (예산 CHAT_CONTEXT_TOKENS, 넘치는 턴은 요약, 오래된 도구 답은 제외)
+요약은 mock 백엔드가 만든다. 턴 사이에 --gap 초가 흐른 것으로 친다.
+
+사용법:
+  python -m benchmarks.context_budget [--turns 40] [--budget 1500] [--gap 30]
+"""
+import argparse
+import json
+import random
+from collections import deque
+
+from PoringAI import context, tool_schema
+from .common import HUBS, make_app, summarize, timeit
+
+
+def _answer(i):
+  if i % 3 == 0:
+    hub = HUBS[i % len(HUBS)][0]
+    return f"{hub}에 이용 가능한 자전거가 {random.randint(0, 9)}대 있어요.", True
+  return "네, " + " ".join(random.choice(["캠퍼스", "자전거", "대여", "반납", "허브", "시간", "요금", "안내"])
+                          for _ in range(random.randint(40, 120))), False
+
+
+def _prompt_tokens(messages, tools):
+  return (context.REPLY_OVERHEAD + context.tools_tokens(tools)
+          + sum(context.MESSAGE_OVERHEAD + context.count_tokens(m["content"]) for m in messages))
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--turns", type=int, default=40)
+  parser.add_argument("--budget", type=int, default=1500)
+  parser.add_argument("--gap", type=float, default=30.0, help="턴 사이 시간(초)")
+  args = parser.parse_args()
+  random.seed(0)
+
+  app = make_app(n_bikes=50, LLM_BACKEND="mock", CHAT_CONTEXT_TOKENS=args.budget)
+  with app.app_context():
+    tools = tool_schema.get_tools()
+    builder = context.get_builder()
+    history = deque(maxlen=16)   # chat_history 의 기본 CHAT_HISTORY_MAX_MSGS
+    now = 1_000_000.0
+    old, new, lat = [], [], []
+    for i in range(args.turns):
+      question = f"{HUBS[i % len(HUBS)][0]} 근처에서 " + "자전거 " * random.randint(5, 30) + "어떻게 해요?"
+      last16 = [{"role": m["role"], "content": m["content"]} for m in history] + [{"role": "user", "content": question}]
+      messages = builder.build(question, list(history), tools, "bench", now=now)
+      old.append(_prompt_tokens(last16, tools))
+      new.append(_prompt_tokens(messages, tools))
+      lat += timeit(lambda: builder.build(question, list(history), tools, None, now=now), 20)
+      builder._executor.submit(lambda: None).result()   # 요약 갱신이 끝나고 다음 턴으로
+
+      answer, tool = _answer(i)
+      history.append({"role": "user", "content": question, "ts": now})
+      history.append({"role": "system", "content": answer, "ts": now, "tool": tool})
+      now += args.gap
+
+    print(json.dumps({
+      "tools_tokens": context.tools_tokens(tools),
+      "last16_tokens": {"mean": round(sum(old) / len(old)), "max": max(old)},
+      "budget_tokens": {"mean": round(sum(new) / len(new)), "max": max(new)},
+      "build": summarize(lat),
+      "summary_refreshes": builder.refreshes,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,128 @@
+"""
+로컬 OpenAI 호환 서버 (부하 테스트용 LLM 대역)
+
+POST /v1/chat/completions 를 OpenAI 응답 모양(JSON, stream=true 면 SSE 청크 + [DONE])으로 돌려준다.
+무엇을 답할지는 llm.MockBackend 와 같다. (질문의 허브 이름/“근처” -> tool_calls, role=tool -> 요약, 문장 프롬프트 -> 문장)
+앱은 LLM_BACKEND=openai + OPENAI_BASE_URL 로 이 서버를 가리키므로, 실제 클라이언트/HTTP/재시도 경로를 그대로 탄다.
+
+- latency_ms : 첫 바이트까지 지연
+- token_ms   : 스트리밍 청크 사이 지연
+- tools      : auto (MockBackend 처럼 도구를 고름) | none (도구를 고르지 않고 일반 답변)
+- error_rate : 이 비율로 500 (게이트웨이 재시도 확인용)
+GET /stats 는 받은 요청 수.
+
+사용법 (따로 띄울 때):
+  python -m benchmarks.fake_openai [--port 8099] [--latency-ms 300] [--token-ms 20] [--tools auto]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+
+from PoringAI.context import count_tokens
+from PoringAI.llm import MockBackend
+
+
+def _message(msg):
+  out = {"role": "assistant", "content": msg.content}
+  if msg.tool_calls:
+    out["tool_calls"] = [
+      {"id": c.id, "type": "function", "function": {"name": c.function.name, "arguments": c.function.arguments}}
+      for c in msg.tool_calls
+    ]
+  return out
+
+
+def create_server_app(latency_ms=0.0, token_ms=0.0, tools="auto", error_rate=0.0, chunk_chars=4):
+  app = Flask(__name__)
+  backend = MockBackend()
+  lock = threading.Lock()
+  stats = {"requests": 0, "streams": 0, "tool_calls": 0, "errors": 0}
+
+  def count(key, n=1):
+    with lock:
+      stats[key] += n
+
+  @app.post("/v1/chat/completions")
+  def completions():
+    body = request.get_json()
+    count("requests")
+    if error_rate and random.random() < error_rate:
+      count("errors")
+      return jsonify({"error": {"message": "fake overload", "type": "server_error"}}), 500
+    if latency_ms:
+      time.sleep(latency_ms / 1000)
+
+    resp = backend._complete(None, body["messages"], body.get("tools") if tools == "auto" else None)
+    msg = resp.choices[0].message
+    if msg.tool_calls:
+      count("tool_calls", len(msg.tool_calls))
+    finish = resp.choices[0].finish_reason
+    base = {"id": f"chatcmpl-fake-{stats['requests']}", "created": int(time.time()), "model": body.get("model")}
+
+    if not body.get("stream"):
+      prompt = sum(count_tokens(m.get("content") or "") for m in body["messages"])
+      completion = count_tokens(msg.content or "")
+      return jsonify({
+        **base, "object": "chat.completion",
+        "choices": [{"index": 0, "message": _message(msg), "finish_reason": finish}],
+        "usage": {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion},
+      })
+
+    count("streams")
+
+    def chunk(delta, finish_reason=None):
+      payload = {**base, "object": "chat.completion.chunk",
+                 "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+      return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    def generate():
+      yield chunk({"role": "assistant", "content": ""})
+      if msg.tool_calls:
+        yield chunk({"tool_calls": [dict(c, index=i) for i, c in enumerate(_message(msg)["tool_calls"])]})
+      else:
+        text = msg.content or ""
+        for i in range(0, len(text), chunk_chars):
+          if token_ms and i:
+            time.sleep(token_ms / 1000)
+          yield chunk({"content": text[i:i + chunk_chars]})
+      yield chunk({}, finish)
+      yield "data: [DONE]\n\n"
+
+    return Response(generate(), mimetype="text/event-stream")
+
+  @app.get("/stats")
+  def server_stats():
+    with lock:
+      return jsonify(stats)
+
+  return app
+
+
+def serve(port=0, **options):
+  """백그라운드 스레드로 띄우고 (server, base_url) 를 돌려준다. base_url 은 OPENAI_BASE_URL 에 그대로."""
+  server = make_server("127.0.0.1", port, create_server_app(**options), threaded=True)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  return server, f"http://127.0.0.1:{server.server_port}/v1"
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--port", type=int, default=8099)
+  parser.add_argument("--latency-ms", type=float, default=300.0)
+  parser.add_argument("--token-ms", type=float, default=20.0)
+  parser.add_argument("--tools", choices=("auto", "none"), default="auto")
+  parser.add_argument("--error-rate", type=float, default=0.0)
+  args = parser.parse_args()
+  server = make_server("127.0.0.1", args.port, create_server_app(
+    latency_ms=args.latency_ms, token_ms=args.token_ms, tools=args.tools, error_rate=args.error_rate), threaded=True)
+  print(f"OPENAI_BASE_URL=http://127.0.0.1:{args.port}/v1")
+  server.serve_forever()
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,79 @@
+"""
+수요 예측: 미리 만든 hub_forecast 조회 vs 조회할 때마다 이력에서 집계
+
+seed-db 로 --rides 건을 만든 DB 에서
+- fit    : forecast.fit (최근 FORECAST_WEEKS 주 읽기 + NumPy 집계 + 테이블 쓰기)
+- lookup : service.lookup_bike_forecast 한 건 (PK 조회)
+- live   : 같은 허브/요일·시각의 최근 주 평균 대여·반납 수를 SQL 로 바로 세기 (예측 테이블이 없을 때의 기준)
+
+사용법:
+  python -m benchmarks.forecast [--rides 2000000] [--n 2000]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from PoringAI import create_app, forecast, seed, service, spatial
+from PoringAI.db import get_db
+from .common import summarize, timeit
+
+# 요일(strftime %w, 일=0)과 시각이 같은 최근 weeks 주의 대여/반납 수
+LIVE_SQL = '''
+    SELECT
+      (SELECT COUNT(*) FROM ride
+        WHERE start_hub_id = :hub AND start_at >= :since
+          AND strftime('%w %H', start_at, :offset) = :slot) * 1.0 / :weeks,
+      (SELECT COUNT(*) FROM ride
+        WHERE end_hub_id = :hub AND end_at >= :since
+          AND strftime('%w %H', end_at, :offset) = :slot) * 1.0 / :weeks
+    '''
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--rides", type=int, default=2_000_000)
+  parser.add_argument("--bikes", type=int, default=10000)
+  parser.add_argument("--hubs", type=int, default=60)
+  parser.add_argument("--n", type=int, default=2000, help="lookup 반복 수 (live 는 1/100)")
+  args = parser.parse_args()
+  rng = random.Random(0)
+
+  tmp = tempfile.mkdtemp(prefix="poring-bench-")
+  app = create_app({"TESTING": True, "DATABASE": os.path.join(tmp, "bench.db")})
+  with app.app_context():
+    seed.seed(app.config["DATABASE"], hubs=args.hubs, bikes=args.bikes, users=args.bikes * 2, rides=args.rides,
+              points=0, lock_rate=0.0, echo=lambda *_: None)
+    fit = forecast.fit()
+
+    names = list(spatial.get_index().by_name)
+    queries = [(rng.choice(names), f"{rng.randrange(24):02d}:00", rng.randrange(3)) for _ in range(args.n)]
+    it = iter(queries)
+    lookup = summarize(timeit(lambda: service.lookup_bike_forecast(*next(it)), args.n))
+
+    db = get_db()
+    weeks = app.config["FORECAST_WEEKS"]
+    offset = f"+{app.config['PRICING_UTC_OFFSET_S'] // 3600} hours"
+    since = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - weeks * 7 * 86400))
+    it = iter(queries)
+
+    def live():
+      name, at, _ = next(it)
+      slot = f"{rng.randrange(7)} {at[:2]}"
+      db.execute(LIVE_SQL, {"hub": spatial.get_index().by_name[name].hub_id, "since": since,
+                            "offset": offset, "slot": slot, "weeks": weeks}).fetchone()
+    live_ms = summarize(timeit(live, max(1, args.n // 100)))
+
+  print(json.dumps({
+    "rides": args.rides,
+    "fit": fit,
+    "lookup": lookup,
+    "live": live_ms,
+    "speedup_p50": round(live_ms["p50_ms"] / lookup["p50_ms"]) if lookup["p50_ms"] else None,
+  }, indent=2))
+
+
+if __name__ == "__main__":
+  main()
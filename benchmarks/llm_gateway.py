@@ -0,0 +1,42 @@
+"""
+LLM 게이트웨이 처리량 (mock 백엔드, 네트워크 없음)
+
+동시 스레드 수를 바꿔가며 초당 호출 수를 잰다.
+LLM_MAX_CONCURRENCY 가 상한이 되는지 확인하는 용도.
+
+사용법:
+  python -m benchmarks.llm_gateway [--calls 400] [--llm-ms 50] [--cap 8]
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PoringAI import llm
+from .common import make_app
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--calls", type=int, default=400)
+  parser.add_argument("--llm-ms", type=float, default=50.0)
+  parser.add_argument("--cap", type=int, default=8, help="LLM_MAX_CONCURRENCY")
+  args = parser.parse_args()
+
+  app = make_app(LLM_BACKEND="mock", LLM_MOCK_LATENCY_MS=args.llm_ms, LLM_MAX_CONCURRENCY=args.cap)
+  gw = llm.get_gateway(app)
+  messages = [{"role": "user", "content": "허브이름 : 학생회관, 자전거 개수 : 3"}]
+
+  results = []
+  for threads in (1, 4, args.cap, args.cap * 4):
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+      list(pool.map(lambda _: gw.chat(messages), range(args.calls)))
+    elapsed = time.perf_counter() - t0
+    results.append({"threads": threads, "calls": args.calls, "rps": round(args.calls / elapsed, 1)})
+
+  print(json.dumps({"llm_ms": args.llm_ms, "cap": args.cap, "runs": results}, indent=2))
+
+
+if __name__ == "__main__":
+  main()
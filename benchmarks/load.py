@@ -0,0 +1,310 @@
+"""
+오프라인 부하 테스트: 앱 + 로컬 OpenAI 대역(fake_openai)을 띄우고 가상 사용자들이 시나리오를 돌린다.
+
+앱과 대역은 각각 자식 프로세스(werkzeug threaded)로 뜨고, 앱은 LLM_BACKEND=openai 로 대역을 부른다.
+(OPENAI_MOCK 과 달리 DB 조회, 도구 호출, 실제 OpenAI 클라이언트/HTTP 경로를 모두 탄다)
+가상 사용자마다 스레드 하나, requests 세션 하나(쿠키 = 대화 기록), 자기 자전거 몇 대.
+
+시나리오 (--mix 로 비율 조정)
+- chat        : POST /menu1/ (허브 이름 / “근처” / 일반 대화 질문)
+- chat_stream : POST /menu1/stream (SSE 를 끝까지 읽음)
+- nearby      : GET /api/available-nearby-bikes
+- map         : GET /api/hub-occupancy
+- ride        : /api/rent -> /api/lock-temporary -> /api/lock-transferable -> /api/zone-return
+
+결과는 엔드포인트별 요청 수/오류/초당 요청/p50·p95·p99 JSON. --out 으로 저장하고,
+--compare 로 이전 결과와 비교하면 p95 가 --tolerance 보다 느려지거나 처리량이 그만큼 줄어든 엔드포인트를
+regressions 에 적고 종료 코드 1 로 끝난다.
+
+사용법:
+  python -m benchmarks.load [--users 16] [--seconds 20] [--llm-ms 300] [--token-ms 20]
+                            [--mix chat=3,chat_stream=2,nearby=2,map=2,ride=1]
+                            [--out load.json] [--compare base.json] [--tolerance 0.15]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from .common import HUBS, make_app, summarize
+
+BIKES_PER_USER = 4
+DEFAULT_MIX = "chat=3,chat_stream=2,nearby=2,map=2,ride=1"
+
+
+# ----- 서버 프로세스 -----
+
+def _serve_fake(ready, options):
+  from . import fake_openai
+  logging.getLogger("werkzeug").setLevel(logging.ERROR)
+  server, base_url = fake_openai.serve(**options)
+  ready.put(base_url)
+  threading.Event().wait()
+
+
+def _serve_app(ready, users, base_url, config):
+  from werkzeug.serving import make_server
+  from PoringAI import db as dbmod
+  logging.getLogger("werkzeug").setLevel(logging.ERROR)
+  logging.getLogger("PoringAI.events").setLevel(logging.WARNING)
+  os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+
+  # capacity 0: 허브가 늘 꽉 찬 것으로 보여서 존 반납이 항상 된다
+  app = make_app(n_bikes=users * BIKES_PER_USER, capacity=0,
+                 LLM_BACKEND="openai", OPENAI_BASE_URL=base_url, **config)
+  with app.app_context():
+    db = dbmod.get_writer()
+    db.executemany("INSERT INTO user (user_id, name) VALUES (?, ?)", [(u, f"load{u}") for u in range(1, users + 1)])
+    db.commit()
+  server = make_server("127.0.0.1", 0, app, threaded=True)
+  ready.put(f"http://127.0.0.1:{server.server_port}")
+  server.serve_forever()
+
+
+def start_servers(users, llm_ms, token_ms, tools, error_rate, config):
+  ctx = multiprocessing.get_context("spawn")
+  ready = ctx.Queue()
+  fake = ctx.Process(target=_serve_fake, daemon=True, args=(ready, {
+    "latency_ms": llm_ms, "token_ms": token_ms, "tools": tools, "error_rate": error_rate}))
+  fake.start()
+  base_url = ready.get(timeout=60)
+  app = ctx.Process(target=_serve_app, daemon=True, args=(ready, users, base_url, config))
+  app.start()
+  target = ready.get(timeout=60)
+  return target, base_url, (fake, app)
+
+
+# ----- 시나리오 -----
+
+class User:
+  def __init__(self, user_id, target, seed):
+    self.user_id = user_id
+    self.target = target
+    self.rng = random.Random(seed)
+    self.session = requests.Session()
+    first = (user_id - 1) * BIKES_PER_USER + 1
+    self.bikes = list(range(first, first + BIKES_PER_USER))
+
+  def question(self):
+    hub = self.rng.choice(HUBS)[0]
+    return self.rng.choice((
+      f"{hub}에 자전거 있어?",
+      f"{hub}이랑 {self.rng.choice(HUBS)[0]} 자전거 몇 대야?",
+      "내 근처에 자전거 있어?",
+      "자전거 대여는 어떻게 해?",
+    ))
+
+  def coords(self):
+    _, lat, lon = self.rng.choice(HUBS)
+    return lat + self.rng.uniform(-0.001, 0.001), lon + self.rng.uniform(-0.001, 0.001)
+
+
+def _chat(user, call):
+  lat, lon = user.coords()
+  call("chat", "post", "/menu1/", ok=(302,), allow_redirects=False,
+       data={"question": user.question(), "latitude": lat, "longitude": lon})
+
+
+def _chat_stream(user, call):
+  lat, lon = user.coords()
+  call("chat_stream", "post", "/menu1/stream", stream_until=b"event: done",
+       data={"question": user.question(), "latitude": lat, "longitude": lon})
+
+
+def _nearby(user, call):
+  lat, lon = user.coords()
+  call("nearby", "get", "/api/available-nearby-bikes", params={"lat": lat, "lon": lon})
+
+
+def _map(user, call):
+  call("map", "get", "/api/hub-occupancy")
+
+
+def _ride(user, call):
+  bike = {"user_id": user.user_id, "bike_id": user.rng.choice(user.bikes)}
+  if not call("rent", "post", "/api/rent", ok=(201,), json=bike):
+    return
+  lat, lon = user.coords()
+  call("lock_temporary", "post", "/api/lock-temporary", json=dict(bike, lat=lat, lng=lon))
+  call("lock_transferable", "post", "/api/lock-transferable", json=bike)
+  call("zone_return", "post", "/api/zone-return", json=dict(bike, hub_id=1, lat=lat, lng=lon))
+
+
+SCENARIOS = {
+  "chat": _chat,
+  "chat_stream": _chat_stream,
+  "nearby": _nearby,
+  "map": _map,
+  "ride": _ride,
+}
+
+
+def parse_mix(text):
+  mix = {}
+  for part in text.split(","):
+    name, _, weight = part.partition("=")
+    if name.strip() not in SCENARIOS:
+      raise SystemExit(f"unknown scenario: {name} (choose from {', '.join(SCENARIOS)})")
+    mix[name.strip()] = float(weight or 1)
+  return mix
+
+
+# ----- 부하 -----
+
+class Recorder:
+  def __init__(self):
+    self.samples = {}   # endpoint -> [ms]
+    self.errors = {}
+    self._lock = threading.Lock()
+    self.on = False     # warmup 동안은 기록하지 않는다
+
+  def add(self, endpoint, ms, ok):
+    if not self.on:
+      return
+    with self._lock:
+      self.samples.setdefault(endpoint, []).append(ms)
+      if not ok:
+        self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+def _caller(user, rec, timeout):
+  def call(endpoint, method, path, ok=(200,), stream_until=None, **kwargs):
+    t0 = time.perf_counter()
+    try:
+      if stream_until is None:
+        res = user.session.request(method, user.target + path, timeout=timeout, **kwargs)
+        good = res.status_code in ok
+      else:
+        with user.session.request(method, user.target + path, timeout=timeout, stream=True, **kwargs) as res:
+          good = res.status_code in ok and any(line.startswith(stream_until) for line in res.iter_lines())
+    except requests.RequestException:
+      good = False
+    rec.add(endpoint, (time.perf_counter() - t0) * 1000, good)
+    return good
+  return call
+
+
+def run_load(target, users, seconds, warmup, mix, seed=0, timeout=30.0):
+  rec = Recorder()
+  names, weights = list(mix), list(mix.values())
+  stop = threading.Event()
+
+  def worker(user):
+    call = _caller(user, rec, timeout)
+    while not stop.is_set():
+      SCENARIOS[user.rng.choices(names, weights)[0]](user, call)
+
+  threads = [threading.Thread(target=worker, args=(User(u, target, seed + u),), daemon=True)
+             for u in range(1, users + 1)]
+  for t in threads:
+    t.start()
+  time.sleep(warmup)
+  rec.on = True
+  t0 = time.perf_counter()
+  time.sleep(seconds)
+  rec.on = False
+  elapsed = time.perf_counter() - t0
+  stop.set()
+  for t in threads:
+    t.join(timeout + 1)
+
+  endpoints = {}
+  for name, samples in sorted(rec.samples.items()):
+    endpoints[name] = {
+      **summarize(samples),
+      "errors": rec.errors.get(name, 0),
+      "rps": round(len(samples) / elapsed, 2),
+    }
+  total = sum(len(s) for s in rec.samples.values())
+  return {"elapsed_s": round(elapsed, 2), "total_rps": round(total / elapsed, 2), "endpoints": endpoints}
+
+
+def compare(current, baseline, tolerance):
+  """엔드포인트별 p95/rps 변화. tolerance 를 넘게 나빠진 것만 regressions 에."""
+  rows, regressions = {}, []
+  for name, cur in current["endpoints"].items():
+    base = baseline.get("endpoints", {}).get(name)
+    if not base:
+      continue
+    p95 = cur["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+    rps = cur["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+    rows[name] = {"p95_change": round(p95, 3), "rps_change": round(rps, 3)}
+    if p95 > tolerance or rps < -tolerance:
+      regressions.append(name)
+  return {"baseline": baseline.get("meta", {}).get("commit"), "tolerance": tolerance,
+          "endpoints": rows, "regressions": regressions}
+
+
+def _commit():
+  try:
+    return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                          timeout=10, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+  except (OSError, subprocess.SubprocessError):
+    return None
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--users", type=int, default=16)
+  parser.add_argument("--seconds", type=float, default=20.0)
+  parser.add_argument("--warmup", type=float, default=3.0)
+  parser.add_argument("--mix", default=DEFAULT_MIX)
+  parser.add_argument("--llm-ms", type=float, default=300.0, help="대역의 첫 바이트 지연")
+  parser.add_argument("--token-ms", type=float, default=20.0, help="대역의 스트리밍 청크 간격")
+  parser.add_argument("--tools", choices=("auto", "none"), default="auto")
+  parser.add_argument("--error-rate", type=float, default=0.0)
+  parser.add_argument("--metrics", action="store_true", help="앱을 METRICS_ENABLED 로 띄운다")
+  parser.add_argument("--target", help="이미 떠 있는 앱 주소 (이때는 서버를 띄우지 않는다)")
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--out")
+  parser.add_argument("--compare")
+  parser.add_argument("--tolerance", type=float, default=0.15)
+  args = parser.parse_args()
+  mix = parse_mix(args.mix)
+
+  procs = ()
+  if args.target:
+    target = args.target.rstrip("/")
+  else:
+    target, _, procs = start_servers(args.users, args.llm_ms, args.token_ms, args.tools, args.error_rate,
+                                     {"METRICS_ENABLED": args.metrics})
+  try:
+    result = run_load(target, args.users, args.seconds, args.warmup, mix, args.seed)
+  finally:
+    for p in procs:
+      p.terminate()
+
+  result = {
+    "meta": {
+      "commit": _commit(),
+      "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+      "python": platform.python_version(),
+      "users": args.users, "seconds": args.seconds, "mix": mix,
+      "llm_ms": args.llm_ms, "token_ms": args.token_ms, "tools": args.tools, "error_rate": args.error_rate,
+      "target": args.target or "local",
+    },
+    **result,
+  }
+  if args.compare:
+    with open(args.compare) as f:
+      result["compare"] = compare(result, json.load(f), args.tolerance)
+  if args.out:
+    with open(args.out, "w") as f:
+      json.dump(result, f, indent=2, ensure_ascii=False)
+  print(json.dumps(result, indent=2, ensure_ascii=False))
+  if result.get("compare", {}).get("regressions"):
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,86 @@
+"""
+로컬 허브 라우터(gazetteer) 적중률과 아낀 지연시간
+
+같은 질문 세트를 라우터 켠 앱/끈 앱에서 chat.answer 로 돌려 비교한다.
+LLM 은 mock 백엔드(호출당 --llm-ms), 문장 캐시는 꺼 둔다.
+mock 은 별칭/초성을 모르므로 라우터를 끄면 그런 질문은 tool 없이 바로 답해 버린다.
+그래서 실측 차이(saved_ms_measured)는 실제보다 작게 나오고,
+saved_ms_estimated(해결 수 x tool 선택 호출 평균)가 실제 절감에 가깝다.
+
+사용법:
+  python -m benchmarks.local_router [--llm-ms 300]
+"""
+import argparse
+import json
+import time
+from unittest import mock
+
+from PoringAI import chat, gazetteer
+from .common import make_app
+
+QUESTIONS = [
+  "학생회관에 자전거 몇 대 있어?",
+  "학생 회관 자전거 남았어?",
+  "학관 자전거 있나",
+  "ㅎㅅㅎㄱ 자전거 몇대",
+  "생활관21동 자전거 몇 대야",
+  "21동에 자전거 있어?",
+  "RC 3 자전거 빌릴 수 있어?",
+  "생활관 12동 대여 가능한 자전거",
+  "생활관15동 자전거 재고",
+  "도서관 앞에 자전거 있어?",
+  "박태준학술정보관 자전거 몇 대",
+  "무은재 자전거 남아있어?",
+  "무은재기념관 자전거 몇 대 있어요",
+  "환공 자전거 있니",
+  "친환경소재대학원 자전거 대수",
+  "제1실험동 자전거 몇 대?",
+  "기계동 자전거 있어?",
+  "가속기 자전거 있나요",
+  "내 근처에 자전거 있어?",
+  "주변에 빌릴 자전거 있나",
+  "가까운 곳에 자전거 몇 대 있어?",
+  "여기 자전거 있어?",
+  "학생회관이랑 생활관21동 자전거 몇 대?",
+  "학생회관 6시에 자전거 있을까?",
+  "학생회관 어디야?",
+  "자전거 반납은 어떻게 해?",
+  "안녕!",
+  "요금이 얼마야?",
+  "오늘 날씨 어때?",
+  "생활관 지역 자전거 많은 곳 알려줘",
+]
+
+
+def run(app):
+  with app.test_request_context(), mock.patch("builtins.print"):
+    t0 = time.perf_counter()
+    for q in QUESTIONS:
+      chat.answer(q, 36.0125, 129.3228)
+    elapsed = (time.perf_counter() - t0) * 1000
+    return elapsed, gazetteer.get_stats().stats()
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--llm-ms", type=float, default=300.0)
+  args = parser.parse_args()
+
+  cfg = dict(LLM_BACKEND="mock", LLM_MOCK_LATENCY_MS=args.llm_ms, SENTENCE_CACHE_SIZE=0)
+  off_ms, _ = run(make_app(CHAT_LOCAL_ROUTER=False, **cfg))
+  on_ms, stats = run(make_app(CHAT_LOCAL_ROUTER=True, **cfg))
+
+  print(json.dumps({
+    "questions": len(QUESTIONS),
+    "llm_ms": args.llm_ms,
+    "router": stats,
+    "total_ms_router_off": round(off_ms, 1),
+    "total_ms_router_on": round(on_ms, 1),
+    "saved_ms_measured": round(off_ms - on_ms, 1),
+    # 라우터가 푼 질문 수 x tool 선택 호출 평균 지연
+    "saved_ms_estimated": round(stats["resolved"] * stats["tool_selection_llm_ms_avg"], 1),
+  }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+  main()
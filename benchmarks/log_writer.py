@@ -0,0 +1,86 @@
+"""
+로그 테이블 쓰기: 요청마다 커밋 vs 로그 큐(group commit)
+
+여러 스레드가 bike_location_log 에 한 줄씩 넣는다.
+- per_row : 요청마다 get_writer() -> INSERT -> commit  (예전 방식)
+- queued  : log_writer.append() 만 하고 바로 반환, 마지막에 flush
+- durable : append(durable=True) 로 커밋 ack 까지 기다림
+
+사용법:
+  python -m benchmarks.log_writer [--threads 8] [--rows 2000] [--synchronous FULL]
+"""
+import argparse
+import json
+import threading
+import time
+
+from PoringAI import db as dbmod, log_writer
+from .common import make_app, summarize
+
+def per_row(bike_id):
+  db = dbmod.get_writer()
+  db.execute("INSERT INTO bike_location_log (bike_id, lat, lng) VALUES (?, ?, ?)", (bike_id, 36.01, 129.32))
+  db.commit()
+
+
+def queued(bike_id):
+  log_writer.append("bike_location_log", bike_id=bike_id, lat=36.01, lng=129.32)
+
+
+def durable(bike_id):
+  log_writer.append("bike_location_log", durable=True, bike_id=bike_id, lat=36.01, lng=129.32)
+
+
+def run(name, fn, threads, rows, synchronous):
+  app = make_app(n_bikes=10, DB_SYNCHRONOUS=synchronous)
+
+  lat, lock = [], threading.Lock()
+
+  def worker(t):
+    mine = []
+    for i in range(rows):
+      t0 = time.perf_counter()
+      with app.app_context():
+        fn(t * rows + i)
+      mine.append((time.perf_counter() - t0) * 1000)
+    with lock:
+      lat.extend(mine)
+
+  t0 = time.perf_counter()
+  ts = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+  for t in ts:
+    t.start()
+  for t in ts:
+    t.join()
+  writer = log_writer.get_log_writer(app)
+  writer.flush(timeout=60)
+  elapsed = time.perf_counter() - t0
+
+  with app.app_context():
+    stored = dbmod.get_db().execute("SELECT COUNT(*) FROM bike_location_log").fetchone()[0]
+  writer.close()
+  return {
+    "mode": name,
+    "rows_per_s": round(threads * rows / elapsed, 1),
+    "call": summarize(lat),
+    "stored": stored,
+    "expected": threads * rows,
+    "writer": writer.stats(),
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--threads", type=int, default=8)
+  parser.add_argument("--rows", type=int, default=2000)
+  parser.add_argument("--synchronous", default="NORMAL", help="FULL 이면 커밋마다 fsync")
+  args = parser.parse_args()
+  results = [
+    run(name, fn, args.threads, args.rows, args.synchronous)
+    for name, fn in (("per_row", per_row), ("queued", queued), ("durable", durable))
+  ]
+  print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+  main()
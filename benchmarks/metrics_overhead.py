@@ -0,0 +1,68 @@
+"""
+metrics 비용: METRICS_ENABLED 꺼짐 vs 켜짐
+
+- available : GET /api/available-bikes (DB 조회 + 캐시된 문장)
+- occupancy : GET /api/hub-occupancy (허브 전체)
+- chat      : POST /menu1/ (mock LLM, 도구 두 개)
+켜진 쪽은 요청 로그(JSON)를 /dev/null 로 보낸다. 꺼진 상태의 span() 한 번 비용도 잰다.
+
+사용법:
+  python -m benchmarks.metrics_overhead [-n 500]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+from PoringAI import metrics
+from .common import make_app, summarize, timeit
+
+CASES = {
+  "available": lambda c: c.get("/api/available-bikes?hub_name=학생회관"),
+  "occupancy": lambda c: c.get("/api/hub-occupancy"),
+  "chat": lambda c: c.post("/menu1/", data={"question": "학생회관이랑 무은재기념관 자전거 있어?"}),
+}
+
+
+def _run(enabled, n):
+  app = make_app(n_bikes=200, LLM_BACKEND="mock", METRICS_ENABLED=enabled)
+  client = app.test_client()
+  out = {}
+  for name, call in CASES.items():
+    for _ in range(20):
+      call(client)
+    out[name] = summarize(timeit(lambda: call(client), n))
+  return out
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("-n", type=int, default=500)
+  args = parser.parse_args()
+
+  # init_app 은 핸들러가 이미 있으면 자기 것을 달지 않는다
+  metrics.logger.addHandler(logging.StreamHandler(open(os.devnull, "w")))
+  metrics.logger.propagate = False
+  logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+  off = _run(False, args.n)
+  on = _run(True, args.n)
+
+  loops = 1_000_000
+  t0 = time.perf_counter()
+  for _ in range(loops):
+    with metrics.span("db"):
+      pass
+  span_ns = (time.perf_counter() - t0) / loops * 1e9
+
+  print(json.dumps({
+    "disabled": off,
+    "enabled": on,
+    "p50_overhead_pct": {k: round((on[k]["p50_ms"] / off[k]["p50_ms"] - 1) * 100, 1) for k in CASES},
+    "disabled_span_ns": round(span_ns, 1),
+  }, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,121 @@
+"""
+요금 엔진: 반납 한 건(quote) 지연과 라이딩 이력 배치 재계산(reprice) 처리량
+
+seed-db 로 --rides 건을 만든 DB 에 요금 정책(구역 쌍 x 시간대, 자정을 넘는 야간 할증 포함)과
+허브별 인센티브를 넣고
+- build     : 색인 만들기 (fare / incentive)
+- quote     : Engine.quote 한 건
+- scalar    : Engine.price 를 --scalar 건 반복한 처리량 (배치가 없을 때의 기준)
+- vector    : Engine.price_many 로 전체를 한 번에 (메모리 안 계산만)
+- reprice   : pricing.reprice 전체 (읽기 + 계산 + 바뀐 행 UPDATE)
+scalar 와 vector 의 결과가 같은지도 확인한다.
+
+사용법:
+  python -m benchmarks.pricing [--rides 2000000] [--bikes 10000] [--incentives 200] [--scalar 200000]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from PoringAI import create_app, pricing, seed
+from PoringAI.db import get_db, transaction
+from .common import summarize, timeit
+
+ZONES = seed.ZONES
+BANDS = [("07:00:00", "10:00:00", 80, "discount", 100), ("10:00:00", "17:00:00", 100, None, 0),
+         ("17:00:00", "22:00:00", 110, None, 0), ("22:00:00", "02:00:00", 150, "surcharge", 300)]
+
+
+def _policies(rng, hubs, n_incentives):
+  fares = [("*", "*", "00:00:00", "00:00:00", 120, None, 0)]
+  for o in ZONES:
+    for d in ZONES:
+      for ts, te, per_min, adj_type, adj in BANDS:
+        fares.append((o, d, ts, te, per_min + rng.randrange(-10, 11), adj_type, adj))
+  incentives = []
+  for _ in range(n_incentives):
+    h = rng.randrange(1, hubs + 1)
+    start = rng.randrange(0, 24)
+    incentives.append((h, f"2026-{rng.randrange(1, 10):02d}-01", rng.choice([None, "2026-12-31"]),
+                       f"{start:02d}:00:00", f"{(start + rng.randrange(1, 4)) % 24:02d}:00:00",
+                       rng.choice([200, 300, 500]), "rebalancing"))
+  return fares, incentives
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--rides", type=int, default=2_000_000)
+  parser.add_argument("--bikes", type=int, default=10000)
+  parser.add_argument("--hubs", type=int, default=60)
+  parser.add_argument("--incentives", type=int, default=200)
+  parser.add_argument("--scalar", type=int, default=200_000, help="scalar 기준으로 돌릴 건수")
+  args = parser.parse_args()
+  rng = random.Random(0)
+
+  tmp = tempfile.mkdtemp(prefix="poring-bench-")
+  app = create_app({"TESTING": True, "DATABASE": os.path.join(tmp, "bench.db")})
+  with app.app_context():
+    t0 = time.perf_counter()
+    seed.seed(app.config["DATABASE"], hubs=args.hubs, bikes=args.bikes, users=args.bikes * 2, rides=args.rides,
+              points=0, lock_rate=0.0, echo=lambda *_: None)
+    seeded_s = time.perf_counter() - t0
+
+    fares, incentives = _policies(rng, args.hubs, args.incentives)
+    with transaction() as db:
+      db.executemany("INSERT INTO fare_policy (origin_zone, dest_zone, time_start, time_end, base_per_min, "
+                     "adj_type, adj_amount) VALUES (?, ?, ?, ?, ?, ?, ?)", fares)
+      db.executemany("INSERT INTO incentive_policy (target_hub_id, start_date, end_date, time_start, time_end, "
+                     "amount, policy_type) VALUES (?, ?, ?, ?, ?, ?, ?)", incentives)
+
+    db = get_db()
+    build = {
+      "fares_ms": round(min(timeit(lambda: pricing._load_fares(db), 5)), 3),
+      "incentives_ms": round(min(timeit(lambda: pricing._load_incentives(db), 5)), 3),
+    }
+    engine = pricing.get_engine()
+    quote = summarize(timeit(lambda: engine.quote(5, 1, "2026-03-01 23:00:00", "2026-03-01 23:12:00"), 50000))
+
+    rows = db.execute("SELECT start_hub_id, end_hub_id, start_at, end_at, duration_min FROM ride "
+                      "WHERE end_at IS NOT NULL").fetchall()
+    sh = np.array([r[0] or 0 for r in rows], dtype=np.int64)
+    eh = np.array([r[1] or 0 for r in rows], dtype=np.int64)
+    ss, es = pricing.epochs([r[2] for r in rows]), pricing.epochs([r[3] for r in rows])
+    mins = np.array([r[4] for r in rows], dtype=np.int64)
+
+    t0 = time.perf_counter()
+    fare, inc, fare_id, inc_id = engine.price_many(sh, eh, ss, es, mins)
+    vector_s = time.perf_counter() - t0
+
+    k = min(args.scalar, len(rows))
+    t0 = time.perf_counter()
+    scalar = [engine.price(r[0], r[1], s, e, m) for r, s, e, m in zip(rows[:k], ss[:k].tolist(), es[:k].tolist(),
+                                                                       mins[:k].tolist())]
+    scalar_s = time.perf_counter() - t0
+    mismatches = sum((p.fare_amount, p.incentive_applied) != (f, i)
+                     for p, f, i in zip(scalar, fare[:k].tolist(), inc[:k].tolist()))
+
+    full = pricing.reprice()
+
+  print(json.dumps({
+    "rides": len(rows),
+    "seed_s": round(seeded_s, 1),
+    "fare_policies": len(fares),
+    "incentive_policies": len(incentives),
+    "build": build,
+    "quote": quote,
+    "scalar": {"rides": k, "seconds": round(scalar_s, 3), "rides_per_s": round(k / scalar_s)},
+    "vector": {"rides": len(rows), "seconds": round(vector_s, 3), "rides_per_s": round(len(rows) / vector_s)},
+    "vector_speedup": round((len(rows) / vector_s) / (k / scalar_s), 1),
+    "scalar_vector_mismatches": mismatches,
+    "incentive_share": round(float(inc.mean()), 4),
+    "reprice": full,
+  }, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,96 @@
+"""
+재배치 인센티브: 증분 패스 비용이 이력 크기와 상관없는지
+
+seed-db 로 --rides 건을 만든 DB 에서
+- first      : 처음 패스 (체크포인트 없음, 가장 긴 창 안의 라이딩부터)
+- incremental: 지난 5분 동안 끝난 새 라이딩 --step 건을 넣고 돌리는 패스, --passes 번
+- rescan     : 같은 창의 출발/도착을 라이딩 표 전체에서 다시 세는 쿼리 (체크포인트 없이 매번 다시 셀 때의 기준)
+증분 패스 뒤의 hub_flow 합계가 rescan 결과와 같은지도 확인한다.
+
+사용법:
+  python -m benchmarks.rebalancing [--rides 2000000] [--step 200] [--passes 20]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from PoringAI import create_app, rebalancing, seed
+from PoringAI.db import get_db, transaction
+from .common import summarize
+
+RESCAN_SQL = '''
+    SELECT (SELECT COUNT(*) FROM ride WHERE start_hub_id IS NOT NULL AND start_at >= ?),
+           (SELECT COUNT(*) FROM ride WHERE end_hub_id IS NOT NULL AND end_at >= ?)
+    '''
+
+
+def _ts(seconds):
+  return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds))
+
+
+def _add_rides(rng, now, n, hubs, bikes, users):
+  rows = []
+  for _ in range(n):
+    end = now - rng.randrange(0, 300)
+    minutes = rng.randrange(1, 20)
+    rows.append((rng.randrange(1, users + 1), rng.randrange(1, bikes + 1), rng.randrange(1, hubs + 1),
+                 rng.randrange(1, hubs + 1), _ts(end - minutes * 60), _ts(end), minutes))
+  with transaction() as db:
+    db.executemany("INSERT INTO ride (user_id, bike_id, start_hub_id, end_hub_id, start_at, end_at, duration_min) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--rides", type=int, default=2_000_000)
+  parser.add_argument("--bikes", type=int, default=10000)
+  parser.add_argument("--hubs", type=int, default=60)
+  parser.add_argument("--step", type=int, default=200, help="패스 사이에 들어오는 라이딩 수")
+  parser.add_argument("--passes", type=int, default=20)
+  args = parser.parse_args()
+  rng = random.Random(0)
+
+  tmp = tempfile.mkdtemp(prefix="poring-bench-")
+  app = create_app({"TESTING": True, "DATABASE": os.path.join(tmp, "bench.db")})
+  now = int(time.time()) // 60 * 60
+  with app.app_context():
+    seed.seed(app.config["DATABASE"], hubs=args.hubs, bikes=args.bikes, users=args.bikes * 2, rides=args.rides,
+              points=0, lock_rate=0.0, now=now, echo=lambda *_: None)
+    keep_s = max(app.config["REBALANCE_WINDOWS_S"])
+
+    first = rebalancing.run(now=now)
+    passes, rescans = [], []
+    for _ in range(args.passes):
+      now += 300
+      _add_rides(rng, now, args.step, args.hubs, args.bikes, args.bikes * 2)
+      t0 = time.perf_counter()
+      rebalancing.run(now=now)
+      passes.append((time.perf_counter() - t0) * 1000)
+      t0 = time.perf_counter()
+      get_db().execute(RESCAN_SQL, (_ts(now - keep_s),) * 2).fetchone()
+      rescans.append((time.perf_counter() - t0) * 1000)
+
+    # 창 시작 뒤의 첫 구간부터 비교 (그 앞 구간은 일부만 세었을 수 있다)
+    bucket_s = app.config["REBALANCE_BUCKET_S"]
+    start = -(-(now - keep_s) // bucket_s) * bucket_s
+    got = get_db().execute("SELECT SUM(departures), SUM(arrivals) FROM hub_flow WHERE bucket_start >= ?",
+                           (start,)).fetchone()
+    expect = get_db().execute(RESCAN_SQL, (_ts(start),) * 2).fetchone()
+    policies = get_db().execute("SELECT COUNT(*), SUM(expired_at IS NULL) FROM rebalancing_policy").fetchone()
+
+  print(json.dumps({
+    "rides": args.rides + args.step * args.passes,
+    "first": {k: first[k] for k in ("departures", "arrivals", "seconds")},
+    "incremental": {"passes": args.passes, "rides_per_pass": args.step, **summarize(passes)},
+    "rescan": summarize(rescans),
+    "flow": {"departures": got[0], "arrivals": got[1]},
+    "rescan_counts": {"departures": expect[0], "arrivals": expect[1]},
+    "policies": {"total": policies[0], "open": policies[1]},
+  }, indent=2))
+
+
+if __name__ == "__main__":
+  main()
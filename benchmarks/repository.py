@@ -0,0 +1,79 @@
+"""
+행 객체: sqlite3.Row -> dict 복사 vs repository 의 __slots__ 행
+
+- hubs      : 허브 목록 (공간 인덱스/도구 정의/사전이 만드는 것)
+- occupancy : menu2 지도 / /api/hub-occupancy 전체 목록
+각각 조회 지연과 결과가 살아 있는 동안 잡고 있는 메모리(tracemalloc)를 잰다.
+
+사용법:
+  python -m benchmarks.repository [--hubs 2000] [-n 300]
+"""
+import argparse
+import json
+import random
+import tracemalloc
+
+from PoringAI import db as dbmod, repository
+from .common import make_app, summarize, timeit
+
+DICT_HUBS = "SELECT hub_id, name AS hub_name, lat, lng AS lon, region FROM hub ORDER BY hub_id"
+DICT_OCCUPANCY = '''
+    SELECT h.hub_id, h.name AS hub_name, h.lat AS latitude, h.lng AS longitude,
+           COALESCE(c.parked_sum, 0) AS parked_sum, COALESCE(c.total_sum, 0) AS total_sum,
+           COALESCE(c.available_bikes, 0) AS available_bikes
+      FROM hub h LEFT JOIN hub_counters c ON c.hub_id = h.hub_id
+     ORDER BY h.hub_id
+    '''
+
+
+def held_bytes(fn):
+  tracemalloc.start()
+  before = tracemalloc.take_snapshot()
+  rows = fn()
+  after = tracemalloc.take_snapshot()
+  tracemalloc.stop()
+  size = sum(s.size_diff for s in after.compare_to(before, "filename"))
+  del rows
+  return size
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--hubs", type=int, default=2000)
+  parser.add_argument("-n", type=int, default=300)
+  args = parser.parse_args()
+  random.seed(0)
+
+  app = make_app(n_bikes=args.hubs * 5)
+  with app.app_context():
+    db = dbmod.get_writer()
+    db.executemany(
+      "INSERT INTO hub (name, lat, lng, capacity, region) VALUES (?, ?, ?, 20, ?)",
+      [(f"hub-{i}", 36.0 + random.random() / 50, 129.3 + random.random() / 50, f"r{i % 8}")
+       for i in range(args.hubs)],
+    )
+    db.commit()
+    db = dbmod.get_db()
+    repository.occupancy(db)   # 카운터 설치
+
+    cases = {
+      "hubs": (lambda: [dict(r) for r in db.execute(DICT_HUBS).fetchall()],
+               lambda: repository.hubs(db)),
+      "occupancy": (lambda: [dict(r) for r in db.execute(DICT_OCCUPANCY).fetchall()],
+                    lambda: repository.occupancy(db)),
+    }
+    results = []
+    for name, (as_dict, as_slots) in cases.items():
+      results.append({
+        "query": name,
+        "rows": len(as_slots()),
+        "row_dict": summarize(timeit(as_dict, args.n)),
+        "slots": summarize(timeit(as_slots, args.n)),
+        "row_dict_bytes": held_bytes(as_dict),
+        "slots_bytes": held_bytes(as_slots),
+      })
+  print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,96 @@
+"""
+보존 정책(retention) 처리량과, 돌리는 동안 쓰기 지연
+
+오래된 위치/상태 로그 N 줄(+ 최근 로그 일부)을 만든 뒤
+- retention.run() 시간과 요약/롤업 결과
+- 같은 시간 동안 다른 스레드의 자전거 상태 UPDATE 지연 (배치가 writer 를 오래 잡지 않는지)
+- 시간별 허브 롤업 조회 지연
+을 잰다.
+
+사용법:
+  python -m benchmarks.retention [--rows 500000] [--batch 2000]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+from PoringAI import db as dbmod, retention
+from .common import HUBS, make_app, summarize, timeit
+
+def fill(app, rows, n_bikes=100):
+  now = int(time.time())
+  span = 10 * 86400
+  with app.app_context():
+    db = dbmod.get_db()
+    loc, st = [], []
+    for i in range(rows):
+      # 90% 는 8~10일 전 로그, 10% 는 최근 하루
+      age = random.randint(8 * 86400, span) if i < rows * 0.9 else random.randint(0, 86400)
+      at = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now - span + (span - age)))
+      _, lat, lng = random.choice(HUBS)
+      b = random.randint(1, n_bikes)
+      loc.append((b, lat + random.uniform(-5e-4, 5e-4), lng + random.uniform(-5e-4, 5e-4), at))
+      if i % 4 == 0:
+        st.append((b, random.choice(("ok", "ok", "low_battery")), at))
+    # log_id 가 대체로 시간 순이 되도록 정렬해서 넣는다 (실제 수집 순서)
+    loc.sort(key=lambda r: r[3])
+    st.sort(key=lambda r: r[2])
+    db.executemany("INSERT INTO bike_location_log (bike_id, lat, lng, logged_at) VALUES (?, ?, ?, ?)", loc)
+    db.executemany("INSERT INTO bike_status_log (bike_id, status, logged_at) VALUES (?, ?, ?)", st)
+    db.commit()
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--rows", type=int, default=500000)
+  parser.add_argument("--batch", type=int, default=None)
+  args = parser.parse_args()
+  random.seed(0)
+
+  app = make_app(n_bikes=1000)
+  fill(app, args.rows)
+
+  stop = threading.Event()
+  write_lat = []
+
+  def writer():
+    while not stop.is_set():
+      t0 = time.perf_counter()
+      with app.app_context():
+        db = dbmod.get_writer()
+        db.execute("UPDATE bike SET is_available = 1 - is_available WHERE bike_id = ?", (random.randint(1, 1000),))
+        db.commit()
+      write_lat.append((time.perf_counter() - t0) * 1000)
+      time.sleep(0.002)
+
+  t = threading.Thread(target=writer)
+  t.start()
+  with app.app_context():
+    stats = retention.run(batch=args.batch)
+  stop.set()
+  t.join()
+
+  with app.app_context():
+    db = dbmod.get_db()
+    remaining = db.execute("SELECT COUNT(*) FROM bike_location_log").fetchone()[0]
+    summaries = db.execute("SELECT COUNT(*), SUM(samples) FROM bike_location_summary").fetchone()
+    rollup_samples = db.execute("SELECT SUM(samples) FROM hub_hourly_rollup").fetchone()[0]
+    since = db.execute("SELECT datetime('now', '-30 days')").fetchone()[0]
+    history = summarize(timeit(lambda: retention.hub_history(db, random.randint(1, len(HUBS)), since), 200))
+
+  print(json.dumps({
+    "rows": args.rows,
+    "retention": stats.as_dict(),
+    "raw_location_rows_left": remaining,
+    "summary_rows": summaries[0],
+    "summary_samples": summaries[1],
+    "hub_rollup_samples": rollup_samples,
+    "concurrent_write": summarize(write_lat),
+    "hub_history_query": history,
+  }, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,238 @@
+"""
+대여/반납 동시성: 예전 읽고-검사하고-쓰기 vs rides 상태 전이
+
+워커 프로세스(--workers) 여러 개가 같은 DB 파일을 쓰고, 프로세스마다 사용자 스레드가
+대여 -> 존 반납을 반복한다. (gunicorn 워커 여러 개와 같은 상황: writer 락이 프로세스마다 따로)
+
+- naive  : 예전 라우트처럼 get_writer() 로 상태를 읽고 파이썬에서 검사한 뒤 UPDATE/INSERT
+- engine : rides.rent / rides.zone_return (BEGIN IMMEDIATE + 조건부 UPDATE)
+
+시나리오
+- same      : 모든 스레드가 자전거 몇 대(--hot)를 두고 경쟁
+- different : 스레드마다 자기 자전거만
+
+보고: 초당 전이 수, 성공/거절(409 류)/오류, 그리고 불변식 위반 수(0 이어야 함)
+- double_grant : 이미 누가 타고 있는 자전거의 대여가 성공함
+                 (성공한 대여를 별도 파일의 UNIQUE(bike_id) 표에 적어서 프로세스 사이에서도 센다)
+- 자전거 하나에 진행 중 ride 가 둘 이상 / 사용자 하나에 진행 중 ride 가 둘 이상
+- 대여 불가(is_available=0) 인데 진행 중 ride 가 없음 / 대여 가능인데 ride 가 있음
+- 성공했다고 응답한 대여 수 != ride 행 수
+- hub_counters 가 재집계와 다름
+
+사용법:
+  python -m benchmarks.ride_contention [--threads 8] [--workers 4] [--seconds 3] [--hot 4]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from PoringAI import counters, create_app, db as dbmod, pricing, repository, rides
+from .common import make_app, summarize
+
+BIKES_PER_THREAD = 4
+
+
+# ----- 예전 방식 (user-016 까지의 라우트와 같은 순서) -----
+
+def naive_rent(user_id, bike_id):
+  db = dbmod.get_writer()
+  bike = repository.bike_by_id(db, bike_id)
+  if bike is None or not bike.is_available or bike.lock_state == "fault":
+    return False
+  db.execute("UPDATE bike SET current_hub_id = NULL, is_available = 0, lock_state = 'unlocked' WHERE bike_id = ?",
+             (bike_id,))
+  repository.start_ride(db, user_id, bike_id, bike.current_hub_id, datetime.now().isoformat())
+  db.commit()
+  return True
+
+
+def naive_zone_return(user_id, bike_id, hub_id):
+  engine = pricing.get_engine()
+  db = dbmod.get_writer()
+  if not repository.hub_is_full(db, hub_id):
+    return False
+  ride = repository.open_ride(db, user_id, bike_id)
+  if ride is None:
+    return False
+  repository.end_ride(db, ride.ride_id, engine.quote(ride.start_hub_id, hub_id, ride.start_at), end_hub_id=hub_id)
+  db.execute("UPDATE bike SET current_hub_id = NULL, is_available = 1, lock_state = 'locked' WHERE bike_id = ?",
+             (bike_id,))
+  repository.deactivate_locks(db, user_id, bike_id)
+  repository.add_lock(db, user_id, bike_id, transferable=True)
+  db.commit()
+  return True
+
+
+def engine_rent(user_id, bike_id):
+  rides.rent(user_id, bike_id)
+  return True
+
+
+def engine_zone_return(user_id, bike_id, hub_id):
+  rides.zone_return(user_id, bike_id, hub_id)
+  return True
+
+
+MODES = {
+  "naive": (naive_rent, naive_zone_return),
+  "engine": (engine_rent, engine_zone_return),
+}
+
+
+def violations(app, rents_ok, double_grants):
+  with app.app_context():
+    db = dbmod.get_db()
+    one = lambda sql: db.execute(sql).fetchone()[0]
+    out = {
+      "double_grant": double_grants,
+      "bike_multi_open_ride": one(
+        "SELECT COUNT(*) FROM (SELECT bike_id FROM ride WHERE end_at IS NULL GROUP BY bike_id HAVING COUNT(*) > 1)"),
+      "user_multi_open_ride": one(
+        "SELECT COUNT(*) FROM (SELECT user_id FROM ride WHERE end_at IS NULL GROUP BY user_id HAVING COUNT(*) > 1)"),
+      "bike_state_mismatch": one('''
+        SELECT COUNT(*) FROM bike b
+         WHERE (b.is_available = 0) IS NOT EXISTS (SELECT 1 FROM ride r WHERE r.bike_id = b.bike_id AND r.end_at IS NULL)'''),
+      "rides_vs_ok_rents": abs(one("SELECT COUNT(*) FROM ride") - rents_ok),
+      "counter_mismatch": len(counters.check(db)),
+    }
+  return out
+
+
+class Grants:
+  """성공한 대여 기록 (bike_id 당 한 줄). 이미 있으면 double grant."""
+
+  def __init__(self, path):
+    self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+
+  def granted(self, bike_id, user_id):
+    try:
+      self.db.execute("INSERT INTO grants (bike_id, user_id) VALUES (?, ?)", (bike_id, user_id))
+      return True
+    except sqlite3.IntegrityError:
+      self.db.execute("UPDATE grants SET user_id = ? WHERE bike_id = ?", (user_id, bike_id))
+      return False
+
+  def released(self, bike_id, user_id):
+    # 반납 커밋 전에 내려놓는다 (커밋 직후의 다른 대여를 위반으로 세지 않게)
+    self.db.execute("DELETE FROM grants WHERE bike_id = ? AND user_id = ?", (bike_id, user_id))
+
+
+def worker(path, grants_path, mode, scenario, user_ids, start, seconds, hot):
+  """워커 프로세스 하나: user_ids 마다 스레드 하나. 반환: (합계, 지연 목록)"""
+  app = create_app({"TESTING": True, "DATABASE": path})
+  rent, zone_return = MODES[mode]
+  lock = threading.Lock()
+  totals = {"ops": 0, "rent_ok": 0, "return_ok": 0, "refused": 0, "errors": 0, "double_grant": 0}
+  lat = []
+
+  def user(user_id):
+    grants = Grants(grants_path)
+    t = user_id - 1
+    pool = list(range(1, hot + 1)) if scenario == "same" else \
+      list(range(t * BIKES_PER_THREAD + 1, (t + 1) * BIKES_PER_THREAD + 1))
+    mine = None
+    c = dict.fromkeys(totals, 0)
+    my_lat = []
+    while time.time() < start:
+      time.sleep(0.001)
+    while time.time() < start + seconds:
+      t0 = time.perf_counter()
+      try:
+        with app.app_context():
+          if mine is None:
+            bike_id = random.choice(pool)
+            if rent(user_id, bike_id):
+              mine = bike_id
+              c["rent_ok"] += 1
+              if not grants.granted(bike_id, user_id):
+                c["double_grant"] += 1
+            else:
+              c["refused"] += 1
+          else:
+            grants.released(mine, user_id)
+            if zone_return(user_id, mine, 1):
+              c["return_ok"] += 1
+            else:
+              c["refused"] += 1
+            mine = None
+      except rides.TransitionError:
+        c["refused"] += 1
+        mine = None
+      except sqlite3.Error:
+        c["errors"] += 1
+      c["ops"] += 1
+      my_lat.append((time.perf_counter() - t0) * 1000)
+    with lock:
+      for k, v in c.items():
+        totals[k] += v
+      lat.extend(my_lat)
+
+  ts = [threading.Thread(target=user, args=(u,)) for u in user_ids]
+  for t in ts:
+    t.start()
+  for t in ts:
+    t.join()
+  return totals, lat
+
+
+def run(mode, scenario, threads, workers, seconds, hot):
+  # capacity 0: 허브는 늘 꽉 찬 상태라 존 반납이 항상 허용된다
+  base = make_app(n_bikes=threads * BIKES_PER_THREAD, capacity=0)
+  path = base.config["DATABASE"]
+  with base.app_context():
+    db = dbmod.get_writer()
+    db.executemany("INSERT INTO user (user_id, name) VALUES (?, ?)", [(u + 1, f"u{u + 1}") for u in range(threads)])
+    db.commit()
+  dbmod.get_manager(base).close()
+
+  grants_path = os.path.join(os.path.dirname(path), "grants.db")
+  g = sqlite3.connect(grants_path)
+  g.execute("PRAGMA journal_mode = WAL")
+  g.execute("CREATE TABLE grants (bike_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL)")
+  g.close()
+
+  start = time.time() + 2.0   # 프로세스가 모두 뜰 때까지 기다렸다가 같이 시작
+  jobs = [(path, grants_path, mode, scenario, list(range(w + 1, threads + 1, workers)), start, seconds, hot)
+          for w in range(workers)]
+  with multiprocessing.get_context("spawn").Pool(workers) as pool:
+    parts = pool.starmap(worker, jobs)
+
+  totals, lat = {}, []
+  for t, l in parts:
+    for k, v in t.items():
+      totals[k] = totals.get(k, 0) + v
+    lat += l
+  double_grants = totals.pop("double_grant")
+  return {
+    "mode": mode,
+    "scenario": scenario,
+    "ops_per_s": round(totals["ops"] / seconds, 1),
+    **totals,
+    "latency": summarize(lat),
+    "violations": violations(base, totals["rent_ok"], double_grants),
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--threads", type=int, default=8)
+  parser.add_argument("--workers", type=int, default=4, help="같은 DB 를 쓰는 워커 프로세스 수")
+  parser.add_argument("--seconds", type=float, default=3.0)
+  parser.add_argument("--hot", type=int, default=4, help="same 시나리오에서 경쟁하는 자전거 수")
+  args = parser.parse_args()
+  results = [
+    run(mode, scenario, args.threads, args.workers, args.seconds, args.hot)
+    for scenario in ("same", "different")
+    for mode in ("naive", "engine")
+  ]
+  print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,111 @@
+"""
+읽기/쓰기 섞인 동시 부하에서 DB 연결 방식 비교
+
+- legacy : 요청마다 connect, rollback journal, 쓰기도 get_db() (예전 db.py 와 같음)
+- managed: WAL + 읽기 연결 풀 + writer 연결 하나 (지금 db.py)
+
+읽기 스레드는 지도/채팅 경로처럼 허브 카운터와 허브 대수를 읽고,
+쓰기 스레드는 대여/반납처럼 자전거 상태를 바꾸고 커밋한다.
+스레드마다 요청 하나 = app context 하나.
+
+사용법:
+  python -m benchmarks.sqlite_mixed [--readers 8] [--writers 2] [--seconds 5] [--bikes 10000]
+"""
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+
+from PoringAI import counters, db as dbmod, repository
+from .common import HUBS, make_app, summarize
+
+READ_SQL = '''
+    SELECT COUNT(*) FROM bike WHERE current_hub_id = ? AND is_available = 1
+'''
+WRITE_SQL = '''
+    UPDATE bike SET is_available = 1 - is_available WHERE bike_id = ?
+'''
+
+
+def run(mode, readers, writers, seconds, n_bikes):
+  if mode == "legacy":
+    app = make_app(n_bikes=n_bikes, DB_WAL=False, DB_POOL_SIZE=0)
+    get_writer = dbmod.get_db
+  else:
+    app = make_app(n_bikes=n_bikes)
+    get_writer = dbmod.get_writer
+
+  stop = time.perf_counter() + seconds
+  lat = {"read": [], "write": []}
+  errors = {"read": 0, "write": 0}
+  lock = threading.Lock()
+
+  def reader():
+    mine, err = [], 0
+    while time.perf_counter() < stop:
+      t0 = time.perf_counter()
+      try:
+        with app.app_context():
+          db = dbmod.get_db()
+          db.execute(READ_SQL, (random.randint(1, len(HUBS)),)).fetchone()
+          repository.occupancy(db)
+      except sqlite3.OperationalError:
+        err += 1
+        continue
+      mine.append((time.perf_counter() - t0) * 1000)
+    with lock:
+      lat["read"] += mine
+      errors["read"] += err
+
+  def writer():
+    mine, err = [], 0
+    while time.perf_counter() < stop:
+      t0 = time.perf_counter()
+      try:
+        with app.app_context():
+          db = get_writer()
+          db.execute(WRITE_SQL, (random.randint(1, n_bikes),))
+          db.commit()
+      except sqlite3.OperationalError:
+        err += 1
+        continue
+      mine.append((time.perf_counter() - t0) * 1000)
+    with lock:
+      lat["write"] += mine
+      errors["write"] += err
+
+  threads = [threading.Thread(target=reader) for _ in range(readers)]
+  threads += [threading.Thread(target=writer) for _ in range(writers)]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+
+  with app.app_context():
+    consistent = counters.check(dbmod.get_db()) == []
+  return {
+    "mode": mode,
+    "read_ops_per_s": round(len(lat["read"]) / seconds, 1),
+    "write_ops_per_s": round(len(lat["write"]) / seconds, 1),
+    "read": summarize(lat["read"]) if lat["read"] else None,
+    "write": summarize(lat["write"]) if lat["write"] else None,
+    "errors": errors,
+    "counters_consistent": consistent,
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--readers", type=int, default=8)
+  parser.add_argument("--writers", type=int, default=2)
+  parser.add_argument("--seconds", type=float, default=5.0)
+  parser.add_argument("--bikes", type=int, default=10000)
+  args = parser.parse_args()
+  results = [run(mode, args.readers, args.writers, args.seconds, args.bikes) for mode in ("legacy", "managed")]
+  print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,98 @@
+"""
+텔레메트리 수집 처리량
+
+- per_row : 샘플마다 INSERT + commit (zone_return 의 위치 로그 방식)
+- ndjson  : POST /api/telemetry, NDJSON 배치
+- binary  : POST /api/telemetry, 18바이트 레코드 배치
+
+사용법:
+  python -m benchmarks.telemetry [--samples 100000] [--batch 5000] [--bikes 1000]
+"""
+import argparse
+import json
+import random
+import time
+
+from PoringAI import db as dbmod, telemetry
+from .common import make_app
+
+
+def setup(n_bikes):
+  return make_app(n_bikes=n_bikes)
+
+
+def make_samples(n, n_bikes):
+  t0 = int(time.time()) - n
+  return [
+    (random.randint(1, n_bikes), t0 + i, 36.0 + random.random() * 0.02, 129.31 + random.random() * 0.02,
+     random.randint(0, 100), random.choice((1, 1, 1, 2, 3)))
+    for i in range(n)
+  ]
+
+
+def as_ndjson(rows):
+  return "\n".join(
+    json.dumps({"bike_id": b, "ts": ts, "lat": lat, "lng": lng, "battery": bat,
+                "status": telemetry.STATUS_CODES[code]})
+    for b, ts, lat, lng, bat, code in rows
+  ).encode()
+
+
+def as_binary(rows):
+  return b"".join(
+    telemetry.RECORD.pack(b, ts, int(lat * 1e7), int(lng * 1e7), bat, code)
+    for b, ts, lat, lng, bat, code in rows
+  )
+
+
+def per_row(app, rows):
+  t0 = time.perf_counter()
+  for b, ts, lat, lng, bat, code in rows:
+    with app.app_context():
+      db = dbmod.get_writer()
+      db.execute("INSERT INTO bike_location_log (bike_id, lat, lng) VALUES (?, ?, ?)", (b, lat, lng))
+      db.commit()
+  return time.perf_counter() - t0
+
+
+def posted(app, rows, batch, encode, mimetype):
+  client = app.test_client()
+  bodies = [encode(rows[i:i + batch]) for i in range(0, len(rows), batch)]
+  accepted = 0
+  t0 = time.perf_counter()
+  for body in bodies:
+    res = client.post("/api/telemetry", data=body, content_type=mimetype)
+    accepted += res.get_json()["accepted"]
+  elapsed = time.perf_counter() - t0
+  assert accepted == len(rows), (accepted, len(rows))
+  return elapsed
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--samples", type=int, default=100000)
+  parser.add_argument("--batch", type=int, default=5000)
+  parser.add_argument("--bikes", type=int, default=1000)
+  args = parser.parse_args()
+  random.seed(0)
+  rows = make_samples(args.samples, args.bikes)
+
+  results = []
+  per_row_n = min(len(rows), 10000)
+  elapsed = per_row(setup(args.bikes), rows[:per_row_n])
+  results.append({"mode": "per_row", "samples": per_row_n, "samples_per_s": round(per_row_n / elapsed)})
+  for name, encode, mimetype in (("ndjson", as_ndjson, "application/x-ndjson"),
+                                 ("binary", as_binary, "application/x-poring-telemetry")):
+    app = setup(args.bikes)
+    elapsed = posted(app, rows, args.batch, encode, mimetype)
+    with app.app_context():
+      db = dbmod.get_db()
+      stored = db.execute("SELECT COUNT(*) FROM bike_location_log").fetchone()[0]
+      seen = db.execute("SELECT COUNT(*) FROM bike WHERE last_seen_at IS NOT NULL").fetchone()[0]
+    results.append({"mode": name, "samples": len(rows), "samples_per_s": round(len(rows) / elapsed),
+                    "location_rows": stored, "bikes_with_position": seen})
+  print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+  main()